@@ -1,10 +1,12 @@
 """Module ..."""
 #TODO use pylint doc string this file
+import asyncio
 import os
+import threading
 from contextlib import asynccontextmanager
 from es_client import create_index, get_es_client, index_documents, search_similar_courses
 from db import fetch_documents
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
@@ -19,17 +21,51 @@ class Course(BaseModel):
     url: str
 
 
+def warm_up_index(app: FastAPI):
+    """
+    Method indexes the courses (run in the background, so the server starts immediately).
+    Failed attempts (e.g. the database or Elasticsearch still starting) are retried with
+    an exponential backoff (INDEX_RETRY_DELAY doubling up to INDEX_RETRY_MAX_DELAY seconds)
+    until the courses are indexed or the server shuts down
+    """
+    delay = float(os.getenv('INDEX_RETRY_DELAY', '1'))
+    max_delay = float(os.getenv('INDEX_RETRY_MAX_DELAY', '60'))
+    while not app.state.shutdown.is_set():
+        try:
+            create_index(app.es_client, "courses_index")
+            documents = fetch_documents(os.getenv('MONGO_COURSE_COLLECTION'))
+            print("Documents retrieved from DB: ", len(documents))
+            index_documents(app.es_client, "courses_index", documents)
+            app.state.index_documents = len(documents)
+            app.state.index_error = None
+            app.state.index_version += 1
+            print("Start Up Process Finished")
+            return
+        except Exception as e: # pylint: disable = broad-exception-caught
+            app.state.index_error = str(e)
+            app.state.index_failures += 1
+            print(f"Start Up Process Failed (retrying in {delay}s): ", e)
+        app.state.shutdown.wait(delay)
+        delay = min(delay * 2, max_delay)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Method ..."""
     print("Start Up Process")
     app.es_client = get_es_client()
-    create_index(app.es_client, "courses_index")
-    documents = fetch_documents(os.getenv('MONGO_COURSE_COLLECTION'))
-    print("Documents retrieved from DB: ", len(documents))
-    index_documents(app.es_client, "courses_index", documents)
-    print("Start Up Process Finished")
+    app.state.index_version = 0
+    app.state.index_documents = 0
+    app.state.index_error = None
+    app.state.index_failures = 0
+    #stops the retries of the indexing on shutdown
+    app.state.shutdown = threading.Event()
+    #searches return 503 until the courses are indexed (see /readyz)
+    app.state.index_task = asyncio.create_task(asyncio.to_thread(warm_up_index, app))
     yield
+    #the client is closed once the indexing has finished its current attempt
+    app.state.shutdown.set()
+    await app.state.index_task
     app.es_client.close()
 
 app = FastAPI(lifespan=lifespan)
@@ -46,9 +82,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def index_ready() -> bool:
+    """Method checks if the courses have been indexed"""
+    return getattr(app.state, "index_version", 0) > 0
+
+
+@app.get("/healthz")
+def healthz():
+    """Method is the liveness probe (the courses may still be indexing)"""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    """Method is the readiness probe, returning the index version and number of courses"""
+    if not index_ready():
+        raise HTTPException(status_code=503,
+                            detail={"ready": False,
+                                    "error": getattr(app.state, "index_error", None),
+                                    "failures": getattr(app.state, "index_failures", 0)})
+    return {"ready": True, "version": app.state.index_version,
+            "courses": app.state.index_documents}
+
+
 @app.post("/")
 def search_courses(course: Course):
     """Method ..."""
+    if not index_ready():
+        raise HTTPException(status_code=503, detail="Courses index is not ready",
+                            headers={"Retry-After": "5"})
     results = search_similar_courses(app.es_client, "courses_index", dict(course))# pylint: disable = no-member
     print(results)
     courses = [hit['_source'] for hit in results['hits']['hits']]
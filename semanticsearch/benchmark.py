@@ -1,43 +1,83 @@
 """
 Benchmark Module Observes the Memory Usage and Process Time for the Semantic Search Module
 """
+import argparse
+import json
 import os
-from pandas import DataFrame
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import time
 import psutil
 import gc
+import numpy
+from bson import ObjectId
 from sts_module.database.database_helper import DatabaseHelper
+from sts_module.database.memory_database import MemoryDatabase
 from sts_module.database.mongo_db_interface import MongoDBDatabase
+from sts_module.database.snapshot_database import SnapshotDatabase
 from sts_module.embedding_module.controller import EmbeddingController
+from sts_module.embedding_module.encoders import create_encoder, encoder_backends
+from sts_module.index_module.vector_index import VectorIndex
+from sts_module.index_module.ivf_index import IVFIndex
+from sts_module.index_module.quantized_index import QuantizedIndex
 
 
 
 #region Database Connection Variables
-url: str = "mongodb://localhost:27017/"
-username: str = "chatbot"
-password: str = "chatbotpassword"
-database_auth_mechanism: str = "SCRAM-SHA-1"
-database_name: str= "ibm_chatbot"
-courses_collection_name: str = "courses"
-embedded_dataset_collection_name: str = "embedded_dataset"
-
-
-#Database Object connecting to the Courses Collection
-courses_database = MongoDBDatabase(
-            url=url,
-            username=username,
-            password=password,
-            auth_mechanism=database_auth_mechanism,
-            database=database_name,
-            collection=courses_collection_name)
-#Database Object connecting to the Embedded Dataset Collection
-embedded_database = MongoDBDatabase(
-            url=url,
-            username=username,
-            password=password,
-            auth_mechanism=database_auth_mechanism,
-            database=database_name,
-            collection=embedded_dataset_collection_name)
+#the database server and credentials are read from the enviroment variables of main.py
+database_name: str = os.getenv('MONGO_CHATBOT_DATABASE', 'ibm_chatbot')
+courses_collection_name: str = os.getenv('MONGO_COURSE_COLLECTION', 'courses')
+embedded_dataset_collection_name: str = os.getenv('MONGO_EMBEDDED_DATASET_COLLECTION',
+                                                  'embedded_dataset')
+
+
+def create_databases(snapshot: str | None = None) -> tuple:
+    """
+    Method creates the Database Objects of the courses and embedded dataset collections,
+    connecting to the MongoDB Server of the enviroment variables (MONGO_CONTAINER,
+    MONGO_PORT, MONGO_USER, MONGO_PASSWORD and MONGO_AUTH_MECHANISM), or copies the
+    collections of a local snapshot into in-memory stores. Only the benchmarks reading the
+    courses catalog create them.
+
+    Args:
+        snapshot (str | None): Directory of a snapshot used instead of the MongoDB Server
+    Returns:
+        tuple (Database, Database): (courses, embedded dataset) Database Objects
+    """
+    if snapshot is not None:
+        return load_snapshot_databases(snapshot)
+    url: str = f"mongodb://{os.getenv('MONGO_CONTAINER', 'localhost')}:" \
+               f"{os.getenv('MONGO_PORT', '27017')}/"
+    return tuple(MongoDBDatabase(
+                    url=url,
+                    username=os.getenv('MONGO_USER'),
+                    password=os.getenv('MONGO_PASSWORD'),
+                    auth_mechanism=os.getenv('MONGO_AUTH_MECHANISM', 'SCRAM-SHA-1'),
+                    database=database_name,
+                    collection=collection)
+                 for collection in (courses_collection_name, embedded_dataset_collection_name))
+
+
+def load_snapshot_databases(path: str) -> tuple:
+    """
+    Method copies the courses and embedded dataset collections of a local snapshot into
+    in-memory stores, so the benchmarks run without a MongoDB Server (and may write to them)
+
+    Args:
+        path (str): Directory of the snapshot (see SnapshotDatabase)
+    Returns:
+        tuple (MemoryDatabase, MemoryDatabase): (courses, embedded dataset) stores
+    """
+    databases = []
+    for collection in (courses_collection_name, embedded_dataset_collection_name):
+        snapshot = SnapshotDatabase(path, collection, database=database_name)
+        snapshot.connect(create=True)
+        databases.append(MemoryDatabase(database_name, collection,
+                                        list(snapshot.iterate_documents())))
+        snapshot.close()
+    return tuple(databases)
 #endregion
 
 #region utility functions
@@ -70,11 +110,16 @@ def get_swap_memory() -> int:
     return psutil.swap_memory().total / 1024 / 1024
 
 #region Embedded Dataset Creation
-def observe_memory_embedded_dataset_setup(courses) -> tuple:
+def observe_memory_embedded_dataset_setup(courses, courses_database,
+                                          embedded_database) -> tuple:
     """
     This method observes the memory usage and process time (CPU execution time) for 
     creating an embedded dataset and storing it into the projects database
 
+    Args:
+        courses (list[dict]): courses to be embedded
+        courses_database (Database): Database Object of the courses collection
+        embedded_database (Database): Database Object of the embedded dataset collection
     Returns:
        tuple (int, int): (Memory Usage (MB), Process Time (s))
     """
@@ -99,11 +144,605 @@ def observe_memory_embedded_dataset_setup(courses) -> tuple:
     return (total_memory_usage, total_virutal_memory_change, total_swap_memory_change, total_time)
 #endregion
 
+#region Approximate Nearest Neighbour Index
+def create_synthetic_embeddings(size: int, dimension: int, clusters: int = 100,
+                                seed: int = 0) -> numpy.ndarray:
+    """
+    Method creates a clustered synthetic embedded dataset, used to benchmark vector
+    indexes at catalog sizes larger than the courses stored on the database
+
+    Returns:
+        numpy.ndarray: float32 embedded dataset of shape (size, dimension)
+    """
+    generator = numpy.random.default_rng(seed)
+    centres = generator.normal(size=(clusters, dimension)).astype(numpy.float32)
+    embeddings = centres[generator.integers(0, clusters, size)]
+    embeddings += 0.5 * generator.normal(size=(size, dimension)).astype(numpy.float32)
+    return embeddings
+
+
+def observe_index_search(vector_index: VectorIndex, queries: numpy.ndarray, top_k: int) -> tuple:
+    """
+    This method observes the latency of searching a vector index for every query
+
+    Returns:
+        tuple (list, list): (positions returned for each query, latency (ms) of each query)
+    """
+    results, latencies = [], []
+    for query in queries:
+        prev_time = time.perf_counter()
+        positions, _ = vector_index.top_k_indices(query, top_k)
+        latencies.append((time.perf_counter() - prev_time) * 1000)
+        results.append(positions)
+    return results, latencies
+
+
+def observe_ann_index(embeddings: numpy.ndarray, queries: numpy.ndarray, top_k: int,
+                      n_lists: int | None, n_probes: list[int]) -> list[dict]:
+    """
+    This method compares the IVF (approximate) index against the exact index, measuring
+    the recall@k of the IVF index, the search latency and memory usage of both indexes
+    for each number of probed clusters (the IVF index is trained once)
+
+    Returns:
+       list[dict]: build time (s), memory (MB), mean/p95 latency (ms) and recall@k
+    """
+    courses = [{} for _ in range(len(embeddings))]
+    exact_index = VectorIndex(embeddings, courses)
+    prev_time = time.perf_counter()
+    ivf_index = IVFIndex(embeddings, courses, n_lists=n_lists)
+    build_time = time.perf_counter() - prev_time
+    exact_results, exact_latencies = observe_index_search(exact_index, queries, top_k)
+
+    observations = []
+    for n_probe in n_probes:
+        ivf_index.n_probe = n_probe
+        ivf_results, ivf_latencies = observe_index_search(ivf_index, queries, top_k)
+        recall = numpy.mean([len(set(exact).intersection(approximate)) / len(exact)
+                             for exact, approximate in zip(exact_results, ivf_results)])
+        observations.append({"n_lists": ivf_index.n_lists,
+                             "n_probe": n_probe,
+                             "ivf_build_time_s": build_time,
+                             "exact_memory_mb": exact_index.nbytes / 1024 / 1024,
+                             "ivf_memory_mb": ivf_index.nbytes / 1024 / 1024,
+                             "exact_latency_mean_ms": float(numpy.mean(exact_latencies)),
+                             "exact_latency_p95_ms": float(numpy.percentile(exact_latencies, 95)),
+                             "ivf_latency_mean_ms": float(numpy.mean(ivf_latencies)),
+                             "ivf_latency_p95_ms": float(numpy.percentile(ivf_latencies, 95)),
+                             f"recall@{top_k}": float(recall)})
+    return observations
+
+
+def observe_quantized_index(embeddings: numpy.ndarray, queries: numpy.ndarray, top_k: int,
+                            precisions: list[str], rescore_factors: list[int]) -> list[dict]:
+    """
+    This method compares the quantized index (for each precision and rescore factor)
+    against the exact index, measuring the recall@k, search latency and memory usage
+
+    Returns:
+       list[dict]: memory (MB), mean/p95 latency (ms) and recall@k
+    """
+    courses = [{} for _ in range(len(embeddings))]
+    exact_index = VectorIndex(embeddings, courses)
+    exact_results, exact_latencies = observe_index_search(exact_index, queries, top_k)
+    observations = []
+    for precision in precisions:
+        quantized_index = QuantizedIndex(embeddings, courses, precision=precision)
+        for rescore_factor in rescore_factors:
+            quantized_index.rescore_factor = rescore_factor
+            results, latencies = observe_index_search(quantized_index, queries, top_k)
+            recall = numpy.mean([len(set(exact).intersection(approximate)) / len(exact)
+                                 for exact, approximate in zip(exact_results, results)])
+            observations.append({
+                "precision": precision,
+                "rescore_factor": rescore_factor,
+                "exact_memory_mb": exact_index.nbytes / 1024 / 1024,
+                "quantized_codes_memory_mb": (quantized_index.nbytes - exact_index.nbytes)
+                                             / 1024 / 1024,
+                "exact_latency_mean_ms": float(numpy.mean(exact_latencies)),
+                "quantized_latency_mean_ms": float(numpy.mean(latencies)),
+                "quantized_latency_p95_ms": float(numpy.percentile(latencies, 95)),
+                f"recall@{top_k}": float(recall)})
+    return observations
+#endregion
+
+#region Embedding Dimension
+def observe_embedding_dimensions(embedded_dataset: numpy.ndarray, embedded_queries: numpy.ndarray,
+                                 top_k: int, dimensions: list[int]) -> list[dict]:
+    """
+    This method observes the recall@k (against the full dimension embeddings), search
+    latency and memory usage of the embedded dataset truncated to each dimension
+
+    Returns:
+       list[dict]: dimension, memory (MB), mean/p95 latency (ms) and recall@k
+    """
+    courses = [{} for _ in range(len(embedded_dataset))]
+    full_index = VectorIndex(embedded_dataset, courses)
+    full_results, _ = observe_index_search(full_index, embedded_queries, top_k)
+    observations = []
+    for dimension in dimensions:
+        vector_index = VectorIndex(EmbeddingController.truncate(embedded_dataset, dimension),
+                                   courses)
+        results, latencies = observe_index_search(
+                    vector_index, EmbeddingController.truncate(embedded_queries, dimension), top_k)
+        recall = numpy.mean([len(set(full).intersection(truncated)) / len(full)
+                             for full, truncated in zip(full_results, results)])
+        observations.append({"dimension": vector_index.dimension,
+                             "memory_mb": vector_index.nbytes / 1024 / 1024,
+                             "latency_mean_ms": float(numpy.mean(latencies)),
+                             "latency_p95_ms": float(numpy.percentile(latencies, 95)),
+                             f"recall@{top_k}": float(recall)})
+    return observations
+#endregion
+
+#region Encoder Backends
+def observe_encoder_backends(backends: list[str], passages: list[str], queries: list[str],
+                             top_k: int, intra_op_threads: int | None,
+                             inter_op_threads: int | None) -> list[dict]:
+    """
+    This method compares encoder backends on the courses catalog. The first backend is the
+    reference: the passage embeddings of every other backend are compared to it by cosine
+    similarity and the top k courses of each query are compared to its rankings.
+
+    Returns:
+       list[dict]: load time (s), throughput (passages/s), memory (MB), cosine agreement
+                   and top k agreement of each backend
+    """
+    reference = None
+    observations = []
+    for backend in backends:
+        gc.collect()
+        prev_memory = get_process_memory()
+        prev_time = time.perf_counter()
+        try:
+            encoder = create_encoder(backend, EmbeddingController.model_name,
+                                     intra_op_threads, inter_op_threads)
+        except Exception as e: #pylint:disable=broad-exception-caught
+            observations.append({"backend": backend, "error": str(e)})
+            continue
+        load_time = time.perf_counter() - prev_time
+        prev_time = time.perf_counter()
+        passage_embeddings = VectorIndex.normalise(encoder.encode(passages))
+        encode_time = time.perf_counter() - prev_time
+        vector_index = VectorIndex(passage_embeddings, [{} for _ in passages])
+        rankings, _ = observe_index_search(vector_index, encoder.encode(queries), top_k)
+        if reference is None:
+            reference = (passage_embeddings, rankings)
+        cosine = numpy.sum(passage_embeddings * reference[0], axis=1)
+        top_k_agreement = numpy.mean([len(set(ranking).intersection(reference_ranking)) / top_k
+                                      for ranking, reference_ranking in zip(rankings,
+                                                                            reference[1])])
+        observations.append({"backend": backend,
+                             "load_time_s": load_time,
+                             "throughput_passages_per_s": len(passages) / encode_time,
+                             "memory_mb": get_process_memory() - prev_memory,
+                             "cosine_agreement_mean": float(numpy.mean(cosine)),
+                             "cosine_agreement_min": float(numpy.min(cosine)),
+                             f"top{top_k}_agreement": float(top_k_agreement)})
+        del encoder
+    return observations
+#endregion
+
+#region Parallel Embedding
+def observe_parallel_encoding(passages: list[str], workers: list[int],
+                              threads_per_worker: int | None, shard_size: int) -> list[dict]:
+    """
+    This method observes the time taken to embed the passages with each number of worker
+    processes (including starting the workers and loading their model replicas), and the
+    speedup against the first number of workers
+
+    Returns:
+       list[dict]: time (s), throughput (passages/s) and speedup of each number of workers
+    """
+    observations = []
+    reference = None
+    for worker_count in workers:
+        gc.collect()
+        EmbeddingController.configure_parallel_encoding(worker_count, threads_per_worker,
+                                                        shard_size)
+        prev_time = time.perf_counter()
+        embeddings = EmbeddingController.encode_passages(passages)
+        process_time = time.perf_counter() - prev_time
+        reference = reference or process_time
+        observations.append({"workers": worker_count,
+                             "threads_per_worker": threads_per_worker,
+                             "shard_size": shard_size,
+                             "passages": len(embeddings),
+                             "time_s": process_time,
+                             "throughput_passages_per_s": len(passages) / process_time,
+                             "speedup": reference / process_time})
+    return observations
+#endregion
+
+#region Startup Profiling
+#statement importing each component of the module (and its heavy dependencies)
+startup_components: dict = {
+    "numpy": "import numpy",
+    "pandas": "import pandas",
+    "torch": "import torch",
+    "sentence_transformers": "import sentence_transformers",
+    "database_helper": "from sts_module.database.database_helper import DatabaseHelper",
+    "controller": "from sts_module.embedding_module.controller import EmbeddingController",
+    "api": "import main",
+}
+
+#script run in a fresh interpreter, timing a statement and reporting the loaded modules
+startup_script: str = """
+import json, sys, time
+{setup}
+prev_time = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - prev_time
+print(json.dumps({{"time_s": elapsed,
+                  "modules": len(sys.modules),
+                  "loaded": [name for name in ("torch", "sentence_transformers", "pandas")
+                             if name in sys.modules]}}))
+"""
+
+
+def run_startup_script(statement: str, setup: str = "", env: dict | None = None) -> dict:
+    """
+    Method times a statement in a fresh Python interpreter (so no module is already imported)
+
+    Args:
+        statement (str): statement to be timed
+        setup (str): statement run before the timed statement
+        env (dict | None): additional enviroment variables of the interpreter
+    Returns:
+        dict: time (s) of the statement, number of loaded modules and heavy dependencies
+              loaded by the end of the statement
+    Raises:
+        RuntimeError: If the statement fails
+    """
+    result = subprocess.run([sys.executable, "-c",
+                             startup_script.format(setup=setup, statement=statement)],
+                            capture_output=True, text=True, check=False,
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env={**os.environ, **(env or {})})
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr
+                           else f"{statement} failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def observe_startup(components: list[str], backend: str, repeat: int = 3) -> list[dict]:
+    """
+    This method observes the import time of each component and the model load time of the
+    encoder backend, each in a fresh interpreter (the fastest of `repeat` runs is reported)
+
+    Returns:
+       list[dict]: import/load time (s), loaded modules and heavy dependencies of each step
+    """
+    steps = [(component, "", startup_components[component]) for component in components]
+    steps.append((f"model ({backend})", startup_components["controller"],
+                  "EmbeddingController.get_model()"))
+    observations = []
+    for name, setup, statement in steps:
+        try:
+            runs = [run_startup_script(statement, setup, {"ENCODER_BACKEND": backend})
+                    for _ in range(repeat)]
+        except RuntimeError as e:
+            observations.append({"component": name, "error": str(e)})
+            continue
+        fastest = min(runs, key=lambda run: run["time_s"])
+        observations.append({"component": name, **fastest})
+    return observations
+#endregion
+
+#region Query Latency and Throughput
+class PeakMemorySampler:
+    """
+    Class samples the memory usage of the current process in a background thread, recording
+    the peak memory usage (MB) while the sampler is active (used as a context manager)
+    """
+    def __init__(self, interval: float = 0.005):
+        self.interval: float = interval
+        self.peak_memory: float = 0.0
+        self.__stopped = threading.Event()
+        self.__thread: threading.Thread | None = None
+
+    def __sample(self) -> None:
+        while not self.__stopped.is_set():
+            self.peak_memory = max(self.peak_memory, get_process_memory())
+            self.__stopped.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_memory = get_process_memory()
+        self.__stopped.clear()
+        self.__thread = threading.Thread(target=self.__sample, daemon=True)
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.__stopped.set()
+        self.__thread.join()
+        self.peak_memory = max(self.peak_memory, get_process_memory())
+
+
+def create_synthetic_courses(size: int, template: list[dict] | None = None,
+                             seed: int = 0) -> list[dict]:
+    """
+    Method creates a synthetic courses catalog. Courses of the template catalog (e.g. a
+    local courses file) are repeated with new ids, otherwise courses are generated from a
+    fixed vocabulary with the fields of the courses stored on the database
+
+    Returns:
+        list[dict]: courses of the catalog
+    """
+    if template:
+        courses = []
+        for position in range(size):
+            course = dict(template[position % len(template)])
+            course["_id"] = ObjectId()
+            courses.append(course)
+        return courses
+    generator = numpy.random.default_rng(seed)
+    words = ["data", "science", "python", "machine", "learning", "cloud", "security",
+             "analytics", "statistics", "visualisation", "artificial", "intelligence", "neural",
+             "networks", "database", "design", "business", "career", "programming", "model",
+             "deployment", "ethics", "automation", "quantum", "computing", "language"]
+    course_types = ["Video", "Course", "Webpage", "Learning Plan", "eLearning", "Document"]
+    learning_hours = ["30 mins", "1 hr", "2 hrs 30 mins", "4 mins 38 s", "Days"]
+    tags = ["Data", "Cloud", "Security", "Machine Learning Skill", "Data Analysis Skill",
+            "Technical skills - Data", "Professional skills"]
+    courses = []
+    for _ in range(size):
+        courses.append({
+            "_id": ObjectId(),
+            "title": " ".join(generator.choice(words, generator.integers(3, 7))).title(),
+            "description": " ".join(generator.choice(words, generator.integers(30, 60))),
+            "learning_hours": str(generator.choice(learning_hours)),
+            "course_type": str(generator.choice(course_types)),
+            "tags": [str(tag) for tag in generator.choice(tags, generator.integers(1, 4),
+                                                          replace=False)],
+            "url": "https://example.com/course"})
+    return courses
+
+
+def percentiles(values: list[float]) -> dict:
+    """
+    Method summarises a list of measurements
+
+    Returns:
+        dict: mean, p50, p95 and p99 of the measurements
+    """
+    return {"mean": float(numpy.mean(values)),
+            "p50": float(numpy.percentile(values, 50)),
+            "p95": float(numpy.percentile(values, 95)),
+            "p99": float(numpy.percentile(values, 99))}
+
+
+def observe_semantic_search(courses: list[dict], queries: list[str], top_k: int,
+                            concurrency: int, storage_format: str = "binary") -> dict:
+    """
+    This method observes the end to end latency of `courses_semantic_search` (and the time
+    of each of its stages), its throughput at the given concurrency and the peak memory
+    usage, against a catalog held in in-memory course and embedded dataset stores
+
+    Returns:
+       dict: catalog size, build time (s), latency and stage time percentiles (ms),
+             throughput (queries/s) and peak memory (MB)
+    """
+    gc.collect()
+    with PeakMemorySampler() as sampler:
+        controller = EmbeddingController(MemoryDatabase("benchmark", "courses", courses),
+                                         MemoryDatabase("benchmark", "embedded_dataset"),
+                                         storage_format=storage_format)
+        prev_time = time.perf_counter()
+        controller.create_embedded_dataset()
+        build_time = time.perf_counter() - prev_time
+
+        latencies, stages = [], {}
+        for query in queries:
+            timings = {}
+            prev_time = time.perf_counter()
+            controller.courses_semantic_search(query, top_k, timings=timings)
+            latencies.append((time.perf_counter() - prev_time) * 1000)
+            for stage, stage_time in timings.items():
+                stages.setdefault(stage, []).append(stage_time * 1000)
+
+        prev_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(lambda query: controller.courses_semantic_search(query, top_k),
+                              queries))
+        throughput = len(queries) / (time.perf_counter() - prev_time)
+    return {"catalog_size": len(courses),
+            "build_time_s": build_time,
+            "latency_ms": percentiles(latencies),
+            "stages_ms": {stage: percentiles(values) for stage, values in stages.items()},
+            "concurrency": concurrency,
+            "throughput_qps": throughput,
+            "peak_memory_mb": sampler.peak_memory}
+#endregion
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Method parses the command line arguments of the benchmark script
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--snapshot", default=None,
+                        help="Local snapshot directory used instead of the MongoDB Server")
+    subparsers = parser.add_subparsers(dest="benchmark")
+    subparsers.add_parser("embedding", help="Embedded dataset creation (default)")
+    ann_parser = subparsers.add_parser("ann", help="IVF index recall/latency/memory")
+    quantized_parser = subparsers.add_parser("quantized",
+                                             help="Quantized index recall/latency/memory")
+    for index_parser in (ann_parser, quantized_parser):
+        index_parser.add_argument("--database", action="store_true",
+                                  help="Use the embedded dataset stored on the database")
+        index_parser.add_argument("--size", type=int, default=100000,
+                                  help="Size of the synthetic embedded dataset")
+        index_parser.add_argument("--dimension", type=int, default=1024,
+                                  help="Dimension of the synthetic embedded dataset")
+        index_parser.add_argument("--queries", type=int, default=100, help="Number of queries")
+        index_parser.add_argument("--top-k", type=int, default=10, help="Number of results")
+    ann_parser.add_argument("--n-lists", type=int, default=None, help="IVF clusters")
+    ann_parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 4, 8, 16, 32],
+                            help="IVF clusters probed per query")
+    dimension_parser = subparsers.add_parser(
+        "dimension", help="Recall/latency/memory of truncated (Matryoshka) embeddings of the "
+                          "courses stored on the database (course titles are used as queries)")
+    dimension_parser.add_argument("--dimensions", type=int, nargs="+",
+                                  default=[1024, 512, 256, 128], help="Truncation dimensions")
+    dimension_parser.add_argument("--top-k", type=int, default=10, help="Number of results")
+    encoders_parser = subparsers.add_parser(
+        "encoders", help="Throughput and embedding agreement of encoder backends on the courses "
+                         "stored on the database (the first backend is the reference)")
+    encoders_parser.add_argument("--backends", nargs="+", default=list(encoder_backends),
+                                 help="Encoder backends to compare")
+    encoders_parser.add_argument("--intra-op-threads", type=int, default=None,
+                                 help="Torch intra-op threads")
+    encoders_parser.add_argument("--inter-op-threads", type=int, default=None,
+                                 help="Torch inter-op threads")
+    encoders_parser.add_argument("--top-k", type=int, default=10, help="Number of results")
+    parallel_parser = subparsers.add_parser(
+                "parallel", help="Embedding time/speedup against the number of worker processes")
+    parallel_parser.add_argument("--size", type=int, default=2000,
+                                 help="Number of synthetic courses embedded")
+    parallel_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4],
+                                 help="Numbers of worker processes (the first is the reference)")
+    parallel_parser.add_argument("--threads-per-worker", type=int, default=None,
+                                 help="torch intra-op threads of each worker")
+    parallel_parser.add_argument("--shard-size", type=int, default=256,
+                                 help="Number of passages of each shard")
+    parallel_parser.add_argument("--encoder", default=EmbeddingController.encoder_backend,
+                                 choices=list(encoder_backends), help="Encoder backend")
+    startup_parser = subparsers.add_parser(
+                "startup", help="Import time of each component and model load time, each "
+                                "measured in a fresh interpreter")
+    startup_parser.add_argument("--components", nargs="+", default=list(startup_components),
+                                choices=list(startup_components), help="Components to import")
+    startup_parser.add_argument("--encoder", default=EmbeddingController.encoder_backend,
+                                choices=list(encoder_backends),
+                                help="Encoder backend of the model load")
+    startup_parser.add_argument("--repeat", type=int, default=3,
+                                help="Runs of each step (the fastest is reported)")
+    search_parser = subparsers.add_parser(
+        "search", help="Offline latency (p50/p95/p99 and per stage), throughput and peak memory "
+                       "of courses_semantic_search over in-memory synthetic catalogs (JSON output)")
+    search_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000],
+                               help="Sizes of the synthetic catalogs")
+    search_parser.add_argument("--courses", default=None,
+                               help="Local courses JSON file repeated to build the catalogs")
+    search_parser.add_argument("--queries", type=int, default=50, help="Number of queries")
+    search_parser.add_argument("--top-k", type=int, default=5, help="Number of results")
+    search_parser.add_argument("--concurrency", type=int, default=4,
+                               help="Concurrent queries of the throughput measurement")
+    search_parser.add_argument("--encoder", default=EmbeddingController.encoder_backend,
+                               choices=list(encoder_backends),
+                               help="Encoder backend (defaults to ENCODER_BACKEND)")
+    search_parser.add_argument("--storage-format", default="binary",
+                               choices=list(EmbeddingController.storage_formats),
+                               help="Storage format of the embedded dataset")
+    search_parser.add_argument("--query-cache", action="store_true",
+                               help="Keep the query embedding cache enabled")
+    search_parser.add_argument("--output", default=None,
+                               help="File the JSON results are written to (stdout if unset)")
+    quantized_parser.add_argument("--precision", nargs="+", default=["int8", "float16"],
+                                  help="Precision of the quantized codes")
+    quantized_parser.add_argument("--rescore-factor", type=int, nargs="+", default=[1, 2, 4, 8],
+                                  help="Candidates rescored per returned result")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    courses = DatabaseHelper.load_collection_data_json(courses_database)
-    memory_usage, virtual_memory_change, swap_memory_change, process_time = observe_memory_embedded_dataset_setup(courses)
+    arguments = parse_arguments()
+    if arguments.benchmark in ("ann", "quantized"):
+        if arguments.database:
+            embeddings = EmbeddingController(*create_databases(arguments.snapshot)
+                                             ).retrieve_embedded_dataset()
+        else:
+            embeddings = create_synthetic_embeddings(arguments.size, arguments.dimension)
+        generator = numpy.random.default_rng(1)
+        #queries are perturbed vectors of the embedded dataset
+        queries = embeddings[generator.integers(0, len(embeddings), arguments.queries)]
+        queries = queries + 0.1 * generator.normal(size=queries.shape).astype(numpy.float32)
+        if arguments.benchmark == "ann":
+            observations = observe_ann_index(embeddings, queries, arguments.top_k,
+                                             arguments.n_lists, arguments.n_probe)
+        else:
+            observations = observe_quantized_index(embeddings, queries, arguments.top_k,
+                                                   arguments.precision,
+                                                   arguments.rescore_factor)
+        for observation in observations:
+            print(observation)
+    elif arguments.benchmark == "search":
+        if arguments.encoder != EmbeddingController.encoder_backend:
+            EmbeddingController.configure_encoder(
+                        create_encoder(arguments.encoder, EmbeddingController.model_name))
+        if not arguments.query_cache:
+            EmbeddingController.configure_query_cache(max_entries=0)
+        template = None
+        if arguments.courses is not None:
+            with open(arguments.courses, encoding="utf-8") as file:
+                template = json.load(file)
+        results = []
+        for size in arguments.sizes:
+            courses = create_synthetic_courses(size, template)
+            generator = numpy.random.default_rng(1)
+            #queries are titles of courses of the catalog
+            queries = [courses[position]["title"]
+                       for position in generator.integers(0, size, arguments.queries)]
+            results.append(observe_semantic_search(courses, queries, arguments.top_k,
+                                                   arguments.concurrency,
+                                                   arguments.storage_format))
+        report = json.dumps({"benchmark": "search",
+                             "encoder": EmbeddingController.encoder_backend,
+                             "model_version": EmbeddingController.model_version,
+                             "storage_format": arguments.storage_format,
+                             "top_k": arguments.top_k,
+                             "queries": arguments.queries,
+                             "query_cache": arguments.query_cache,
+                             "results": results}, indent=2)
+        if arguments.output is None:
+            print(report)
+        else:
+            with open(arguments.output, "w", encoding="utf-8") as file:
+                file.write(report)
+    elif arguments.benchmark == "parallel":
+        if arguments.encoder != EmbeddingController.encoder_backend:
+            EmbeddingController.configure_encoder(
+                        create_encoder(arguments.encoder, EmbeddingController.model_name))
+        courses = create_synthetic_courses(arguments.size)
+        for observation in observe_parallel_encoding(
+                    [EmbeddingController.create_passage(MongoDBDatabase.to_json(course))
+                     for course in courses],
+                    arguments.workers, arguments.threads_per_worker, arguments.shard_size):
+            print(observation)
+    elif arguments.benchmark == "startup":
+        for observation in observe_startup(arguments.components, arguments.encoder,
+                                           arguments.repeat):
+            print(observation)
+    elif arguments.benchmark == "encoders":
+        courses_database, _ = create_databases(arguments.snapshot)
+        courses = DatabaseHelper.load_collection_data_json(courses_database)
+        for observation in observe_encoder_backends(
+                    arguments.backends,
+                    [EmbeddingController.create_passage(course) for course in courses],
+                    [course["title"] for course in courses], arguments.top_k,
+                    arguments.intra_op_threads, arguments.inter_op_threads):
+            print(observation)
+    elif arguments.benchmark == "dimension":
+        courses_database, embedded_database = create_databases(arguments.snapshot)
+        courses = DatabaseHelper.load_collection_data_json(courses_database)
+        #full dimension embeddings, truncated for each observed dimension
+        EmbeddingController.configure_embedding_dim(None)
+        controller = EmbeddingController(courses_database, embedded_database)
+        embedded_dataset = controller.create_embedding(courses)
+        embedded_queries = EmbeddingController.encode([course["title"] for course in courses])
+        for observation in observe_embedding_dimensions(embedded_dataset, embedded_queries,
+                                                        arguments.top_k, arguments.dimensions):
+            print(observation)
+    else:
+        courses_database, embedded_database = create_databases(arguments.snapshot)
+        courses = DatabaseHelper.load_collection_data_json(courses_database)
+        memory_usage, virtual_memory_change, swap_memory_change, process_time = \
+            observe_memory_embedded_dataset_setup(courses, courses_database, embedded_database)
 
-    print("Embedded Dataset Creation Memory Usage (MB): ", memory_usage)
-    print("Embedded Dataset Creation Virtual Memory Change (MB): ", virtual_memory_change)
-    print("Embedded Dataset Creation Swap Memory Change (MB): ", swap_memory_change)
-    print("Embedded Dataset Creation Execution Time (Seconds): ", process_time)
+        print("Embedded Dataset Creation Memory Usage (MB): ", memory_usage)
+        print("Embedded Dataset Creation Virtual Memory Change (MB): ", virtual_memory_change)
+        print("Embedded Dataset Creation Swap Memory Change (MB): ", swap_memory_change)
+        print("Embedded Dataset Creation Execution Time (Seconds): ", process_time)
@@ -3,26 +3,109 @@ Fast API main.py defining the API endpoint to access the semantic search module
 """
 from contextlib import asynccontextmanager
 import os
-from fastapi import FastAPI, HTTPException
+import time
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sts_module.database.mongo_db_interface import MongoDBDatabase
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from sts_module.database.database_interface import Database
+from sts_module.database.mongo_db_interface import MongoDBDatabase, MongoClientRegistry
+from sts_module.database.snapshot_database import SnapshotDatabase
 from sts_module.embedding_module.controller import EmbeddingController
-from setup import database_setup_embedded_database
+from sts_module.embedding_module.batcher import QueryEncodeBatcher
+from sts_module.index_module.vector_index import VectorIndex
+from sts_module.index_module.filters import SearchFilters
+from sts_module.index_module.hybrid_search import HybridSearch
+from sts_module.index_module.index_manager import IndexManager
+from sts_module.database.database_helper import DatabaseHelper
+from sts_module.cache_module.result_cache import ResultCache
+from sts_module.metrics_module.metrics import (Counter, Gauge, Histogram, MetricsRegistry,
+                                               request_timings, timed)
+from logger import ModuleLogger #pylint: disable=relative-beyond-top-level
+
+logger = ModuleLogger.get_logger()
+
+#metrics of the module (see /metrics), the gauges are read from the app state when scraped
+metrics = MetricsRegistry()
+request_counter: Counter = metrics.register(Counter(
+            "semanticsearch_requests_total", "Requests answered by endpoint and status code",
+            labels=("endpoint", "method", "status")))
+request_seconds: Histogram = metrics.register(Histogram(
+            "semanticsearch_request_seconds", "Time (s) spent answering a request by endpoint",
+            labels=("endpoint",)))
+stage_seconds: Histogram = metrics.register(Histogram(
+            "semanticsearch_stage_seconds",
+            "Time (s) spent in each stage of a search request (load, encode, score, hydrate)",
+            labels=("stage",)))
+index_build_seconds: Histogram = metrics.register(Histogram(
+            "semanticsearch_index_build_seconds",
+            "Time (s) spent building the search index by phase (model, update, load)",
+            labels=("phase",), buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)))
+
+def optional_env(value: str | None, cast: type):
+    """
+    Method converts an optional enviroment variable value to the given type
+
+    Args:
+        value (str | None): value of the enviroment variable
+        cast (type): type to convert the value to
+    Returns:
+        converted value (None if the enviroment variable is unset or empty)
+    """
+    return cast(value) if value else None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     "Method for executing setup code for the semantic search module"
-    url: str = f"mongodb://{os.getenv('MONGO_CONTAINER')}:{os.getenv('MONGO_PORT')}/"
-    database_setup_embedded_database(
-                url=url,
-                username=os.getenv('MONGO_USER'),
-                password=os.getenv('MONGO_PASSWORD'),
-                database_auth_mechanism=os.getenv('MONGO_AUTH_MECHANISM'),
-                database_name=os.getenv('MONGO_CHATBOT_DATABASE'),
-                courses_collection_name=os.getenv('MONGO_COURSE_COLLECTION'),
-                embedded_dataset_collection_name=os.getenv('MONGO_EMBEDDED_DATASET_COLLECTION')
-            )
+    #a misconfigured encoder backend fails the startup instead of the first query
+    EmbeddingController.check_encoder()
+    #every database object shares one pooled client per server
+    MongoClientRegistry.configure(max_pool_size=int(os.getenv('MONGO_MAX_POOL_SIZE', '100')),
+                                  min_pool_size=int(os.getenv('MONGO_MIN_POOL_SIZE', '0')))
+    EmbeddingController.configure_embedding_dim(optional_env(os.getenv('EMBEDDING_DIM'), int))
+    EmbeddingController.configure_parallel_encoding(
+                workers=int(os.getenv('EMBEDDING_WORKERS', '1')),
+                threads_per_worker=optional_env(os.getenv('EMBEDDING_WORKER_THREADS'), int),
+                shard_size=int(os.getenv('EMBEDDING_SHARD_SIZE', '256')),
+                bucket_shards=int(os.getenv('EMBEDDING_BUCKET_SHARDS', '16')))
+    #the embedding workers (and their model replicas) are reused by every index rebuild
+    EmbeddingController.start_encode_workers()
+    EmbeddingController.configure_query_cache(
+                max_entries=int(os.getenv('QUERY_CACHE_MAX_ENTRIES', '1024')),
+                max_bytes=optional_env(os.getenv('QUERY_CACHE_MAX_BYTES'), int),
+                ttl=optional_env(os.getenv('QUERY_CACHE_TTL'), float))
+    #rankings of repeated requests, keyed by the version of the search index
+    app.state.result_cache = ResultCache(
+                max_entries=int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '1024')),
+                ttl=optional_env(os.getenv('RESULT_CACHE_TTL'), float),
+                depth=int(os.getenv('RESULT_CACHE_DEPTH', '50')))
+    #build the process resident indexes once, so queries do not reload the dataset, and
+    #rebuild them in the background when the courses catalog changes
+    app.state.index_manager = IndexManager(
+                build=build_search_index,
+                fingerprint=catalog_change_marker,
+                poll_interval=optional_env(os.getenv('INDEX_POLL_INTERVAL', '30'), float),
+                logger=logger,
+                full_fingerprint=catalog_fingerprint,
+                retry_delay=float(os.getenv('INDEX_RETRY_DELAY', '1')),
+                max_retry_delay=float(os.getenv('INDEX_RETRY_MAX_DELAY', '60')))
+    #the first index is built in the background, so the server accepts requests (and
+    #answers /healthz) immediately; searches return 503 until the index is ready (/readyz)
+    app.state.index_manager.trigger()
+    app.state.index_manager.start()
+    logger.info("(Set Up) Building Search Index in the Background")
+    #group concurrent query embeddings into batched calls to the embedding model
+    app.state.query_batcher = QueryEncodeBatcher(
+                EmbeddingController.create_query_embeddings,
+                max_batch_size=int(os.getenv('QUERY_BATCH_MAX_SIZE', '32')),
+                max_wait_ms=float(os.getenv('QUERY_BATCH_MAX_WAIT_MS', '2')))
+    await app.state.query_batcher.start()
     yield
+    await app.state.query_batcher.stop()
+    app.state.index_manager.stop()
+    EmbeddingController.stop_encode_workers()
+    MongoClientRegistry.close_all()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -34,51 +117,644 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
-    allow_methods=["GET"],
+    allow_methods=["GET", "POST", "DELETE"],
     allow_headers=["*"],
 )
 
-def get_top_k_courses(query: str, k: int) -> list[dict]:
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
     """
-    Method calls the semantic search module to calling the `courses_semantic_search`
-    to obtain the top k courses with the greatest semantic relation to the users query.
+    Method records the count, duration and stage timings of every request, returning the
+    stage timings of the request in its Server-Timing header
 
-    Args: 
+    Args:
+        request (Request): incoming request
+        call_next: next handler of the request
+    Returns:
+        Response: response of the request
+    """
+    timings: dict = {}
+    token = request_timings.set(timings)
+    prev_time = time.perf_counter()
+    status: int = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        total: float = time.perf_counter() - prev_time
+        request_timings.reset(token)
+        #the route template is used as label, so the queries do not create new series
+        route = request.scope.get("route")
+        endpoint: str = getattr(route, "path", "unmatched")
+        request_counter.inc((endpoint, request.method, str(status)))
+        request_seconds.observe(total, (endpoint,))
+        for stage, seconds in timings.items():
+            stage_seconds.observe(seconds, (stage,))
+    response.headers["Server-Timing"] = ", ".join(
+                [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()] +
+                [f"total;dur={total * 1000:.2f}"])
+    return response
+
+
+def search_index_gauge(read) -> dict:
+    """
+    Method reads a gauge of the current search index
+
+    Args:
+        read (Callable): function reading the value from the search index
+    Returns:
+        dict: value of the gauge (empty if no search index has been built)
+    """
+    search_index: HybridSearch | None = get_search_index()
+    return {(): read(search_index)} if search_index is not None else {}
+
+
+def cache_gauge(field: str) -> dict:
+    """
+    Method reads a statistic of the query embedding and search result caches
+
+    Args:
+        field (str): name of the statistic (see LRUCache.stats)
+    Returns:
+        dict: value of the statistic of each cache
+    """
+    values: dict = {("query_embeddings",): EmbeddingController.query_cache.stats()[field]}
+    result_cache: ResultCache | None = getattr(app.state, "result_cache", None)
+    if result_cache is not None:
+        values[("results",)] = result_cache.stats()[field]
+    return values
+
+
+metrics.register(Gauge("semanticsearch_index_ready", "Whether the search index is ready",
+                       lambda: {(): get_search_index() is not None}))
+metrics.register(Gauge("semanticsearch_index_version", "Version of the search index",
+                       lambda: search_index_gauge(lambda _: app.state.index_manager.version)))
+metrics.register(Gauge("semanticsearch_index_courses", "Courses stored inside the search index",
+                       lambda: search_index_gauge(lambda index: index.size)))
+metrics.register(Gauge("semanticsearch_index_vector_bytes",
+                       "Memory (bytes) used by the vectors of the search index",
+                       lambda: search_index_gauge(lambda index: index.vector_index.nbytes)))
+metrics.register(Gauge("semanticsearch_index_lexical_terms",
+                       "Distinct terms stored inside the lexical index",
+                       lambda: search_index_gauge(lambda index: index.lexical_index.terms)))
+for cache_field, cache_description in (("entries", "Entries stored inside each cache"),
+                                       ("bytes", "Memory (bytes) used by each cache"),
+                                       ("hit_ratio", "Hit ratio of each cache"),
+                                       ("evictions", "Entries evicted from each cache")):
+    metrics.register(Gauge(f"semanticsearch_cache_{cache_field}", cache_description,
+                           lambda field=cache_field: cache_gauge(field), labels=("cache",)))
+
+class QueryFilters(BaseModel):
+    """
+    Class defines the metadata filters of a semantic search request
+
+    Fields:
+        course_type (list[str] | None): Course types a returned course must have one of
+        max_learning_hours (float | None): Maximum learning hours of a returned course
+        tags (list[str] | None): Tags a returned course must all have
+        exclude_tags (list[str] | None): Tags a returned course must not have any of
+    """
+    course_type: list[str] | None = None
+    max_learning_hours: float | None = None
+    tags: list[str] | None = None
+    exclude_tags: list[str] | None = None
+
+
+class BatchQuery(BaseModel):
+    """
+    Class defines a single query of a batched semantic search request
+
+    Fields:
         query (str): User Input query to obtain courses
-        k (int): Top number of courses to be returned by the semantic search module
+        k (int): Top number of courses to be returned for the query
+        filters (QueryFilters | None): metadata filters of the query
+        mode (str): search mode of the query ("semantic", "lexical" or "hybrid")
+    """
+    query: str
+    k: int
+    filters: QueryFilters | None = None
+    mode: str = "semantic"
 
-    Returns: 
-        list[dict]: list of top k courses (information stored as a dict object)
+
+class BatchSearchRequest(BaseModel):
     """
+    Class defines the body of a batched semantic search request
+
+    Fields:
+        queries (list[BatchQuery]): queries to perform semantic search for
+    """
+    queries: list[BatchQuery]
+
+
+def create_database(collection: str) -> Database:
+    """
+    Method creates a Database Object connecting to a collection of the applications database,
+    stored on the MongoDB Server or (STORAGE_BACKEND "snapshot") in the local snapshot
+    directory SNAPSHOT_PATH
+
+    Args:
+        collection (str): Name of the collection
+    Returns:
+        Database: Database Object connecting to the collection
+    Raises:
+        ValueError: If the storage backend is not supported
+    """
+    storage_backend: str = os.getenv('STORAGE_BACKEND', 'mongodb')
+    if storage_backend == "snapshot":
+        return SnapshotDatabase(os.getenv('SNAPSHOT_PATH', 'snapshot'), collection,
+                                database=os.getenv('MONGO_CHATBOT_DATABASE') or "snapshot")
+    if storage_backend != "mongodb":
+        raise ValueError(f"Unsupported storage backend: {storage_backend}")
     url: str = f"mongodb://{os.getenv('MONGO_CONTAINER')}:{os.getenv('MONGO_PORT')}/"
-    #Database Object connecting to the Courses Collection
-    courses_database = MongoDBDatabase(
+    return MongoDBDatabase(
                 url=url,
                 username=os.getenv('MONGO_USER'),
                 password=os.getenv('MONGO_PASSWORD'),
                 auth_mechanism=os.getenv('MONGO_AUTH_MECHANISM'),
                 database=os.getenv('MONGO_CHATBOT_DATABASE'),
-                collection=os.getenv('MONGO_COURSE_COLLECTION'))
+                collection=collection)
+
+
+def create_embedding_controller() -> EmbeddingController:
+    """
+    Method creates an EmbeddingController connected to the courses and embedded dataset
+    collections of the applications database
+
+    Returns:
+        EmbeddingController: controller for the applications database
+    """
+    #Database Object connecting to the Courses Collection
+    courses_database = create_database(os.getenv('MONGO_COURSE_COLLECTION'))
     #Database Object connecting to the Embedded Dataset Collection
-    embedded_database = MongoDBDatabase(
-                    url=url,
-                    username=os.getenv('MONGO_USER'),
-                    password=os.getenv('MONGO_PASSWORD'),
-                    auth_mechanism=os.getenv('MONGO_AUTH_MECHANISM'),
-                    database=os.getenv('MONGO_CHATBOT_DATABASE'),
-                    collection=os.getenv('MONGO_EMBEDDED_DATASET_COLLECTION'))
-    controller = EmbeddingController(courses_database, embedded_database)
-    return controller.courses_semantic_search(query, k)
+    embedded_database = create_database(os.getenv('MONGO_EMBEDDED_DATASET_COLLECTION'))
+    return EmbeddingController(courses_database, embedded_database,
+                               storage_format=os.getenv('EMBEDDED_DATASET_FORMAT', 'binary'),
+                               storage_dtype=os.getenv('EMBEDDED_DATASET_DTYPE', 'float32'),
+                               hydration=os.getenv('HYDRATION_MODE', 'query'),
+                               hydration_fields=[field.strip() for field in
+                                                 os.getenv('HYDRATION_FIELDS', '').split(',')
+                                                 if field.strip()] or None)
+
+
+def vector_index_options() -> dict:
+    """
+    Method returns the options of the configured vector index type (VECTOR_INDEX_TYPE)
+
+    Returns:
+        dict: options passed to the vector index
+    """
+    index_type: str = os.getenv('VECTOR_INDEX_TYPE', 'exact')
+    if index_type == "ivf":
+        return {"n_lists": optional_env(os.getenv('IVF_N_LISTS'), int),
+                "n_probe": int(os.getenv('IVF_N_PROBE', '8'))}
+    if index_type == "quantized":
+        return {"precision": os.getenv('QUANTIZED_PRECISION', 'int8'),
+                "rescore_factor": int(os.getenv('QUANTIZED_RESCORE_FACTOR', '4')),
+                "rescore_path": os.getenv('QUANTIZED_RESCORE_PATH') or None}
+    return {}
+
+
+def create_search_index() -> HybridSearch:
+    """
+    Method loads the vector index (VECTOR_INDEX_TYPE) of the embedded dataset and builds the
+    lexical (BM25) index of the same courses
+
+    Returns:
+        HybridSearch: semantic, lexical and hybrid search over the loaded courses
+    """
+    index_database: Database = create_database(os.getenv(
+                'MONGO_EMBEDDED_INDEX_COLLECTION',
+                f"{os.getenv('MONGO_EMBEDDED_DATASET_COLLECTION')}_index"))
+    vector_index: VectorIndex = create_embedding_controller().load_vector_index(
+                index_type=os.getenv('VECTOR_INDEX_TYPE', 'exact'),
+                #the states of approximate indexes are not persisted to a read only store
+                index_database=None if index_database.read_only else index_database,
+                **vector_index_options())
+    return HybridSearch(vector_index,
+                        fusion=os.getenv('HYBRID_FUSION', 'rrf'),
+                        semantic_weight=float(os.getenv('HYBRID_SEMANTIC_WEIGHT', '0.5')),
+                        candidates=int(os.getenv('HYBRID_CANDIDATES', '50')))
+
+
+def build_search_index() -> HybridSearch:
+    """
+    Method incrementally updates the embedded dataset from the courses catalog (only new or
+    changed courses are embedded) and builds the search index of the updated catalog
+
+    Returns:
+        HybridSearch: semantic, lexical and hybrid search over the courses catalog
+    """
+    #the model is loaded before the index is ready, so the first query does not load it
+    prev_time = time.perf_counter()
+    EmbeddingController.get_model()
+    index_build_seconds.observe(time.perf_counter() - prev_time, ("model",))
+    prev_time = time.perf_counter()
+    try:
+        #a read only store (a snapshot) already holds the embedded dataset of its catalog
+        if not create_database(os.getenv('MONGO_EMBEDDED_DATASET_COLLECTION')).read_only:
+            changes: dict = create_embedding_controller().update_embedded_dataset()
+            logger.info("(Index) Embedded Dataset Updated: " +
+                        ", ".join(f"{count} {change}" for change, count in changes.items()))
+    except Exception as e: #pylint:disable=broad-exception-caught
+        #the index is built from the stored embedded dataset
+        logger.error("(Index) Failed to Update Embedded Dataset: " + str(e))
+    index_build_seconds.observe(time.perf_counter() - prev_time, ("update",))
+    prev_time = time.perf_counter()
+    search_index: HybridSearch = create_search_index()
+    index_build_seconds.observe(time.perf_counter() - prev_time, ("load",))
+    return search_index
+
+
+def catalog_change_marker() -> str:
+    """
+    Method returns the change marker of the courses collection, polled to detect catalog
+    changes without scanning the collection
+
+    Returns:
+        str: change marker of the courses collection
+    """
+    return DatabaseHelper.catalog_change_marker(
+                create_database(os.getenv('MONGO_COURSE_COLLECTION')))
+
+
+def catalog_fingerprint() -> str:
+    """
+    Method returns the full fingerprint of the courses collection (every document is
+    hashed), only computed when a refresh of the search index is requested
+
+    Returns:
+        str: fingerprint of the courses collection
+    """
+    return DatabaseHelper.catalog_fingerprint(
+                create_database(os.getenv('MONGO_COURSE_COLLECTION')))
+
+
+def get_search_index() -> HybridSearch | None:
+    """
+    Method returns the current search index. Callers keep the returned index for the whole
+    request, so a concurrent rebuild never changes the index a request is using
+
+    Returns:
+        HybridSearch | None: current search index (None if no index has been built)
+    """
+    index_manager: IndexManager | None = getattr(app.state, "index_manager", None)
+    return index_manager.current if index_manager is not None else None
+
+
+def search_and_cache(search_index: HybridSearch, version: int, query: str,
+                     embedded_query, k: int, filters: SearchFilters | None,
+                     mode: str) -> list[dict]:
+    """
+    Method ranks the courses of a query with the search index and caches the ranking (at
+    least RESULT_CACHE_DEPTH deep, so later requests for a smaller k are served from it)
+
+    Args:
+        search_index (HybridSearch): search index answering the request
+        version (int): version of the search index
+        query (str): User Input query to obtain courses
+        embedded_query (numpy.ndarray | None): embedded query (None for "lexical" mode)
+        k (int): Top number of courses to be returned by the semantic search module
+        filters (SearchFilters | None): filters the returned courses must match
+        mode (str): search mode ("semantic", "lexical" or "hybrid")
+    Returns:
+        list[dict]: list of top k courses (information stored as a dict object)
+    """
+    result_cache: ResultCache | None = getattr(app.state, "result_cache", None)
+    if result_cache is None:
+        return search_index.search(query, embedded_query, k, filters, mode)
+    depth: int = max(k, result_cache.depth)
+    with timed("score"):
+        positions, _ = search_index.top_k_indices_batch([query], [embedded_query], [depth],
+                                                        [filters], [mode])[0]
+    result_cache.put(version, ResultCache.key(query, filters.key() if filters else None, mode),
+                     positions, depth)
+    with timed("hydrate"):
+        return search_index.vector_index.courses_at(positions[:k])
+
+
+def get_ready_search_index() -> tuple:
+    """
+    Method returns the current search index and its version, read together (so cached
+    rankings match the index). Requests arriving before the first index is built are
+    rejected instead of waiting for the cold start.
+
+    Returns:
+        tuple (HybridSearch | None, int): (search index, version) ((None, 0) if the index
+                                          manager is not running)
+    Raises:
+        HTTPException: If the index manager is running but the search index is not ready
+    """
+    index_manager: IndexManager | None = getattr(app.state, "index_manager", None)
+    if index_manager is None:
+        return None, 0
+    search_index, version = index_manager.snapshot()
+    if search_index is None:
+        raise HTTPException(status_code=503, detail="Search index is not ready",
+                            headers={"Retry-After": "5"})
+    return search_index, version
+
+
+def validate_search_mode(mode: str) -> None:
+    """
+    Method validates the search mode of a request
+
+    Args:
+        mode (str): search mode of the request
+    Raises:
+        HTTPException: If the search mode is not supported
+    """
+    if mode not in HybridSearch.search_modes:
+        raise HTTPException(status_code=422,
+                            detail="Search mode must be one of: " +
+                                   ", ".join(HybridSearch.search_modes))
+
+
+def create_search_filters(filters: QueryFilters | None) -> SearchFilters | None:
+    """
+    Method converts the metadata filters of a request to the filters of the vector index
+
+    Args:
+        filters (QueryFilters | None): metadata filters of the request
+    Returns:
+        SearchFilters | None: filters of the search (None if no filter is applied)
+    Raises:
+        HTTPException: If the maximum learning hours are negative
+    """
+    if filters is None:
+        return None
+    if filters.max_learning_hours is not None and filters.max_learning_hours < 0:
+        raise HTTPException(status_code=422,
+                            detail="Maximum learning hours must not be negative")
+    search_filters = SearchFilters(course_types=filters.course_type,
+                                   max_learning_hours=filters.max_learning_hours,
+                                   required_tags=filters.tags,
+                                   excluded_tags=filters.exclude_tags)
+    return None if search_filters.is_empty() else search_filters
+
+
+def get_top_k_courses(query: str, k: int, filters: SearchFilters | None = None,
+                      mode: str = "semantic") -> list[dict]:
+    """
+    Method calls the semantic search module to obtain the top k courses with the
+    greatest semantic relation to the users query. The process resident search index
+    is used when loaded, otherwise the method falls back to `courses_semantic_search`
+    (the indexes are built for the request in the "lexical" and "hybrid" modes)
+
+    Args: 
+        query (str): User Input query to obtain courses
+        k (int): Top number of courses to be returned by the semantic search module
+        filters (SearchFilters | None): filters the returned courses must match
+        mode (str): search mode ("semantic", "lexical" or "hybrid")
+
+    Returns: 
+        list[dict]: list of top k courses (information stored as a dict object)
+    """
+    search_index: HybridSearch | None = get_search_index()
+    if search_index is None:
+        if mode == "semantic":
+            return create_embedding_controller().courses_semantic_search(
+                        query, k, filters, timings=request_timings.get())
+        with timed("load"):
+            search_index = create_search_index()
+    embedded_query = None
+    if mode != "lexical":
+        with timed("encode"):
+            embedded_query = EmbeddingController.create_query_embedding(query)
+    with timed("score"):
+        return search_index.search(query, embedded_query, k, filters, mode)
+
+
+def get_top_k_courses_batch(queries: list[BatchQuery]) -> list[list[dict]]:
+    """
+    Method obtains the top k courses of a batch of queries. Every query (except those of
+    the "lexical" mode) is embedded with a single batched call to the embedding model and
+    scored against the vector index with a single matrix-matrix product.
+
+    Args:
+        queries (list[BatchQuery]): queries (and their k) to obtain courses for
+
+    Returns:
+        list[list[dict]]: list of top k courses of each query (in the order of the queries)
+    """
+    filters = [create_search_filters(query.filters) for query in queries]
+    search_index, _ = get_ready_search_index()
+    if search_index is None:
+        return [get_top_k_courses(query=query.query, k=query.k, filters=query_filters,
+                                  mode=query.mode)
+                for query, query_filters in zip(queries, filters)]
+    dense = [row for row, query in enumerate(queries) if query.mode != "lexical"]
+    embedded_queries: list = [None] * len(queries)
+    if len(dense) > 0:
+        with timed("encode"):
+            embeddings = EmbeddingController.create_query_embeddings(
+                                                    [queries[row].query for row in dense])
+        for row, embedding in zip(dense, embeddings):
+            embedded_queries[row] = embedding
+    with timed("score"):
+        rankings: list = search_index.top_k_indices_batch(
+                    [query.query for query in queries], embedded_queries,
+                    [query.k for query in queries], filters, [query.mode for query in queries])
+    with timed("hydrate"):
+        return [search_index.vector_index.courses_at(positions) for positions, _ in rankings]
+
+
+@app.post("/search/batch")
+def batch_search(request: BatchSearchRequest) -> list[list[dict]]:
+    """
+    Method is the API Endpoint function to perform semantic search for a batch of queries
+
+    Args:
+        request (BatchSearchRequest): queries (and their k) to obtain courses for
+    Returns:
+        list[list[dict]]: list of top k courses of each query (in the order of the queries)
+    """
+    for query in request.queries:
+        if query.query == "":
+            raise HTTPException(status_code=422, detail="Query String must not be empty")
+        if query.k <= 0:
+            raise HTTPException(status_code=422,
+                                detail="Number of courses returned must be greater than zero")
+        validate_search_mode(query.mode)
+    if len(request.queries) == 0:
+        return []
+    return get_top_k_courses_batch(request.queries)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint() -> PlainTextResponse:
+    """
+    Method is the API Endpoint function exposing the metrics of the module in the
+    Prometheus text format
+
+    Returns:
+        PlainTextResponse: text exposition of the metrics
+    """
+    return PlainTextResponse(metrics.render(), media_type=MetricsRegistry.content_type)
+
+
+@app.get("/healthz")
+def healthz() -> dict:
+    """
+    Method is the API Endpoint function of the liveness probe (the server is running, the
+    search index may still be building)
+
+    Returns:
+        dict: status of the server
+    """
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz() -> dict:
+    """
+    Method is the API Endpoint function of the readiness probe
+
+    Returns:
+        dict: readiness, version and number of courses of the search index
+    Raises:
+        HTTPException: (503) If the search index is not ready
+    """
+    index_manager: IndexManager | None = getattr(app.state, "index_manager", None)
+    if index_manager is None:
+        raise HTTPException(status_code=503,
+                            detail={"ready": False, "error": "Search index manager is not running"})
+    search_index, version = index_manager.snapshot()
+    if search_index is None:
+        raise HTTPException(status_code=503, detail={"ready": False,
+                                                     "failures": index_manager.failures,
+                                                     "last_error": index_manager.last_error})
+    return {"ready": True, "version": version, "courses": search_index.size}
+
+
+@app.get("/cache/query-embeddings")
+def query_embedding_cache_stats() -> dict:
+    """
+    Method is the API Endpoint function returning the query embedding cache statistics
+
+    Returns:
+        dict: entries, bytes, hits, misses, hit ratio and evictions of the cache
+    """
+    return EmbeddingController.query_cache.stats()
+
+
+@app.delete("/cache/query-embeddings")
+def flush_query_embedding_cache() -> dict:
+    """
+    Method is the API Endpoint function flushing the query embedding cache
+
+    Returns:
+        dict: number of cached query embeddings removed
+    """
+    return {"flushed": EmbeddingController.query_cache.clear()}
+
+
+@app.get("/cache/results")
+def result_cache_stats() -> dict:
+    """
+    Method is the API Endpoint function returning the search result cache statistics
+
+    Returns:
+        dict: entries, bytes, hits, misses, hit ratio, evictions, depth, index version and
+              invalidations of the cache
+    """
+    result_cache: ResultCache | None = getattr(app.state, "result_cache", None)
+    if result_cache is None:
+        raise HTTPException(status_code=503, detail="Search result cache is not running")
+    return result_cache.stats()
+
+
+@app.delete("/cache/results")
+def flush_result_cache() -> dict:
+    """
+    Method is the API Endpoint function flushing the search result cache
+
+    Returns:
+        dict: number of cached rankings removed
+    """
+    result_cache: ResultCache | None = getattr(app.state, "result_cache", None)
+    if result_cache is None:
+        raise HTTPException(status_code=503, detail="Search result cache is not running")
+    return {"flushed": result_cache.clear()}
+
+
+@app.get("/index")
+def search_index_stats() -> dict:
+    """
+    Method is the API Endpoint function returning the state of the search index
+
+    Returns:
+        dict: number of courses, index version, catalog fingerprint and rebuild statistics
+    """
+    search_index: HybridSearch | None = get_search_index()
+    index_manager: IndexManager | None = getattr(app.state, "index_manager", None)
+    stats: dict = index_manager.stats() if index_manager is not None else {}
+    stats["courses"] = search_index.size if search_index is not None else 0
+    return stats
+
+
+@app.post("/index/refresh", status_code=202)
+def refresh_search_index(force: bool = False) -> dict:
+    """
+    Method is the API Endpoint function scheduling a check of the full fingerprint of the
+    courses catalog in the background, rebuilding the search index if the catalog has
+    changed (queries keep using the current index until the new index is swapped in)
+
+    Args:
+        force (bool): rebuild the search index even if the catalog has not changed
+    Returns:
+        dict: version of the current search index
+    """
+    index_manager: IndexManager | None = getattr(app.state, "index_manager", None)
+    if index_manager is None:
+        raise HTTPException(status_code=503, detail="Search index manager is not running")
+    index_manager.trigger(force)
+    return {"scheduled": True, "version": index_manager.version}
+
+
+@app.post("/index/snapshot")
+def write_snapshot() -> dict:
+    """
+    Method is the API Endpoint function writing the courses and embedded dataset collections
+    to the local snapshot directory SNAPSHOT_PATH, from which replicas can start without the
+    MongoDB Server (STORAGE_BACKEND "snapshot")
+
+    Returns:
+        dict: path, creation time and collections (documents, vectors and fingerprint) of
+              the snapshot
+    Raises:
+        HTTPException: (409) If SNAPSHOT_PATH is unset or the storage is read only
+    """
+    snapshot_path: str | None = os.getenv('SNAPSHOT_PATH')
+    if not snapshot_path:
+        raise HTTPException(status_code=409, detail="SNAPSHOT_PATH is not configured")
+    databases: list[Database] = [create_database(os.getenv('MONGO_COURSE_COLLECTION')),
+                                 create_database(os.getenv('MONGO_EMBEDDED_DATASET_COLLECTION'))]
+    if any(database.read_only for database in databases):
+        raise HTTPException(status_code=409, detail="Storage is already a read only snapshot")
+    manifest: dict = SnapshotDatabase.write_snapshot(snapshot_path, databases)
+    return {"path": snapshot_path, **manifest}
 
 
 @app.get("/{query}/{k}")
-def main(query: str, k: int) -> list[dict]:
+async def main(query: str, k: int, course_type: list[str] | None = Query(None),
+               max_learning_hours: float | None = None, tags: list[str] | None = Query(None),
+               exclude_tags: list[str] | None = Query(None),
+               mode: str = "semantic") -> list[dict]:
     """
-    Method is the API Endpoint function to perform semantic search
+    Method is the API Endpoint function to perform semantic search. Rankings are cached
+    (see ResultCache), so a repeated request is answered without embedding the query;
+    otherwise the query embedding is batched with the queries of concurrent requests
+    (see QueryEncodeBatcher)
 
     Args:
         query (str): User Input query to obtain courses
         k (int): Top number of courses to be returned by the semantic search module
+        course_type (list[str] | None): Course types a returned course must have one of
+        max_learning_hours (float | None): Maximum learning hours of a returned course
+        tags (list[str] | None): Tags a returned course must all have
+        exclude_tags (list[str] | None): Tags a returned course must not have any of
+        mode (str): search mode ("semantic", "lexical" or "hybrid")
     Returns: 
         list[dict]: list of top k courses (information stored as a dict object) 
     """
@@ -87,4 +763,26 @@ def main(query: str, k: int) -> list[dict]:
     if k <= 0:
         raise HTTPException(status_code=422,
                             detail="Number of courses returned must be greater than zero")
-    return get_top_k_courses(query=query, k=k)
+    filters = create_search_filters(QueryFilters(course_type=course_type,
+                                                 max_learning_hours=max_learning_hours,
+                                                 tags=tags, exclude_tags=exclude_tags))
+    validate_search_mode(mode)
+    search_index, version = get_ready_search_index()
+    query_batcher: QueryEncodeBatcher | None = getattr(app.state, "query_batcher", None)
+    if search_index is None or query_batcher is None:
+        return await run_in_threadpool(get_top_k_courses, query=query, k=k, filters=filters,
+                                       mode=mode)
+    result_cache: ResultCache | None = getattr(app.state, "result_cache", None)
+    if result_cache is not None:
+        positions = result_cache.get(version, ResultCache.key(
+                        query, filters.key() if filters else None, mode), k)
+        if positions is not None:
+            with timed("hydrate"):
+                return search_index.vector_index.courses_at(positions)
+    #lexical queries are not embedded
+    embedded_query = None
+    if mode != "lexical":
+        with timed("encode"):
+            embedded_query = await query_batcher.encode(query)
+    return await run_in_threadpool(search_and_cache, search_index, version, query,
+                                   embedded_query, k, filters, mode)
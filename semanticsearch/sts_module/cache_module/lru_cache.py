@@ -0,0 +1,127 @@
+"""
+Script contains the LRUCache Class, a thread safe bounded cache used by the Semantic Search
+Module to avoid repeating expensive work (e.g. embedding the same query)
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class LRUCache:
+    """
+    Class provides a thread safe Least Recently Used cache bounded by the number of entries
+    and (optionally) the total size in bytes of the stored values, where entries can expire
+    after a time to live. Hit, miss and eviction counters are recorded for monitoring.
+
+    Attributes:
+        max_entries (int): Maximum number of entries stored in the cache
+        max_bytes (int | None): Maximum total size (bytes) of stored values (unbounded if None)
+        ttl (float | None): Seconds an entry remains valid after insertion (no expiry if None)
+    """
+    def __init__(self, max_entries: int, max_bytes: int | None = None, ttl: float | None = None,
+                 sizeof: Callable[[Any], int] | None = None):
+        """
+        Initalising method for the LRUCache Class
+
+        Args:
+            max_entries (int): Maximum number of entries stored in the cache
+            max_bytes (int | None): Maximum total size (bytes) of stored values
+            ttl (float | None): Seconds an entry remains valid after insertion
+            sizeof (Callable | None): Function returning the size (bytes) of a value, required
+                                      to bound the cache by size (values have size 0 if None)
+        """
+        self.max_entries: int = max_entries
+        self.max_bytes: int | None = max_bytes
+        self.ttl: float | None = ttl
+        self.__sizeof: Callable[[Any], int] = sizeof or (lambda value: 0)
+        self.__entries: OrderedDict = OrderedDict()
+        self.__bytes: int = 0
+        self.__lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        """
+        Method returns the value stored for the key, marking it as most recently used
+
+        Args:
+            key (Hashable): key of the entry
+        Returns:
+            Any | None: stored value (None if the key is not cached or has expired)
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and self.ttl is not None \
+                    and time.monotonic() - entry[1] > self.ttl:
+                self.__remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Method stores a value for the key, evicting the least recently used entries
+        until the cache is within its bounds
+
+        Args:
+            key (Hashable): key of the entry
+            value (Any): value to store
+        """
+        size: int = self.__sizeof(value)
+        if self.max_entries <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+            return
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove(key)
+            self.__entries[key] = (value, time.monotonic(), size)
+            self.__bytes += size
+            while len(self.__entries) > self.max_entries or \
+                    (self.max_bytes is not None and self.__bytes > self.max_bytes):
+                self.__remove(next(iter(self.__entries)))
+                self.evictions += 1
+
+    def clear(self) -> int:
+        """
+        Method removes every entry stored in the cache
+
+        Returns:
+            int: number of entries removed
+        """
+        with self.__lock:
+            count: int = len(self.__entries)
+            self.__entries.clear()
+            self.__bytes = 0
+            return count
+
+    def stats(self) -> dict:
+        """
+        Method returns the current size and counters of the cache
+
+        Returns:
+            dict: entries, bytes, hits, misses, hit ratio and evictions of the cache
+        """
+        with self.__lock:
+            lookups: int = self.hits + self.misses
+            return {"entries": len(self.__entries),
+                    "bytes": self.__bytes,
+                    "max_entries": self.max_entries,
+                    "max_bytes": self.max_bytes,
+                    "ttl": self.ttl,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "hit_ratio": self.hits / lookups if lookups > 0 else 0.0,
+                    "evictions": self.evictions}
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __remove(self, key: Hashable) -> None:
+        """Method removes an entry (the lock must be held by the caller)"""
+        _, _, size = self.__entries.pop(key)
+        self.__bytes -= size
@@ -0,0 +1,134 @@
+"""
+Script contains the ResultCache Class, caching the ranked courses of search requests so
+repeated requests (e.g. retries) are answered without embedding the query or scoring the index
+"""
+import threading
+from typing import Hashable
+import numpy
+from .lru_cache import LRUCache
+
+
+class ResultCache:
+    """
+    Class caches the ranking (positions of the courses inside the search index) of each
+    normalised query, filters and search mode. Rankings are stored at least `depth` deep, so
+    a request for any smaller k is answered by a prefix of the cached ranking.
+
+    Positions are only valid for the index they were ranked by, so entries are keyed by the
+    version of the search index and the cache is emptied when a new version is seen.
+
+    Attributes:
+        depth (int): Minimum number of positions stored per ranking
+        version (int | None): Version of the search index of the cached rankings
+    """
+    def __init__(self, max_entries: int, ttl: float | None = None, depth: int = 50):
+        """
+        Initalising method for the ResultCache Class
+
+        Args:
+            max_entries (int): Maximum number of cached rankings (0 disables caching)
+            ttl (float | None): Seconds a cached ranking remains valid
+            depth (int): Minimum number of positions stored per ranking
+        """
+        self.depth: int = depth
+        self.version: int | None = None
+        self.invalidations: int = 0
+        #a ranking cached less deep than a request is a miss of the request
+        self.hits: int = 0
+        self.misses: int = 0
+        self.__cache: LRUCache = LRUCache(max_entries=max_entries, ttl=ttl,
+                                          sizeof=lambda entry: entry[0].nbytes)
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str, filters_key: tuple | None, mode: str) -> tuple:
+        """
+        Method returns the cache key of a request
+
+        Args:
+            query (str): query text (repeated whitespace is collapsed)
+            filters_key (tuple | None): hashable representation of the filters of the request
+            mode (str): search mode of the request
+        Returns:
+            tuple: key of the request
+        """
+        return (" ".join(query.split()), filters_key, mode)
+
+    def __check_version(self, version: int) -> bool:
+        """
+        Method empties the cache when a newer version of the search index is seen, returning
+        False for a version older than the cached rankings (e.g. a request which started
+        before the index was swapped)
+        """
+        with self.__lock:
+            if self.version is not None and version < self.version:
+                return False
+            if version != self.version:
+                if self.version is not None:
+                    self.__cache.clear()
+                    self.invalidations += 1
+                self.version = version
+            return True
+
+    def get(self, version: int, key: Hashable, top_k: int) -> numpy.ndarray | None:
+        """
+        Method returns the top k positions of a cached ranking
+
+        Args:
+            version (int): version of the search index answering the request
+            key (Hashable): key of the request (see `key`)
+            top_k (int): Number of top related courses requested
+        Returns:
+            numpy.ndarray | None: top k positions (None if the ranking is not cached deep enough)
+        """
+        entry = self.__cache.get((version, key)) if self.__check_version(version) else None
+        #a ranking shorter than its depth holds every matching course
+        hit: bool = entry is not None and (top_k <= entry[1] or len(entry[0]) < entry[1])
+        #the counters are updated by concurrent requests
+        with self.__lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry[0][:top_k] if hit else None
+
+    def put(self, version: int, key: Hashable, positions: numpy.ndarray, depth: int) -> None:
+        """
+        Method caches a ranking
+
+        Args:
+            version (int): version of the search index which ranked the courses
+            key (Hashable): key of the request (see `key`)
+            positions (numpy.ndarray): ranked positions of the courses (best first)
+            depth (int): Number of positions requested from the index
+        """
+        if not self.__check_version(version):
+            return
+        positions = numpy.array(positions, dtype=numpy.int64)
+        positions.setflags(write=False)
+        self.__cache.put((version, key), (positions, depth))
+
+    def clear(self) -> int:
+        """
+        Method removes every cached ranking
+
+        Returns:
+            int: number of rankings removed
+        """
+        return self.__cache.clear()
+
+    def stats(self) -> dict:
+        """
+        Method returns the current size and counters of the cache
+
+        Returns:
+            dict: entries, bytes, hits, misses, hit ratio, evictions, depth, index version
+                  and number of invalidations of the cache
+        """
+        stats: dict = self.__cache.stats()
+        lookups: int = self.hits + self.misses
+        stats.update({"hits": self.hits, "misses": self.misses,
+                      "hit_ratio": self.hits / lookups if lookups > 0 else 0.0,
+                      "depth": self.depth, "version": self.version,
+                      "invalidations": self.invalidations})
+        return stats
@@ -2,10 +2,19 @@
 Script contains DatabaseHelper Class used for accessing common functions to setup
 and obtain information from the database.
 """
-from typing import List
+import json
+from typing import TYPE_CHECKING, Any, Iterator, List
 import numpy
-from pandas import DataFrame
+from bson.binary import Binary
+from bson.json_util import loads
+from .database_interface import Database
 from .mongo_db_interface import MongoDBDatabase
+from . import exceptions
+#pandas is imported on first use
+#pylint:disable=import-outside-toplevel
+
+if TYPE_CHECKING:
+    import pandas
 
 
 
@@ -15,8 +24,10 @@ class DatabaseHelper:
     Static Class containing Static Methods for common interactions with the database
     """
     @classmethod
-    def setup_database(cls, database: MongoDBDatabase, csv_folder_path: str,
-                                                       csv_encoding: str) -> None:
+    def setup_database(cls, database: Database, csv_folder_path: str,
+                                                       csv_encoding: str,
+                       chunk_size: int = 10000, batch_size: int = 1000,
+                       upsert_key: str | list[str] | None = None) -> dict:
         """
         Method sets up Inital data for Mongo DB Database by loading a CSV collection of 
         courses data. The method sources "The Best Data Science Courses - Udemy" dataset
@@ -24,25 +35,37 @@ class DatabaseHelper:
         building, testing and evaluating the Semantic Search Module.
 
         Args:
-            database (MongoDBDatabase): Database Object creating/connecting to the new 
-                                        Database and Collection inside the MongoDB Server.
+            database (Database): Database Object creating/connecting to the new 
+                                 Database and Collection inside the MongoDB Server.
             csv_folder_path (str): Folder Path of CSV files
             csv_encoding (str): encoding of csv file
+            chunk_size (int): Number of rows read from a file at a time
+            batch_size (int): Number of documents of each bulk write
+            upsert_key (str | list[str] | None): field(s) identifying a course; courses are
+                                                 upserted so the set up can be run again
+        Returns:
+            dict: number of files and rows loaded, time taken (s) and rows per second
         """
         # establish connection to database
         database.connect(create=True)
 
         #load csv data to collection
-        database.load_csvs_to_database(csv_folder_path=csv_folder_path, encoding=csv_encoding)
-        database.close()
+        try:
+            return database.load_csvs_to_database(csv_folder_path=csv_folder_path,
+                                                  encoding=csv_encoding, chunk_size=chunk_size,
+                                                  batch_size=batch_size, upsert_key=upsert_key)
+        finally:
+            database.close()
 
     @classmethod
-    def load_collection_data_dataframe(cls, database: MongoDBDatabase) -> DataFrame:
+    def load_collection_data_dataframe(cls, database: Database,
+                                       projection: dict | None = None) -> "pandas.DataFrame":
         """
         Method returns collection data in database as a pandas.Dataframe
         Args:
-            database (MongoDBDatabase): Database Object connecting to a Database and
-                                        Collection inside the MongoDB Server.
+            database (Database): Database Object connecting to a Database and
+                                 Collection inside the MongoDB Server.
+            projection (dict | None): MongoDB projection of the fields to return
         Returns:
             pandas.Dataframe: Dataframe Object containing all data from the pointed collection
                 (in the connection string)
@@ -50,16 +73,18 @@ class DatabaseHelper:
         # establish connection to database
         database.connect()
         # print a dataframe representing the data stored in a collection
-        data: DataFrame = database.collection_to_dataframe()
+        data: "pandas.DataFrame" = database.collection_to_dataframe(projection=projection)
         database.close()
         return data
     @classmethod
-    def load_collection_data_json(cls, database: MongoDBDatabase) -> list:
+    def load_collection_data_json(cls, database: Database,
+                                  projection: dict | None = None) -> list:
         """
         Method returns collection data in database as a list of json (dict)
         Args:
-            database (MongoDBDatabase): Database Object connecting to a Database and
-                                        Collection inside the MongoDB Server.
+            database (Database): Database Object connecting to a Database and
+                                 Collection inside the MongoDB Server.
+            projection (dict | None): MongoDB projection of the fields to return
         Returns:
             List[dict]: List of Json Objects containing all data from the pointed collection
                     (in the connection string)
@@ -67,24 +92,315 @@ class DatabaseHelper:
         # establish connection to database
         database.connect()
         # print a dataframe representing the data stored in a collection
-        data: List[dict] =  database.collection_to_json()
+        data: List[dict] =  database.collection_to_json(projection=projection)
         database.close()
         return data
 
     @classmethod
-    def store_embedded_dataset(cls, database: MongoDBDatabase, dataset: numpy.ndarray) -> None:
+    def iterate_collection_data_json(cls, database: Database,
+                                     projection: dict | None = None,
+                                     batch_size: int = 1000) -> Iterator[dict]:
+        """
+        Method iterates over the collection data in database as json (dict) objects, fetching
+        `batch_size` documents at a time (the collection is never held in memory at once)
+        Args:
+            database (Database): Database Object connecting to a Database and
+                                 Collection inside the MongoDB Server.
+            projection (dict | None): MongoDB projection of the fields to return
+            batch_size (int): Number of documents fetched per round trip
+        Returns:
+            Iterator[dict]: Json Objects of the pointed collection
+        """
+        # establish connection to database
+        database.connect()
+        try:
+            yield from database.iterate_documents(projection=projection, batch_size=batch_size,
+                                                  as_json=True)
+        finally:
+            database.close()
+
+    @classmethod
+    def store_embedded_dataset(cls, database: Database, dataset: numpy.ndarray) -> None:
         """
         Method stores the embedded dataset into the database.
 
         Args:
-            database (MongoDBDatabase): Database Object creating/connecting to the new 
-                                        Database and Collection inside the MongoDB Server.
+            database (Database): Database Object creating/connecting to the new 
+                                 Database and Collection inside the MongoDB Server.
             dataset (numpy.ndarray): Ndarray Object containing the embedded dataset data
         """
         # establish connection to database
         database.connect(create=True)
         #convert ndarray to dataframe (in a format to be able to store in MongoDB)
-        dataframe = DataFrame(dataset)
+        import pandas
+        dataframe = pandas.DataFrame(dataset)
         #load dataframe to database
         database.load_dataframe_to_database(dataframe, replace=True)
         database.close()
+
+    @classmethod
+    def course_id(cls, course: dict) -> Any:
+        """
+        Method returns the BSON "_id" value of a course. Courses loaded through
+        `load_collection_data_json` store their "_id" in MongoDB Extended JSON form
+        (e.g. {"$oid": ...}) which is converted back to its BSON type (e.g. ObjectId)
+
+        Args:
+            course (dict): course data containing an "_id" field
+        Returns:
+            Any: BSON value of the course "_id"
+        """
+        return loads(json.dumps(course["_id"]))
+
+    @classmethod
+    def load_courses_by_id(cls, database: Database, course_ids: list,
+                           projection: dict | None = None) -> dict:
+        """
+        Method fetches the courses with the given "_id" values with a single "$in" query
+        (only the requested courses are transferred from the database)
+
+        Args:
+            database (Database): Database Object connecting to the courses Collection
+            course_ids (list): BSON "_id" values of the courses to fetch
+            projection (dict | None): MongoDB projection of the fields to return
+        Returns:
+            dict: course "_id" mapped to the course as a json (dict) object (courses which
+                  no longer exist are missing)
+        """
+        if len(course_ids) == 0:
+            return {}
+        # establish connection to database
+        database.connect()
+        documents: List[dict] = database.find_documents({"_id": {"$in": list(course_ids)}},
+                                                        projection)
+        database.close()
+        return {document["_id"]: MongoDBDatabase.to_json(document) for document in documents}
+
+    @classmethod
+    def embedded_dataset_documents(cls, dataset: numpy.ndarray, course_ids: list,
+                                   dtype: str = "float32", content_hashes: list | None = None,
+                                   model: str | None = None) -> list[dict]:
+        """
+        Method converts an embedded dataset into documents of the compact binary format.
+        Each course vector is stored as a single little-endian BSON binary field inside a
+        document keyed by the course "_id", optionally carrying the hash of the passage
+        text that was embedded and the model used to embed it.
+
+        Args:
+            dataset (numpy.ndarray): Ndarray Object containing the embedded dataset data
+            course_ids (list): "_id" of the course represented by each row of the dataset
+            dtype (str): Precision the vectors are stored in ("float32" or "float16")
+            content_hashes (list | None): hash of the passage embedded for each row
+            model (str | None): name/version of the model that created the embeddings
+        Returns:
+            list[dict]: documents to be stored in the embedded dataset collection
+        Raises:
+            ValueError: If the dtype is not supported or the ids do not match the dataset
+        """
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported embedded dataset dtype: {dtype}")
+        if len(course_ids) != len(dataset):
+            raise ValueError(f"Embedded dataset has {len(dataset)} rows but "
+                             f"{len(course_ids)} course ids were given")
+        #little-endian representation of the requested precision
+        vectors = numpy.asarray(dataset, dtype=numpy.dtype(dtype).newbyteorder("<"))
+        documents = [{"_id": course_id,
+                      "vector": Binary(vector.tobytes()),
+                      "dtype": vectors.dtype.str,
+                      "dimension": vectors.shape[1]}
+                     for course_id, vector in zip(course_ids, vectors)]
+        for row, document in enumerate(documents):
+            if content_hashes is not None:
+                document["content_hash"] = content_hashes[row]
+            if model is not None:
+                document["model"] = model
+        return documents
+
+    @classmethod
+    def store_embedded_dataset_binary(cls, database: Database, dataset: numpy.ndarray,
+                                      course_ids: list, dtype: str = "float32",
+                                      content_hashes: list | None = None,
+                                      model: str | None = None) -> None:
+        """
+        Method stores (replacing any existing data) the embedded dataset into the database
+        in the compact binary format (see `embedded_dataset_documents`).
+
+        Args:
+            database (Database): Database Object creating/connecting to the new 
+                                 Database and Collection inside the MongoDB Server.
+            dataset (numpy.ndarray): Ndarray Object containing the embedded dataset data
+            course_ids (list): "_id" of the course represented by each row of the dataset
+            dtype (str): Precision the vectors are stored in ("float32" or "float16")
+            content_hashes (list | None): hash of the passage embedded for each row
+            model (str | None): name/version of the model that created the embeddings
+        """
+        documents = cls.embedded_dataset_documents(dataset, course_ids, dtype,
+                                                   content_hashes, model)
+        # establish connection to database
+        database.connect(create=True)
+        database.insert_documents(documents, replace=True)
+        database.close()
+
+    @classmethod
+    def update_embedded_dataset_binary(cls, database: Database, dataset: numpy.ndarray,
+                                       course_ids: list, removed_ids: list,
+                                       dtype: str = "float32",
+                                       content_hashes: list | None = None,
+                                       model: str | None = None) -> None:
+        """
+        Method incrementally updates an embedded dataset stored in the compact binary format,
+        upserting the given vectors by course "_id" and deleting the vectors of removed courses
+
+        Args:
+            database (Database): Database Object creating/connecting to the new 
+                                 Database and Collection inside the MongoDB Server.
+            dataset (numpy.ndarray): Ndarray Object containing the new/changed vectors
+            course_ids (list): "_id" of the course represented by each row of the dataset
+            removed_ids (list): "_id" of the courses whose vectors should be deleted
+            dtype (str): Precision the vectors are stored in ("float32" or "float16")
+            content_hashes (list | None): hash of the passage embedded for each row
+            model (str | None): name/version of the model that created the embeddings
+        """
+        documents = cls.embedded_dataset_documents(dataset, course_ids, dtype,
+                                                   content_hashes, model)
+        # establish connection to database
+        database.connect(create=True)
+        database.upsert_documents(documents)
+        database.delete_documents(removed_ids)
+        database.close()
+
+    @classmethod
+    def load_embedded_dataset_metadata(cls, database: Database) -> dict:
+        """
+        Method loads the metadata (without the vectors) of an embedded dataset stored in
+        the compact binary format
+
+        Args:
+            database (Database): Database Object connecting to a Database and
+                                 Collection inside the MongoDB Server.
+        Returns:
+            dict: course "_id" mapped to the stored metadata document of its vector
+                  (an empty dict if the collection does not exist)
+        """
+        # establish connection to database (creating the collection reference if missing)
+        database.connect(create=True)
+        documents: List[dict] = database.find_documents(projection={"vector": 0})
+        database.close()
+        return {document["_id"]: document for document in documents}
+
+    @classmethod
+    def load_embedded_dataset_binary(cls, database: Database) -> tuple:
+        """
+        Method loads an embedded dataset stored in the compact binary format, rebuilding
+        the matrix directly from the stored buffers (without pandas)
+
+        Args:
+            database (Database): Database Object connecting to a Database and
+                                 Collection inside the MongoDB Server.
+        Returns:
+            tuple (list, numpy.ndarray): (course ids, float32 matrix with a row per course id)
+        Raises:
+            EmptyCollection: When the embedded dataset collection is empty
+        """
+        # establish connection to database
+        database.connect()
+        #stores keeping the vectors in a single (memory mapped) matrix return it directly
+        vectors: tuple | None = database.load_vectors()
+        if vectors is not None:
+            database.close()
+            if len(vectors[0]) == 0:
+                raise exceptions.EmptyCollection(database.database, database.collection)
+            return vectors
+        course_ids, rows = [], []
+        #documents are streamed, only the vector buffers are kept until the matrix is built
+        for document in database.iterate_documents(projection={"vector": 1, "dtype": 1}):
+            course_ids.append(document["_id"])
+            rows.append(numpy.frombuffer(document["vector"], dtype=document["dtype"]))
+        database.close()
+        if len(rows) == 0:
+            raise exceptions.EmptyCollection(database.database, database.collection)
+        return course_ids, numpy.vstack(rows).astype(numpy.float32, copy=False)
+
+    @classmethod
+    def store_index_state(cls, database: Database, state: dict) -> None:
+        """
+        Method stores (replacing any previous state of the same index type) the trained
+        state of a vector index. Ndarray values are stored as BSON binary buffers.
+
+        Args:
+            database (Database): Database Object creating/connecting to the Database
+                                 and Collection storing the vector index states.
+            state (dict): state of the vector index (containing an "index_type" field)
+        """
+        document: dict = {"_id": state["index_type"]}
+        for field, value in state.items():
+            if isinstance(value, numpy.ndarray):
+                value = {"buffer": Binary(numpy.ascontiguousarray(value).tobytes()),
+                         "dtype": value.dtype.str,
+                         "shape": list(value.shape)}
+            document[field] = value
+        # establish connection to database
+        database.connect(create=True)
+        database.upsert_documents([document])
+        database.close()
+
+    @classmethod
+    def load_index_state(cls, database: Database, index_type: str) -> dict | None:
+        """
+        Method loads the stored state of a vector index
+
+        Args:
+            database (Database): Database Object creating/connecting to the Database
+                                 and Collection storing the vector index states.
+            index_type (str): type of the vector index
+        Returns:
+            dict | None: state of the vector index (None if no state is stored)
+        """
+        # establish connection to database (creating the collection reference if missing)
+        database.connect(create=True)
+        documents: List[dict] = database.find_documents({"_id": index_type})
+        database.close()
+        if len(documents) == 0:
+            return None
+        state: dict = documents[0]
+        for field, value in state.items():
+            if isinstance(value, dict) and "buffer" in value:
+                state[field] = numpy.frombuffer(value["buffer"],
+                                                dtype=value["dtype"]).reshape(value["shape"])
+        return state
+
+    @classmethod
+    def catalog_fingerprint(cls, database: Database) -> str:
+        """
+        Method returns the fingerprint of a collection, which changes whenever a document
+        of the collection is inserted, updated or deleted
+
+        Args:
+            database (Database): Database Object creating/connecting to the Database
+                                 and Collection storing the courses data.
+        Returns:
+            str: fingerprint of the collection
+        """
+        # establish connection to database
+        database.connect()
+        fingerprint: str = database.collection_fingerprint()
+        database.close()
+        return fingerprint
+
+    @classmethod
+    def catalog_change_marker(cls, database: Database) -> str:
+        """
+        Method returns a change marker of a collection, which is cheap to compute and polled
+        to detect changes (see `Database.change_marker`)
+
+        Args:
+            database (Database): Database Object creating/connecting to the Database
+                                 and Collection storing the courses data.
+        Returns:
+            str: change marker of the collection
+        """
+        # establish connection to database
+        database.connect()
+        marker: str = database.change_marker()
+        database.close()
+        return marker
@@ -0,0 +1,222 @@
+"""
+This script contains the Database interface implemented by the storage backends of the semantic
+search module (MongoDBDatabase, SnapshotDatabase and MemoryDatabase)
+"""
+import json
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Iterator
+from . import exceptions
+#pandas is imported on first use
+#pylint:disable=import-outside-toplevel
+
+if TYPE_CHECKING:
+    import pandas
+
+
+class Database(ABC):
+    """
+    Interface of a store of the documents of a single collection, used by the DatabaseHelper
+    and the EmbeddingController. Queries support equality and "$in" filters and
+    inclusion/exclusion projections (the subset of MongoDB used by the module).
+
+    Attributes:
+        read_only (bool): If the documents of the collection cannot be modified
+    """
+    read_only: bool = False
+
+    @property
+    @abstractmethod
+    def server_url(self) -> str:
+        """str: URL of the server (or location) storing the collection"""
+
+    @property
+    @abstractmethod
+    def database(self) -> str:
+        """str: Name of the Database of the collection"""
+
+    @property
+    @abstractmethod
+    def collection(self) -> str:
+        """str: Name of the Collection"""
+
+    @abstractmethod
+    def connect(self, create = False) -> None:
+        """
+        Connects to the collection
+
+        Args:
+            create (bool): If a missing collection is accepted (it is created on first write)
+        Raises:
+            DoesNotExist: If the collection does not exist and is not being created
+        """
+
+    @abstractmethod
+    def is_connected(self) -> bool:
+        """
+        Method checks if there is a connection active to the collection
+
+        Returns:
+            boolean value
+        """
+
+    @abstractmethod
+    def close(self) -> None:
+        """
+        Method closes the connection with the collection
+        """
+
+    @abstractmethod
+    def insert_documents(self, documents: list[dict], replace: bool = False) -> None:
+        """
+        Takes a list of documents to store into the collection
+
+        Args:
+            documents (list[dict]): documents to store into the collection
+            replace (bool): If every document of the collection is deleted first
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+
+    @abstractmethod
+    def upsert_documents(self, documents: list[dict]) -> None:
+        """
+        Takes a list of documents to store into the collection, replacing any stored document
+        with the same "_id"
+
+        Args:
+            documents (list[dict]): documents (containing an "_id" field) to store
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+
+    @abstractmethod
+    def delete_documents(self, ids: list) -> None:
+        """
+        Deletes the documents with the given "_id" values from the collection
+
+        Args:
+            ids (list): "_id" values of the documents to delete
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+
+    @abstractmethod
+    def find_documents(self, query: dict | None = None,
+                       projection: dict | None = None) -> list[dict]:
+        """
+        The method returns the documents of the collection matching the query, as native
+        python (BSON) objects
+
+        Args:
+            query (dict | None): filter of the documents to return (all if None)
+            projection (dict | None): projection of the fields to return
+        Returns:
+            List[dict]
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+
+    @abstractmethod
+    def collection_fingerprint(self) -> str:
+        """
+        The method returns a fingerprint of the documents of the collection, which changes
+        whenever a document is inserted, updated or deleted
+
+        Returns:
+            str: fingerprint of the collection
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+
+    def change_marker(self) -> str:
+        """
+        The method returns a marker of the state of the collection which is cheap to compute,
+        polled to detect changes of the collection. Stores whose fingerprint is cheap return
+        the fingerprint, others may miss some changes (which `collection_fingerprint`
+        detects).
+
+        Returns:
+            str: change marker of the collection
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        return self.collection_fingerprint()
+
+    @abstractmethod
+    def iterate_documents(self, query: dict | None = None, projection: dict | None = None,
+                          batch_size: int = 1000, as_json: bool = False) -> Iterator[dict]:
+        """
+        The method returns an iterator over the documents of the collection matching the query
+
+        Args:
+            query (dict | None): filter of the documents to return (all if None)
+            projection (dict | None): projection of the fields to return
+            batch_size (int): Number of documents fetched at a time
+            as_json (bool): If the documents are converted to JSON compatible objects
+        Returns:
+            Iterator[dict]
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+
+    def load_vectors(self) -> tuple | None:
+        """
+        The method returns the vectors of an embedded dataset collection as a single matrix,
+        for stores keeping the vectors of the collection in one buffer (e.g. a memory mapped
+        file). Other stores return None and the vectors are read from the documents.
+
+        Returns:
+            tuple (list, numpy.ndarray) | None: (document "_id" of each row, matrix)
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        return None
+
+    def load_dataframe_to_database(self, dataframe: "pandas.DataFrame",
+                                   replace: bool = False) -> None:
+        """
+        Takes a Pandas Dataframe to store into the collection
+
+        Args:
+            dataframe (pandas.Dataframe): Dataframe consisting of data to store into the db
+            replace (bool): If every document of the collection is deleted first
+        """
+        self.insert_documents(json.loads(dataframe.to_json(orient="records")), replace)
+
+    def collection_to_dataframe(self, projection: dict | None = None) -> "pandas.DataFrame":
+        """
+        The method returns the documents of the collection in pandas.Dataframe format
+
+        Args:
+            projection (dict | None): projection of the fields to return
+        Returns:
+            pandas.Dataframe
+        Raises:
+            NoConnection: Connection to database has not been established
+            EmptyCollection: When the collection is empty
+        """
+        data: list = list(self.iterate_documents(projection=projection))
+        if len(data) == 0:
+            raise exceptions.EmptyCollection(self.database, self.collection)
+        import pandas
+        return pandas.DataFrame(data)
+
+    def collection_to_json(self, projection: dict | None = None,
+                           batch_size: int = 1000) -> list[dict]:
+        """
+        The method returns the documents of the collection as a list of json (dict) objects
+
+        Args:
+            projection (dict | None): projection of the fields to return
+            batch_size (int): Number of documents fetched at a time
+        Returns:
+            List[dict]
+        Raises:
+            NoConnection: Connection to database has not been established
+            EmptyCollection: When the collection is empty
+        """
+        data: list = list(self.iterate_documents(projection=projection, batch_size=batch_size,
+                                                 as_json=True))
+        if len(data) == 0:
+            raise exceptions.EmptyCollection(self.database, self.collection)
+        return data
@@ -38,3 +38,13 @@ class EmptyCollection(Exception):
             collection (str): Name of Empty Collection
         """
         super().__init__(f"{collection} Collection inside of {database} database is empty")
+
+class ReadOnlyCollection(Exception):
+    """Exception when writing to a collection of a read only store (e.g. a local snapshot)"""
+    def __init__(self, database: str, collection: str):
+        """
+        Args:
+            database (str): Database name of collection
+            collection (str): Name of the read only Collection
+        """
+        super().__init__(f"{collection} Collection inside of {database} database is read only")
@@ -0,0 +1,264 @@
+"""
+This script contains the in memory implementation of the Database interface, used to run the
+semantic search module (e.g. tests and benchmarks) without a MongoDB Server
+"""
+import copy
+import hashlib
+import time
+from typing import Iterator
+from bson import ObjectId
+from bson.json_util import dumps
+from . import exceptions
+from .database_interface import Database
+from .mongo_db_interface import MongoDBDatabase
+
+
+class MemoryDatabase(Database):
+    """
+    A Class storing the documents of a single collection in the process memory, supporting
+    equality and "$in" filters and inclusion/exclusion projections.
+
+    Attributes:
+        database (str): Name of the (simulated) Database
+        collection (str): Name of the (simulated) Collection
+    """
+    def __init__(self, database: str = "memory", collection: str = "collection",
+                 documents: list[dict] | None = None):
+        """
+        Initalising method for the MemoryDatabase Class
+
+        Args:
+            database (str): Name of the (simulated) Database
+            collection (str): Name of the (simulated) Collection
+            documents (list[dict] | None): documents initially stored in the collection
+        """
+        self.__database_name: str = database
+        self.__collection_name: str = collection
+        self.__documents: dict = {}
+        #number of open connections (a database object may be shared by several threads)
+        self.__connections: int = 0
+        for document in documents or []:
+            self.__store(document)
+
+    @property
+    def server_url(self) -> str:
+        """str: URL of the (simulated) server"""
+        return "memory://"
+
+    @property
+    def database(self) -> str:
+        """str: Name of the (simulated) Database"""
+        return self.__database_name
+
+    @property
+    def collection(self) -> str:
+        """str: Name of the (simulated) Collection"""
+        return self.__collection_name
+
+    def connect(self, create = False) -> None:
+        """
+        Connects to the collection
+
+        Raises:
+            DoesNotExist: If the collection is empty and is not being created
+        """
+        if not create and len(self.__documents) == 0:
+            raise exceptions.DoesNotExist(field="Collection", field_name=self.collection)
+        self.__connections += 1
+
+    def is_connected(self) -> bool:
+        """
+        Method checks if there is a connection active to the collection
+
+        Returns:
+            boolean value
+        """
+        return self.__connections > 0
+
+    def close(self) -> None:
+        """
+        Method closes a connection with the collection
+        """
+        self.__connections = max(0, self.__connections - 1)
+
+    def __store(self, document: dict) -> None:
+        """Method stores a copy of the document (an "_id" is generated if missing)"""
+        document = copy.deepcopy(document)
+        document.setdefault("_id", ObjectId())
+        self.__documents[document["_id"]] = document
+
+    def __check_connection(self) -> None:
+        """Method raises NoConnection if there is no connection to the collection"""
+        if self.__connections == 0:
+            raise exceptions.NoConnection
+
+    @staticmethod
+    def __matches(document: dict, query: dict) -> bool:
+        """Method checks if a document matches the equality and "$in" filters of a query"""
+        for field, condition in query.items():
+            value = document.get(field)
+            if isinstance(condition, dict) and "$in" in condition:
+                if value not in condition["$in"]:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    @staticmethod
+    def __project(document: dict, projection: dict | None) -> dict:
+        """Method applies an inclusion or exclusion projection to a copy of the document"""
+        document = copy.deepcopy(document)
+        if not projection:
+            return document
+        fields = {field: value for field, value in projection.items() if field != "_id"}
+        if any(fields.values()):
+            document = {field: value for field, value in document.items()
+                        if field == "_id" or fields.get(field)}
+        else:
+            for field in fields:
+                document.pop(field, None)
+        if "_id" in projection and not projection["_id"]:
+            document.pop("_id", None)
+        return document
+
+    def load_csvs_to_database(self, csv_folder_path: str, encoding: str,
+                              chunk_size: int = 10000, batch_size: int = 1000,
+                              upsert_key: str | list[str] | None = None) -> dict:
+        """
+        Takes a folder path of CSVS to read (in chunks) and store into the collection
+
+        Args:
+            csv_folder_path (str): Folder Path of CSV files
+            encoding (str): encoding of csv file
+            chunk_size (int): Number of rows read from a file at a time
+            batch_size (int): Number of documents stored at a time
+            upsert_key (str | list[str] | None): field(s) identifying a row; rows replace the
+                                                 stored document with the same key if given
+        Returns:
+            dict: number of files and rows loaded, time taken (s) and rows per second
+        Raises:
+            NoConnection: Connection to database has not been established
+            CSVsNotFound: No CSVs found in the path directory
+            DoesNotExist: Directory does not exist
+        """
+        files = MongoDBDatabase.csv_files(csv_folder_path)
+        self.__check_connection()
+        keys = [upsert_key] if isinstance(upsert_key, str) else upsert_key
+        #"_id" of the stored documents by key (replaced documents keep their "_id")
+        stored: dict = {tuple(document.get(key) for key in keys): document_id
+                        for document_id, document in self.__documents.items()} if keys else {}
+        rows = 0
+        prev_time = time.perf_counter()
+        for file in files:
+            for records in MongoDBDatabase.read_csv_batches(file, encoding, chunk_size,
+                                                            batch_size):
+                for record in records:
+                    if keys:
+                        record_key = tuple(record[key] for key in keys)
+                        record["_id"] = stored.setdefault(record_key,
+                                                          record.get("_id", ObjectId()))
+                    self.__store(record)
+                rows += len(records)
+        seconds = time.perf_counter() - prev_time
+        return {"files": len(files),
+                "rows": rows,
+                "seconds": seconds,
+                "rows_per_second": rows / seconds if seconds > 0 else 0.0}
+
+    def insert_documents(self, documents: list[dict], replace: bool = False) -> None:
+        """
+        Takes a list of documents to store into the collection
+
+        Args:
+            documents (list[dict]): documents to store into the db
+            replace (bool): Decides if method should delete all files currently in the
+            collection before inserting data
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        self.__check_connection()
+        if replace:
+            self.__documents.clear()
+        for document in documents:
+            self.__store(document)
+
+    def upsert_documents(self, documents: list[dict]) -> None:
+        """
+        Takes a list of documents to store into the collection, replacing any stored document
+        with the same "_id"
+
+        Args:
+            documents (list[dict]): documents (containing an "_id" field) to store into the db
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        self.__check_connection()
+        for document in documents:
+            self.__store(document)
+
+    def delete_documents(self, ids: list) -> None:
+        """
+        Deletes the documents with the given "_id" values from the collection
+
+        Args:
+            ids (list): "_id" values of the documents to delete
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        self.__check_connection()
+        for document_id in ids:
+            self.__documents.pop(document_id, None)
+
+    def find_documents(self, query: dict | None = None,
+                       projection: dict | None = None) -> list[dict]:
+        """
+        The method returns the documents stored in the collection matching the query
+
+        Args:
+            query (dict | None): equality/"$in" filter of the documents to return (all if None)
+            projection (dict | None): inclusion or exclusion projection of the fields to return
+        Returns:
+            List[dict]
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        self.__check_connection()
+        return [self.__project(document, projection) for document in self.__documents.values()
+                if self.__matches(document, query or {})]
+
+    def collection_fingerprint(self) -> str:
+        """
+        The method returns a fingerprint (hash) of the documents stored in the collection
+
+        Returns:
+            str: fingerprint of the collection
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        self.__check_connection()
+        digest = hashlib.sha256()
+        for document_id in sorted(self.__documents, key=str):
+            digest.update(dumps(self.__documents[document_id]).encode("utf-8"))
+        return digest.hexdigest()
+
+    def iterate_documents(self, query: dict | None = None, projection: dict | None = None,
+                          batch_size: int = 1000, as_json: bool = False) -> Iterator[dict]:
+        """
+        The method returns an iterator over the documents stored in the collection matching
+        the query
+
+        Args:
+            query (dict | None): equality/"$in" filter of the documents to return (all if None)
+            projection (dict | None): inclusion or exclusion projection of the fields to return
+            batch_size (int): ignored (accepted for compatibility with MongoDBDatabase)
+            as_json (bool): If the documents are converted to JSON compatible objects
+        Returns:
+            Iterator[dict]
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        self.__check_connection()
+        documents = [document for document in self.__documents.values()
+                     if self.__matches(document, query or {})]
+        return (MongoDBDatabase.to_json(self.__project(document, projection)) if as_json
+                else self.__project(document, projection) for document in documents)
@@ -2,16 +2,132 @@
 This script contains the code used to communicate with the MongoDB Sever 
 Used to SetUp and Interact With the Databases on the Server
 """
+import hashlib
+import math
 import os
-import json
+import threading
+import time
+from typing import Any, Iterator
+from bson import json_util
 from bson.json_util import dumps
-import pandas
-from pymongo import MongoClient
+from pymongo import InsertOne, MongoClient, ReplaceOne
 from pymongo import errors
 from . import exceptions
+from .database_interface import Database
+#pandas is imported on first use
+#pylint:disable=import-outside-toplevel
 
 
-class MongoDBDatabase:
+class MongoClientRegistry:
+    """
+    Static Class holding the process wide MongoClients shared by every MongoDBDatabase
+    connecting to the same server with the same credentials. A MongoClient maintains its
+    own connection pool, so sharing a long lived client avoids a TCP/authentication
+    handshake per connection. Successful database/collection existence checks and the
+    collection handles are cached per client, so later connections do not query the server.
+
+    Attributes:
+        max_pool_size (int): Maximum number of connections in the pool of each client
+        min_pool_size (int): Minimum number of connections kept open by each client
+    """
+    max_pool_size: int = 100
+    min_pool_size: int = 0
+    __lock = threading.Lock()
+    __clients: dict = {}
+    __validated: set = set()
+    __collections: dict = {}
+
+    @classmethod
+    def configure(cls, max_pool_size: int = 100, min_pool_size: int = 0) -> None:
+        """
+        Method configures the connection pool of the clients created afterwards
+
+        Args:
+            max_pool_size (int): Maximum number of connections in the pool of each client
+            min_pool_size (int): Minimum number of connections kept open by each client
+        """
+        cls.max_pool_size = max_pool_size
+        cls.min_pool_size = min_pool_size
+
+    @classmethod
+    def client(cls, url: str, username: str, password: str, auth_mechanism: str) -> tuple:
+        """
+        Method returns the shared client of a server and set of credentials, creating (and
+        checking the server is reachable) on first use
+
+        Args:
+            url (str): URL of the  Mongo DB server
+            username (str): Username of the Database User
+            password (str): Password of the Database User
+            auth_mechanism (str): Authentication Mechanism used by the database
+        Returns:
+            tuple (tuple, MongoClient): (key of the client, shared client)
+        Raises:
+            ConnectionFailure: If Failure to Connect the MongoDB server with given URL
+        """
+        key = (url, username, hashlib.sha256(str(password).encode("utf-8")).hexdigest(),
+               auth_mechanism)
+        with cls.__lock:
+            if key not in cls.__clients:
+                client = MongoClient(url,
+                                     username=username,
+                                     password=password,
+                                     authMechanism=auth_mechanism,
+                                     maxPoolSize=cls.max_pool_size,
+                                     minPoolSize=cls.min_pool_size)
+                try:
+                    client.server_info()
+                except errors.ConnectionFailure as exception:
+                    #ServerSelectionTimeoutError is a subclass of ConnectionFailure
+                    client.close()
+                    raise exceptions.ConnectionFailure() from exception
+                cls.__clients[key] = client
+            return key, cls.__clients[key]
+
+    @classmethod
+    def collection(cls, key: tuple, client: MongoClient, database: str, collection: str,
+                   create: bool = False):
+        """
+        Method returns the (cached) handle of a collection, checking on first use that the
+        database and collection exist (unless they are being created)
+
+        Args:
+            key (tuple): key of the client
+            client (MongoClient): shared client
+            database (str): Target Database inside Server
+            collection (str): Target Collection inside Database
+            create (bool): If the database and collection may not exist yet
+        Returns:
+            Collection: handle of the collection
+        Raises:
+            DoesNotExist: If Database or Collection does not exist in MongoDB Server
+        """
+        handle_key = (key, database, collection)
+        if not create and handle_key not in cls.__validated:
+            if database not in client.list_database_names():
+                raise exceptions.DoesNotExist(field="Database", field_name=database)
+            if collection not in client[database].list_collection_names():
+                raise exceptions.DoesNotExist(field="Collection", field_name=collection)
+            #only successful checks are cached (a missing collection may be created later)
+            cls.__validated.add(handle_key)
+        if handle_key not in cls.__collections:
+            cls.__collections[handle_key] = client[database][collection]
+        return cls.__collections[handle_key]
+
+    @classmethod
+    def close_all(cls) -> None:
+        """
+        Method closes every shared client (e.g. on application shutdown)
+        """
+        with cls.__lock:
+            for client in cls.__clients.values():
+                client.close()
+            cls.__clients.clear()
+            cls.__validated.clear()
+            cls.__collections.clear()
+
+
+class MongoDBDatabase(Database):
     """
      A Class for communication with the Mongo DB Server
     
@@ -19,7 +135,12 @@ class MongoDBDatabase:
         url (str): URL of the  Mongo DB server
         database (str): Target Database inside Server
         collection (str): Target Collection inside Database
+        change_markers_collection (str): Collection holding the version counter of each
+                                         collection, bumped by every write (see
+                                         `change_marker`)
     """
+    change_markers_collection: str = "change_markers"
+
     def __init__(self, url: str, database: str, collection: str,
                  username: str, password: str, auth_mechanism: str):
         """
@@ -61,37 +182,18 @@ class MongoDBDatabase:
 
     def connect(self, create = False) -> None:
         """
-        Connects to the Mongo DB Server
+        Connects to the Mongo DB Server, using the client shared by every database object
+        of the same server and credentials (see MongoClientRegistry)
 
         Raises:
             ConnectionFailure: If Failure to Connect the MongoDB server with given URL
             DoesNotExist: If Database or Collection does not exist in MongoDB Server
         """
-        try:
-            self.__client = MongoClient(self.server_url,
-                                        username=self.__username,
-                                        password=self.__password,
-                                        authMechanism=self.__auth_mechanism)
-            self.__client.server_info()
-        except errors.ServerSelectionTimeoutError as exception:
-            self.__client = None
-            raise exceptions.ConnectionFailure() from exception
-        except errors.ConnectionFailure as exception:
-            self.__client = None
-            raise exceptions.ConnectionFailure() from exception
-
-        if not create :
-            database_list = self.__client.list_database_names()
-            if self.database not in database_list:
-                self.__client = None
-                raise exceptions.DoesNotExist(field="Database", field_name=self.database)
-        database = self.__client[self.database]
-        if not create :
-            collection_list = database.list_collection_names()
-            if self.collection not in collection_list:
-                self.__client = None
-                raise exceptions.DoesNotExist(field="Collection", field_name=self.collection)
-        self.__collection = database[self.collection]
+        key, client = MongoClientRegistry.client(self.server_url, self.__username,
+                                                 self.__password, self.__auth_mechanism)
+        self.__collection = MongoClientRegistry.collection(key, client, self.database,
+                                                           self.collection, create)
+        self.__client = client
 
     def is_connected(self) -> bool:
         """
@@ -104,89 +206,276 @@ class MongoDBDatabase:
 
     def close(self) -> None:
         """
-        Method closes the Connection with the MongoDB Server
+        Method releases the Connection with the MongoDB Server (the shared client and its
+        connection pool stay open for later connections, see MongoClientRegistry.close_all)
         """
-        self.__client.close()
         self.__client = None
+        self.__collection = None
+
+    @staticmethod
+    def csv_files(csv_folder_path: str) -> list[str]:
+        """
+        Method returns the paths of the CSV files of a folder (sorted by name)
+
+        Args:
+            csv_folder_path (str): Folder Path of CSV files
+        Returns:
+            list[str]: paths of the CSV files
+        Raises:
+            CSVsNotFound: No CSVs found in the path directory
+            DoesNotExist: Directory does not exist
+        """
+        if os.path.isdir(csv_folder_path) is False:
+            raise exceptions.DoesNotExist(field="Directory", field_name=csv_folder_path)
+        files = [f"{csv_folder_path}/{file}" for file in sorted(os.listdir(csv_folder_path))
+                 if file.endswith(".csv")]
+        if len(files) == 0:
+            raise exceptions.CSVsNotFound(path=csv_folder_path)
+        return files
+
+    @staticmethod
+    def read_csv_batches(csv_path: str, encoding: str, chunk_size: int = 10000,
+                         batch_size: int = 1000) -> Iterator[list[dict]]:
+        """
+        Method reads a CSV file in chunks of rows and yields its records in batches, so only
+        one chunk of the file is held in memory at a time
+
+        Args:
+            csv_path (str): Path of the CSV file
+            encoding (str): encoding of csv file
+            chunk_size (int): Number of rows read from the file at a time
+            batch_size (int): Number of records of each yielded batch
+        Returns:
+            Iterator[list[dict]]: batches of records (one dict per row)
+        """
+        import pandas
+        with pandas.read_csv(csv_path, encoding=encoding, chunksize=chunk_size) as reader:
+            for chunk in reader:
+                # return chunk as a list of dictionaries
+                records = chunk.to_dict(orient='records')
+                for start in range(0, len(records), batch_size):
+                    yield records[start:start + batch_size]
 
-    def load_csvs_to_database(self, csv_folder_path: str, encoding: str) -> None:
+    def load_csvs_to_database(self, csv_folder_path: str, encoding: str,
+                              chunk_size: int = 10000, batch_size: int = 1000,
+                              upsert_key: str | list[str] | None = None) -> dict:
         """
         Takes a folder path of CSVS to read and store into the database
             (location specified in connection string)
+        The files are read in chunks and written with unordered bulk writes, so the memory
+        used does not depend on the size of the files.
+
         Args:
             csv_folder_path (str): Folder Path of CSV files
             encoding (str): encoding of csv file
+            chunk_size (int): Number of rows read from a file at a time
+            batch_size (int): Number of documents of each bulk write
+            upsert_key (str | list[str] | None): field(s) identifying a row; rows are upserted
+                                                 (replacing the stored document with the same
+                                                 key) instead of inserted if given, so the
+                                                 files can be loaded again
+        Returns:
+            dict: number of files and rows loaded, time taken (s) and rows per second
         Raises:
             NoConnection: Connection to database has not been established
             CSVsNotFound: No CSVs found in the path directory
             DoesNotExist: Directory does not exist
         """
-        if os.path.isdir(csv_folder_path) is False:
-            raise exceptions.DoesNotExist(field="Directory", field_name=csv_folder_path)
+        files = self.csv_files(csv_folder_path)
 
         if self.__client is None:
             raise exceptions.NoConnection
 
-        csvs_count = 0
-        for file in os.listdir(csv_folder_path):
-            if file.endswith(".csv"):
-                dataframe = pandas.read_csv(f"{csv_folder_path}/{file}", encoding=encoding)
-                # return dataframe as a list of dictionaries
-                data = dataframe.to_dict(orient='records')
-                self.__collection.insert_many(data)
-                csvs_count+=1
-        if csvs_count == 0:
-            raise exceptions.CSVsNotFound(path=csv_folder_path)
+        keys = [upsert_key] if isinstance(upsert_key, str) else upsert_key
+        rows = 0
+        prev_time = time.perf_counter()
+        for file in files:
+            for records in self.read_csv_batches(file, encoding, chunk_size, batch_size):
+                if keys:
+                    requests = [ReplaceOne({key: record[key] for key in keys}, record,
+                                           upsert=True) for record in records]
+                else:
+                    requests = [InsertOne(record) for record in records]
+                self.__collection.bulk_write(requests, ordered=False)
+                rows += len(records)
+        self.__mark_changed()
+        seconds = time.perf_counter() - prev_time
+        return {"files": len(files),
+                "rows": rows,
+                "seconds": seconds,
+                "rows_per_second": rows / seconds if seconds > 0 else 0.0}
 
-    def load_dataframe_to_database(self, dataframe: pandas.DataFrame,
-                                            replace: bool = False) -> None:
+    def insert_documents(self, documents: list[dict], replace: bool = False) -> None:
         """
-        Takes a Pandas Dataframe store into the database 
+        Takes a list of documents (BSON compatible dict objects) to store into the database
             (location specified in connection string)
 
         Args:
-            dataframe (pandas.Dataframe): Dataframe consisting of data to store into the db
+            documents (list[dict]): documents to store into the db
             replace (bool): Decides if method should delete all files currently in the 
             collection before inserting data
+        Raises:
+            NoConnection: Connection to database has not been established
         """
-        data: dict = json.loads(dataframe.to_json(orient="records"))
+        if self.__client is None:
+            raise exceptions.NoConnection
         if replace:
             #delete existing files in collection
             self.__collection.delete_many({})
-        self.__collection.insert_many(data)
+        if len(documents) > 0:
+            self.__collection.insert_many(documents)
+        if replace or len(documents) > 0:
+            self.__mark_changed()
 
-    def collection_to_dataframe(self) -> pandas.DataFrame:
+    def upsert_documents(self, documents: list[dict]) -> None:
         """
-        The method takes the data stored in the pointed MongoDB collection and returns it
-        in pandas.Dataframe format
+        Takes a list of documents to store into the database, replacing any stored document
+        with the same "_id" (documents without a match are inserted)
 
-        Returns:
-            pandas.Dataframe
+        Args:
+            documents (list[dict]): documents (containing an "_id" field) to store into the db
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        if self.__client is None:
+            raise exceptions.NoConnection
+        if len(documents) > 0:
+            self.__collection.bulk_write([ReplaceOne({"_id": document["_id"]}, document,
+                                                     upsert=True)
+                                          for document in documents], ordered=False)
+            self.__mark_changed()
+
+    def delete_documents(self, ids: list) -> None:
+        """
+        Deletes the documents with the given "_id" values from the database
 
+        Args:
+            ids (list): "_id" values of the documents to delete
         Raises:
             NoConnection: Connection to database has not been established
-            FilesNotFound: When data returned from collection is empty
         """
         if self.__client is None:
             raise exceptions.NoConnection
-        data: list = list(self.__collection.find())
-        if len(data) == 0:
-            raise exceptions.EmptyCollection(self.database, self.collection)
-        return pandas.DataFrame(data)
-    def collection_to_json(self) -> list[dict]:
+        if len(ids) > 0:
+            self.__collection.delete_many({"_id": {"$in": list(ids)}})
+            self.__mark_changed()
+
+    def find_documents(self, query: dict | None = None,
+                       projection: dict | None = None) -> list[dict]:
         """
-        The method takes the data stored in the pointed MongoDB collection and returns it as
-        a list of json (dict) form objects
+        The method returns the documents stored in the pointed MongoDB collection matching
+        the query, as native python objects (no JSON conversion is applied)
 
+        Args:
+            query (dict | None): MongoDB filter of the documents to return (all if None)
+            projection (dict | None): MongoDB projection of the fields to return
         Returns:
             List[dict]
         Raises:
             NoConnection: Connection to database has not been established
-            FilesNotFound: When data returned from collection is empty
         """
         if self.__client is None:
             raise exceptions.NoConnection
-        data: list = list(self.__collection.find())
-        if len(data) == 0:
-            raise exceptions.EmptyCollection(self.database, self.collection)
-        return json.loads(dumps(data))
+        return list(self.__collection.find(query or {}, projection))
+
+    def __mark_changed(self) -> None:
+        """
+        Method increments the version counter of the collection (see `change_marker`)
+        """
+        self.__collection.database[self.change_markers_collection].update_one(
+                    {"_id": self.collection}, {"$inc": {"version": 1}}, upsert=True)
+
+    def change_marker(self) -> str:
+        """
+        The method returns a cheap marker of the state of the pointed MongoDB collection:
+        the version counter bumped by every write of the module (e.g. an ingestion), the
+        estimated number of documents (collection metadata) and the largest "_id" (read
+        from the "_id" index). No document is scanned, so it can be polled frequently;
+        documents edited in place outside of the module are only detected by
+        `collection_fingerprint`.
+
+        Returns:
+            str: change marker of the collection
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        if self.__client is None:
+            raise exceptions.NoConnection
+        marker: dict = self.__collection.database[self.change_markers_collection].find_one(
+                                                            {"_id": self.collection}) or {}
+        latest: dict | None = self.__collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        return f"{marker.get('version', 0)}:{self.__collection.estimated_document_count()}:" \
+               f"{latest['_id'] if latest is not None else ''}"
+
+    def collection_fingerprint(self) -> str:
+        """
+        The method returns a fingerprint of the documents stored in the pointed MongoDB
+        collection, computed on the server with the "dbHash" command. If the user is not
+        permitted to run the command the documents are hashed locally instead. Both hash
+        every document of the collection, so changes are polled with `change_marker`.
+
+        Returns:
+            str: fingerprint of the collection
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        if self.__client is None:
+            raise exceptions.NoConnection
+        try:
+            result: dict = self.__client[self.database].command("dbHash",
+                                                                collections=[self.collection])
+            return result["collections"].get(self.collection, "")
+        except errors.OperationFailure:
+            digest = hashlib.sha256()
+            for document in self.__collection.find().sort("_id", 1):
+                digest.update(dumps(document).encode("utf-8"))
+            return digest.hexdigest()
+
+    @staticmethod
+    def to_json(value: Any) -> Any:
+        """
+        The method converts a document (or value) read from MongoDB into JSON compatible
+        python objects (e.g. an ObjectId into {"$oid": ...} and a NaN into
+        {"$numberDouble": "NaN"}), producing the same objects as a
+        `bson.json_util.dumps`/`json.loads` round trip without serialising the document
+
+        Args:
+            value (Any): document or value to convert
+        Returns:
+            Any: JSON compatible document or value
+        """
+        if isinstance(value, dict):
+            return {key: MongoDBDatabase.to_json(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [MongoDBDatabase.to_json(item) for item in value]
+        if isinstance(value, float) and not math.isfinite(value):
+            #JSON has no NaN or Infinity (e.g. the empty cells of a catalog read by pandas)
+            return {"$numberDouble": "NaN" if math.isnan(value)
+                                     else ("Infinity" if value > 0 else "-Infinity")}
+        if value is None or isinstance(value, (str, int, float)):
+            return value
+        return MongoDBDatabase.to_json(json_util.default(value))
+
+    def iterate_documents(self, query: dict | None = None, projection: dict | None = None,
+                          batch_size: int = 1000, as_json: bool = False) -> Iterator[dict]:
+        """
+        The method returns an iterator over the documents of the pointed MongoDB collection
+        matching the query. Documents are fetched from the server `batch_size` documents at a
+        time, so the collection is never held in memory at once.
+
+        Args:
+            query (dict | None): MongoDB filter of the documents to return (all if None)
+            projection (dict | None): MongoDB projection of the fields to return
+            batch_size (int): Number of documents fetched per round trip
+            as_json (bool): If the documents are converted to JSON compatible objects
+        Returns:
+            Iterator[dict]
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        if self.__client is None:
+            raise exceptions.NoConnection
+        cursor = self.__collection.find(query or {}, projection, batch_size=batch_size)
+        if as_json:
+            return (self.to_json(document) for document in cursor)
+        return cursor
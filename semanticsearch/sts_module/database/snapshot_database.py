@@ -0,0 +1,393 @@
+"""
+This script contains the SnapshotDatabase Class, a read only implementation of the Database
+interface reading the collections of a local snapshot directory, so the semantic search module
+can start (e.g. a replica) without a MongoDB Server
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Iterator
+import numpy
+from bson.binary import Binary
+from bson.json_util import dumps, loads
+from . import exceptions
+from .database_interface import Database
+from .memory_database import MemoryDatabase
+from .mongo_db_interface import MongoDBDatabase
+
+
+class SnapshotDatabase(Database):
+    """
+    A Class reading a collection of a local snapshot directory. For each collection the
+    snapshot holds its documents as JSON lines ("<collection>.jsonl", in MongoDB Extended JSON)
+    and, for an embedded dataset collection, the vectors of its documents as a single matrix
+    ("<collection>.npy", memory mapped when loaded). The files of each written snapshot are
+    stored in a new version directory ("version-*") and described by a manifest
+    ("manifest.json") replaced last, so a snapshot is only read once it is complete.
+
+    A snapshot is loaded once per process (shared by every SnapshotDatabase of the same
+    directory and collection) and reloaded when its manifest is replaced.
+
+    Attributes:
+        path (str): Directory of the snapshot
+    """
+    read_only: bool = True
+    manifest_file: str = "manifest.json"
+    format_version: int = 1
+    vector_field: str = "vector"
+    version_prefix: str = "version-"
+    #collections loaded by the process, (path, collection) mapped to (manifest stamp, store)
+    loaded: dict = {}
+    loaded_lock = threading.Lock()
+
+    def __init__(self, path: str, collection: str, database: str = "snapshot"):
+        """
+        Initalising method for the SnapshotDatabase Class
+
+        Args:
+            path (str): Directory of the snapshot
+            collection (str): Name of the Collection inside the snapshot
+            database (str): Name of the Database the snapshot was taken from
+        """
+        self.path: str = path
+        self.__database_name: str = database
+        self.__collection_name: str = collection
+        #loaded collection (None if the snapshot has no such collection)
+        self.__store: dict | None = None
+        self.__connections: int = 0
+
+    @property
+    def server_url(self) -> str:
+        """str: Location of the snapshot"""
+        return f"file://{os.path.abspath(self.path)}"
+
+    @property
+    def database(self) -> str:
+        """str: Name of the Database the snapshot was taken from"""
+        return self.__database_name
+
+    @property
+    def collection(self) -> str:
+        """str: Name of the Collection inside the snapshot"""
+        return self.__collection_name
+
+    def connect(self, create = False) -> None:
+        """
+        Connects to the collection, loading the snapshot on first use
+
+        Args:
+            create (bool): If a collection missing from the snapshot is accepted (read as
+                           an empty collection, the snapshot cannot be written to)
+        Raises:
+            DoesNotExist: If the snapshot, or the collection when not being created, does
+                          not exist
+            ValueError: If the snapshot format is not supported
+        """
+        self.__store = self.__load()
+        if self.__store is None and not create:
+            raise exceptions.DoesNotExist(field="Collection", field_name=self.collection)
+        self.__connections += 1
+
+    def is_connected(self) -> bool:
+        """
+        Method checks if there is a connection active to the collection
+
+        Returns:
+            boolean value
+        """
+        return self.__connections > 0
+
+    def close(self) -> None:
+        """
+        Method closes a connection with the collection (the loaded snapshot stays shared)
+        """
+        self.__connections = max(0, self.__connections - 1)
+
+    def __load(self) -> dict | None:
+        """
+        Method returns the collection of the current snapshot, loading it if the manifest
+        changed since it was last loaded
+
+        Returns:
+            dict | None: the loaded collection (None if the snapshot has no such collection)
+        """
+        manifest_path = os.path.join(self.path, self.manifest_file)
+        try:
+            status = os.stat(manifest_path)
+        except FileNotFoundError as e:
+            raise exceptions.DoesNotExist(field="Snapshot", field_name=self.path) from e
+        key: tuple = (os.path.abspath(self.path), self.collection)
+        stamp: tuple = (status.st_ino, status.st_mtime_ns, status.st_size)
+        with self.loaded_lock:
+            cached = self.loaded.get(key)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            with open(manifest_path, encoding="utf-8") as file:
+                manifest: dict = json.load(file)
+            if manifest.get("format_version") != self.format_version:
+                raise ValueError(f"Unsupported snapshot format: {manifest.get('format_version')}")
+            entry: dict | None = manifest["collections"].get(self.collection)
+            store = self.__load_collection(entry) if entry is not None else None
+            self.loaded[key] = (stamp, store)
+            return store
+
+    def __load_collection(self, entry: dict) -> dict:
+        """
+        Method loads the documents of a collection and memory maps its vectors
+
+        Args:
+            entry (dict): manifest entry of the collection
+        Returns:
+            dict: documents (MemoryDatabase), "_id" of each vector row, row of each "_id",
+                  vectors (None if the collection has none) and fingerprint of the collection
+        """
+        with open(os.path.join(self.path, entry["file"]), encoding="utf-8") as file:
+            documents: list = [loads(line) for line in file if line.strip()]
+        vectors = numpy.load(os.path.join(self.path, entry["vectors"]), mmap_mode="r") \
+                  if entry.get("vectors") else None
+        store = MemoryDatabase(self.database, self.collection, documents)
+        store.connect(create=True)
+        ids: list = [document["_id"] for document in documents]
+        return {"documents": store,
+                "ids": ids,
+                "rows": {document_id: row for row, document_id in enumerate(ids)},
+                "vectors": vectors,
+                "fingerprint": entry["fingerprint"]}
+
+    def __check_connection(self) -> None:
+        """Method raises NoConnection if there is no connection to the collection"""
+        if self.__connections == 0:
+            raise exceptions.NoConnection
+
+    @staticmethod
+    def __includes(projection: dict | None, field: str) -> bool:
+        """Method checks if an inclusion/exclusion projection returns a field"""
+        if not projection:
+            return True
+        fields = {name: value for name, value in projection.items() if name != "_id"}
+        if any(fields.values()):
+            return bool(fields.get(field))
+        return field not in fields
+
+    def __documents(self, query: dict | None, projection: dict | None) -> Iterator[dict]:
+        """
+        Method iterates over the documents matching the query, attaching the vector of each
+        document (read from the memory mapped matrix) when the projection returns it
+        """
+        if self.__store is None:
+            return
+        vectors = self.__store["vectors"]
+        if vectors is None or not self.__includes(projection, self.vector_field):
+            yield from self.__store["documents"].iterate_documents(query, projection)
+            return
+        #the "_id" locates the vector of the document
+        keep_id = projection is None or projection.get("_id", 1)
+        for document in self.__store["documents"].iterate_documents(
+                    query, {**projection, "_id": 1} if projection else None):
+            row: int = self.__store["rows"][document["_id"] if keep_id
+                                            else document.pop("_id")]
+            document[self.vector_field] = Binary(vectors[row].tobytes())
+            if self.__includes(projection, "dtype"):
+                document["dtype"] = vectors.dtype.str
+            yield document
+
+    def find_documents(self, query: dict | None = None,
+                       projection: dict | None = None) -> list[dict]:
+        """
+        The method returns the documents of the collection matching the query
+
+        Args:
+            query (dict | None): equality/"$in" filter of the documents to return (all if None)
+            projection (dict | None): inclusion or exclusion projection of the fields to return
+        Returns:
+            List[dict]
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        self.__check_connection()
+        return list(self.__documents(query, projection))
+
+    def iterate_documents(self, query: dict | None = None, projection: dict | None = None,
+                          batch_size: int = 1000, as_json: bool = False) -> Iterator[dict]:
+        """
+        The method returns an iterator over the documents of the collection matching the query
+
+        Args:
+            query (dict | None): equality/"$in" filter of the documents to return (all if None)
+            projection (dict | None): inclusion or exclusion projection of the fields to return
+            batch_size (int): ignored (accepted for compatibility with MongoDBDatabase)
+            as_json (bool): If the documents are converted to JSON compatible objects
+        Returns:
+            Iterator[dict]
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        self.__check_connection()
+        documents = self.__documents(query, projection)
+        return (MongoDBDatabase.to_json(document) for document in documents) if as_json \
+               else documents
+
+    def load_vectors(self) -> tuple | None:
+        """
+        The method returns the memory mapped vectors of the collection (converted to float32
+        if they are stored in another precision)
+
+        Returns:
+            tuple (list, numpy.ndarray) | None: (document "_id" of each row, matrix) (None if
+                                                the collection has no vectors)
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        self.__check_connection()
+        if self.__store is None or self.__store["vectors"] is None:
+            return None
+        vectors = self.__store["vectors"]
+        if vectors.dtype != numpy.float32:
+            vectors = vectors.astype(numpy.float32)
+        return list(self.__store["ids"]), vectors
+
+    def collection_fingerprint(self) -> str:
+        """
+        The method returns the fingerprint of the collection recorded in the manifest
+
+        Returns:
+            str: fingerprint of the collection (empty if the snapshot has no such collection)
+        Raises:
+            NoConnection: Connection to database has not been established
+        """
+        self.__check_connection()
+        return self.__store["fingerprint"] if self.__store is not None else ""
+
+    def insert_documents(self, documents: list[dict], replace: bool = False) -> None:
+        """
+        Snapshots are read only
+
+        Raises:
+            ReadOnlyCollection: Always
+        """
+        raise exceptions.ReadOnlyCollection(self.database, self.collection)
+
+    def upsert_documents(self, documents: list[dict]) -> None:
+        """
+        Snapshots are read only
+
+        Raises:
+            ReadOnlyCollection: Always
+        """
+        raise exceptions.ReadOnlyCollection(self.database, self.collection)
+
+    def delete_documents(self, ids: list) -> None:
+        """
+        Snapshots are read only
+
+        Raises:
+            ReadOnlyCollection: Always
+        """
+        raise exceptions.ReadOnlyCollection(self.database, self.collection)
+
+    @classmethod
+    def write_snapshot(cls, path: str, databases: list[Database]) -> dict:
+        """
+        Method writes the collections of the given databases (e.g. the courses and the
+        embedded dataset collections) to a snapshot directory. The files are written to a
+        new version directory and the manifest is replaced last (the single commit point),
+        so processes reading the directory never see a partially written snapshot. The
+        version of the previous manifest is kept for processes which have just read it,
+        older versions are deleted.
+
+        Args:
+            path (str): Directory of the snapshot (created if missing)
+            databases (list[Database]): Database Objects connecting to the collections
+        Returns:
+            dict: the manifest of the snapshot
+        Raises:
+            ValueError: If only some documents of a collection have a vector
+        """
+        os.makedirs(path, exist_ok=True)
+        previous: str | None = cls.__manifest_version(path)
+        version: str = os.path.basename(tempfile.mkdtemp(prefix=cls.version_prefix, dir=path))
+        #readers may run as another user
+        os.chmod(os.path.join(path, version), 0o755)
+        collections: dict = {}
+        try:
+            for database in databases:
+                database.connect()
+                try:
+                    collections[database.collection] = cls.__write_collection(path, version,
+                                                                               database)
+                finally:
+                    database.close()
+        except BaseException:
+            shutil.rmtree(os.path.join(path, version), ignore_errors=True)
+            raise
+        manifest: dict = {"format_version": cls.format_version,
+                          "created_at": time.time(),
+                          "version": version,
+                          "collections": collections}
+        temporary_path = os.path.join(path, cls.manifest_file + f".{version}.tmp")
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(temporary_path, os.path.join(path, cls.manifest_file))
+        for name in os.listdir(path):
+            if name.startswith(cls.version_prefix) and name not in (version, previous):
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+        return manifest
+
+    @classmethod
+    def __manifest_version(cls, path: str) -> str | None:
+        """
+        Method returns the version directory of the current manifest of a snapshot directory
+
+        Returns:
+            str | None: version directory (None if there is no manifest or it has no version)
+        """
+        try:
+            with open(os.path.join(path, cls.manifest_file), encoding="utf-8") as file:
+                return json.load(file).get("version")
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @classmethod
+    def __write_collection(cls, path: str, version: str, database: Database) -> dict:
+        """
+        Method writes the documents of a collection as JSON lines and their vectors (if any)
+        as a single .npy matrix, inside the version directory of the snapshot
+
+        Returns:
+            dict: manifest entry of the collection (file paths relative to the snapshot)
+        """
+        digest = hashlib.sha256()
+        rows, dtypes = [], set()
+        documents = 0
+        documents_file: str = f"{version}/{database.collection}.jsonl"
+        with open(os.path.join(path, documents_file), "w", encoding="utf-8") as file:
+            for document in database.iterate_documents():
+                vector = document.pop(cls.vector_field, None)
+                if vector is not None:
+                    rows.append(numpy.frombuffer(vector, dtype=document["dtype"]))
+                    dtypes.add(document["dtype"])
+                line: str = dumps(document)
+                digest.update(line.encode("utf-8"))
+                file.write(line + "\n")
+                documents += 1
+        if 0 < len(rows) < documents:
+            raise ValueError(f"Only {len(rows)} of the {documents} documents of the "
+                             f"{database.collection} collection have a vector")
+        entry: dict = {"file": documents_file, "documents": documents}
+        if len(rows) > 0:
+            #vectors keep their stored precision (float32 if the documents disagree)
+            matrix = numpy.vstack(rows).astype(dtypes.pop() if len(dtypes) == 1 else "<f4",
+                                               copy=False)
+            digest.update(matrix.tobytes())
+            vectors_file: str = f"{version}/{database.collection}.npy"
+            with open(os.path.join(path, vectors_file), "wb") as file:
+                numpy.save(file, matrix)
+            entry.update({"vectors": vectors_file,
+                          "dtype": matrix.dtype.str,
+                          "dimension": matrix.shape[1]})
+        entry["fingerprint"] = digest.hexdigest()
+        return entry
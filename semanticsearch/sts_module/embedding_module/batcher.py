@@ -0,0 +1,131 @@
+"""
+Script contains the QueryEncodeBatcher Class, an asyncio request batcher grouping concurrent
+query embedding requests into a single batched call to the embedding model
+"""
+import asyncio
+import time
+from typing import Callable
+import numpy
+
+
+class QueryEncodeBatcher:
+    """
+    Class collects queries submitted concurrently (e.g. by concurrent API requests) for up to
+    `max_wait_ms` milliseconds or `max_batch_size` queries, embeds them with one batched call
+    to the encode function (run in a worker thread) and fans the embeddings back out to the
+    waiting callers.
+
+    Attributes:
+        max_batch_size (int): Maximum number of queries embedded in a single call
+        max_wait_ms (float): Maximum time (ms) the first query of a batch waits for others
+    """
+    def __init__(self, encode: Callable[[list[str]], numpy.ndarray], max_batch_size: int = 32,
+                 max_wait_ms: float = 2.0):
+        """
+        Initalising method for the QueryEncodeBatcher Class
+
+        Args:
+            encode (Callable): function embedding a list of queries (one row per query)
+            max_batch_size (int): Maximum number of queries embedded in a single call
+            max_wait_ms (float): Maximum time (ms) the first query of a batch waits for others
+        """
+        self.max_batch_size: int = max(1, max_batch_size)
+        self.max_wait_ms: float = max_wait_ms
+        self.__encode: Callable[[list[str]], numpy.ndarray] = encode
+        self.__queue: asyncio.Queue | None = None
+        self.__worker: asyncio.Task | None = None
+        self.batches: int = 0
+        self.queries: int = 0
+
+    async def start(self) -> None:
+        """
+        Method starts the worker task of the batcher (must be called from the event loop)
+        """
+        if self.__worker is None:
+            self.__queue = asyncio.Queue()
+            self.__worker = asyncio.create_task(self.__run())
+
+    async def stop(self) -> None:
+        """
+        Method stops the worker task of the batcher
+        """
+        if self.__worker is not None:
+            self.__worker.cancel()
+            try:
+                await self.__worker
+            except asyncio.CancelledError:
+                pass
+            self.__worker = None
+
+    async def encode(self, query: str) -> numpy.ndarray:
+        """
+        Method submits a query to the next batch and waits for its embedding
+
+        Args:
+            query (str): query to be embedded
+        Returns:
+            numpy.ndarray: the embedded query
+        Raises:
+            RuntimeError: If the batcher has not been started
+        """
+        if self.__worker is None:
+            raise RuntimeError("QueryEncodeBatcher has not been started")
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self.__queue.put((query, future))
+        return await future
+
+    async def __collect(self) -> list:
+        """
+        Method waits for a query, then collects further queries until the batch is full
+        or the maximum wait time of the first query has passed
+
+        Returns:
+            list[tuple (str, asyncio.Future)]: queries of the batch and their futures
+        """
+        batch = [await self.__queue.get()]
+        deadline: float = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining: float = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.__queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def __run(self) -> None:
+        """Method is the worker loop embedding one batch of queries at a time"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.__collect()
+            #callers may have been cancelled while waiting
+            batch = [(query, future) for query, future in batch if not future.done()]
+            if len(batch) == 0:
+                continue
+            self.batches += 1
+            self.queries += len(batch)
+            try:
+                embeddings = await loop.run_in_executor(
+                                        None, self.__encode, [query for query, _ in batch])
+            except Exception as exception: #pylint:disable=broad-exception-caught
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exception)
+                continue
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+
+    def stats(self) -> dict:
+        """
+        Method returns the counters of the batcher
+
+        Returns:
+            dict: number of batches and queries embedded and the mean batch size
+        """
+        return {"batches": self.batches,
+                "queries": self.queries,
+                "mean_batch_size": self.queries / self.batches if self.batches > 0 else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms}
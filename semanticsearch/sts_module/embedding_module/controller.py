@@ -1,42 +1,125 @@
 """Embedding Class is an interface for the jinaai/jina-embeddings-v3 embedding model"""
+import copy
+import hashlib
+import itertools
 import json
+import os
 import re
-from typing import Union
-import torch
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Union
 import numpy
-from sentence_transformers import SentenceTransformer
-from sentence_transformers.util import semantic_search
-from pandas import DataFrame
 from ..database.database_helper import DatabaseHelper
-from ..database.mongo_db_interface import MongoDBDatabase
+from ..database.database_interface import Database
+from ..index_module.vector_index import VectorIndex
+from ..index_module.ivf_index import IVFIndex
+from ..index_module.quantized_index import QuantizedIndex
+from ..index_module.filters import AttributeIndex, SearchFilters
+from ..cache_module.lru_cache import LRUCache
+from .encoders import Encoder, check_encoder_backend, create_encoder
+from .parallel import ShardedEncoder
+#pandas is imported on first use (torch and sentence_transformers by the encoder backends)
+#pylint:disable=import-outside-toplevel
+
+if TYPE_CHECKING:
+    import pandas
 
 
 class EmbeddingController:
     """Class will perform both embedding and STS Comparisions between text type data"""
     model_name: str = "jinaai/jina-embeddings-v3"
-    model = SentenceTransformer("jinaai/jina-embeddings-v3", trust_remote_code=True)
+    model_revision: str = "main"
+    #encoder backend running the model (ENCODER_BACKEND) and its torch thread pools
+    encoder_backend: str = os.getenv('ENCODER_BACKEND', 'sentence-transformers')
+    encoder_intra_op_threads: int | None = int(os.getenv('ENCODER_INTRA_OP_THREADS', '0')) or None
+    encoder_inter_op_threads: int | None = int(os.getenv('ENCODER_INTER_OP_THREADS', '0')) or None
+    #process wide encoder, loaded on first use (see `get_model` and `configure_encoder`)
+    model: Encoder | None = None
+    model_lock = threading.Lock()
+    #model version recorded with stored embeddings (includes the backend and embedding_dim)
+    model_version: str = f"{model_name}@{model_revision}"
+    #Matryoshka truncation dimension of the embeddings (full dimension if None)
+    embedding_dim: int | None = None
+    storage_formats: tuple = ("binary", "dataframe")
+    hydration_modes: tuple = ("query", "local")
+    index_classes: dict = {"exact": VectorIndex, "ivf": IVFIndex, "quantized": QuantizedIndex}
+    #processes (and their torch threads) embedding the catalog at dataset build time and
+    #the number of passages per shard, see `configure_parallel_encoding`
+    encode_workers: int = 1
+    encode_worker_threads: int | None = None
+    encode_shard_size: int = 256
+    #pool of worker processes kept for the lifetime of the application (see
+    #`start_encode_workers`), a pool is started per build if None
+    sharded_encoder: ShardedEncoder | None = None
+    #number of shards whose passages are sorted by length together (see `bucket_by_length`)
+    bucket_shards: int = 16
+    #cache of query embeddings shared by every controller (see `configure_query_cache`)
+    query_cache: LRUCache = LRUCache(max_entries=1024, sizeof=lambda vector: vector.nbytes)
+    #structures derived from the catalog shared by every controller (see `cached_catalog`)
+    catalog_cache: LRUCache = LRUCache(max_entries=16)
+    catalog_lock = threading.Lock()
 
-    def __init__(self, courses_database: MongoDBDatabase, embedded_database: MongoDBDatabase):
+    def __init__(self, courses_database: Database, embedded_database: Database,
+                 storage_format: str = "binary", storage_dtype: str = "float32",
+                 hydration: str = "query", hydration_fields: list[str] | None = None):
         """
         When initialising the Embedding Controller class, the class object must have access to both
         the courses and embedded dataset endpoints on the database server
 
         Args:
-        courses_database (MongoDBDatabase): Database Object creating/connecting to the new 
-                                            Database and Collection storing courses data inside
-                                            the MongoDB Server.
-        embedded_database (MongoDBDatabase): Database Object creating/connecting to the new 
-                                            Database and Collection storing the embedded dataset 
-                                            inside the MongoDB Server.
+        courses_database (Database): Database Object creating/connecting to the new 
+                                     Database and Collection storing courses data inside
+                                     the MongoDB Server.
+        embedded_database (Database): Database Object creating/connecting to the new 
+                                     Database and Collection storing the embedded dataset 
+                                     inside the MongoDB Server.
+        storage_format (str): Format the embedded dataset is stored in on the database:
+                              "binary" (a BSON binary vector per course keyed by the course
+                              "_id") or "dataframe" (a numeric field per vector dimension)
+        storage_dtype (str): Precision of the vectors in the "binary" storage format
+                             ("float32" or "float16")
+        hydration (str): How `courses_semantic_search` fetches the top k courses by "_id":
+                         "query" (a single "$in" query per search) or "local" (a map of
+                         the courses by "_id" shared by every controller, loaded again
+                         when the courses change)
+        hydration_fields (list[str] | None): Fields of the returned courses (all if None)
+        Raises:
+            ValueError: If the storage format or hydration mode is not supported
         """
-        self.__courses_database: MongoDBDatabase = courses_database
-        self.__embedded_database: MongoDBDatabase = embedded_database
+        if storage_format not in self.storage_formats:
+            raise ValueError(f"Unsupported embedded dataset storage format: {storage_format}")
+        if hydration not in self.hydration_modes:
+            raise ValueError(f"Unsupported hydration mode: {hydration}")
+        self.__courses_database: Database = courses_database
+        self.__embedded_database: Database = embedded_database
+        self.__storage_format: str = storage_format
+        self.__storage_dtype: str = storage_dtype
+        self.__hydration: str = hydration
+        self.__hydration_fields: list[str] | None = hydration_fields
+
+    @property
+    def storage_format(self) -> str:
+        """str: Format the embedded dataset is stored in on the database"""
+        return self.__storage_format
 
     def create_embedded_dataset(self) -> None:
         """
         Method obtains the courses data from the database, creates and stores the embedded 
         dataset on a new database inside the MongoDB server 
+
+        In the "binary" storage format the courses are embedded in length bucketed shards,
+        each fetched from the database by "_id" when it is embedded and stored as soon as it
+        is embedded, so only the ids of the courses are held in memory (see `__store_shards`).
         """
+        if self.__storage_format == "binary":
+            #replace any existing data, then stream the courses through the pipeline
+            DatabaseHelper.store_embedded_dataset_binary(
+                                database=self.__embedded_database,
+                                dataset=numpy.empty((0, 0), dtype=numpy.float32),
+                                course_ids=[])
+            self.__store_shards([(course_id, len(passage.split()))
+                                 for course_id, passage, _ in self.__course_passages()])
+            return
         #obtain courses from database as json format
         data: list = DatabaseHelper.load_collection_data_json(self.__courses_database)
         # create embedded dataset
@@ -44,6 +127,175 @@ class EmbeddingController:
         DatabaseHelper.store_embedded_dataset(database=self.__embedded_database,
                                                         dataset=embedded_dataset)
 
+    def update_embedded_dataset(self) -> dict:
+        """
+        Method incrementally updates the embedded dataset stored on the database. Each stored
+        vector carries the hash of the passage it embeds and the model version used, so only
+        new or changed courses are embedded, vectors of removed courses are deleted and the
+        model is not called when nothing has changed.
+
+        The "dataframe" storage format has no per course keys, so the full embedded dataset
+        is recreated instead.
+
+        Returns:
+            dict: number of courses "added", "updated", "removed" and "unchanged"
+        """
+        if self.__storage_format != "binary":
+            self.create_embedded_dataset()
+            count = len(DatabaseHelper.load_collection_data_json(self.__courses_database,
+                                                                 projection={"_id": 1}))
+            return {"added": count, "updated": 0, "removed": 0, "unchanged": 0}
+
+        stored: dict = DatabaseHelper.load_embedded_dataset_metadata(self.__embedded_database)
+        counts: dict = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        seen: set = set()
+        #courses which are new, or whose passage or embedding model has changed, are
+        #found first (the cursor over the courses is not held open while embedding)
+        self.__store_shards(list(self.__changed_courses(stored, counts, seen)))
+        removed: list = list(set(stored) - seen)
+        if len(removed) > 0:
+            DatabaseHelper.update_embedded_dataset_binary(
+                                database=self.__embedded_database,
+                                dataset=numpy.empty((0, 0), dtype=numpy.float32),
+                                course_ids=[], removed_ids=removed)
+        counts["removed"] = len(removed)
+        return counts
+
+    def __course_passages(self) -> Iterator[tuple]:
+        """
+        Method streams the courses from the database, converting each course to its passage
+
+        Returns:
+            Iterator[tuple (Any, str, str)]: (course "_id", passage, content hash) of each course
+        """
+        for course in DatabaseHelper.iterate_collection_data_json(self.__courses_database):
+            passage = self.create_passage(course)
+            yield DatabaseHelper.course_id(course), passage, self.content_hash(passage)
+
+    def __changed_courses(self, stored: dict, counts: dict, seen: set) -> Iterator[tuple]:
+        """
+        Method streams the courses which are new, or whose passage or embedding model has
+        changed since their vector was stored
+
+        Args:
+            stored (dict): course "_id" mapped to the stored metadata document of its vector
+            counts (dict): counts of "added", "updated" and "unchanged" courses (updated)
+            seen (set): "_id" of every streamed course (updated)
+        Returns:
+            Iterator[tuple (Any, int)]: (course "_id", number of words of the passage) of
+                                        each changed course
+        """
+        for course_id, passage, content_hash in self.__course_passages():
+            seen.add(course_id)
+            metadata = stored.get(course_id)
+            if metadata is None:
+                counts["added"] += 1
+            elif metadata.get("content_hash") != content_hash \
+                    or metadata.get("model") != self.model_version:
+                counts["updated"] += 1
+            else:
+                counts["unchanged"] += 1
+                continue
+            yield course_id, len(passage.split())
+
+    def __store_shards(self, courses: list[tuple]) -> None:
+        """
+        Method embeds courses in shards of passages of similar length (see `bucket_by_length`)
+        and upserts each shard into the embedded dataset as soon as it is embedded. The
+        courses of each shard are fetched by "_id" when the shard is embedded, so no cursor
+        is held open while embedding (which may take longer than the cursor idle timeout).
+
+        Args:
+            courses (list[tuple (Any, int)]): (course "_id", number of words of the passage)
+                                              of each course to embed
+        """
+        #each shard is its own key, so its courses are matched to its embeddings
+        shards = ((shard, [passage for _, passage, _ in shard])
+                  for shard in self.__load_shards(courses))
+        for shard, embeddings in self.encode_batches(shards):
+            DatabaseHelper.update_embedded_dataset_binary(
+                                database=self.__embedded_database,
+                                dataset=embeddings,
+                                course_ids=[course_id for course_id, _, _ in shard],
+                                removed_ids=[],
+                                dtype=self.__storage_dtype,
+                                content_hashes=[content_hash for _, _, content_hash in shard],
+                                model=self.model_version)
+
+    def __load_shards(self, courses: list[tuple]) -> Iterator[list]:
+        """
+        Method fetches the courses of each length bucketed shard with a single "$in" query
+        (courses removed since they were listed are skipped)
+
+        Args:
+            courses (list[tuple (Any, int)]): (course "_id", number of words of the passage)
+                                              of each course to embed
+        Returns:
+            Iterator[list[tuple (Any, str, str)]]: (course "_id", passage, content hash) of
+                                                   the courses of each shard
+        """
+        for shard in self.bucket_by_length(courses, self.encode_shard_size, self.bucket_shards,
+                                           length=lambda course: course[1]):
+            documents: dict = DatabaseHelper.load_courses_by_id(
+                                self.__courses_database, [course_id for course_id, _ in shard])
+            passages: list = [(course_id, self.create_passage(documents[course_id]))
+                              for course_id, _ in shard if course_id in documents]
+            if len(passages) > 0:
+                yield [(course_id, passage, self.content_hash(passage))
+                       for course_id, passage in passages]
+
+    @staticmethod
+    def bucket_by_length(courses: Iterable[tuple], shard_size: int, bucket_shards: int = 16,
+                         length: Callable[[tuple], int] | None = None) -> Iterator[list]:
+        """
+        Method groups streamed courses into shards of passages of similar length. Every
+        `bucket_shards` shards worth of courses are sorted by the number of words of their
+        passage before being split into shards, so the passages of a shard are padded to a
+        similar number of tokens (the number of courses held at a time is bounded).
+
+        Args:
+            courses (Iterable[tuple]): courses, each a tuple whose second item is its passage
+            shard_size (int): Number of courses of each shard
+            bucket_shards (int): Number of shards sorted together
+            length (Callable[[tuple], int] | None): length of a course (the number of words
+                                                    of its passage if None)
+        Returns:
+            Iterator[list[tuple]]: courses of each shard
+        """
+        courses = iter(courses)
+        while True:
+            bucket = list(itertools.islice(courses, shard_size * bucket_shards))
+            if len(bucket) == 0:
+                return
+            bucket.sort(key=length or (lambda course: len(course[1].split())))
+            for start in range(0, len(bucket), shard_size):
+                yield bucket[start:start + shard_size]
+
+    @staticmethod
+    def create_passage(course: dict) -> str:
+        """
+        Method converts a course (dict) into the "passage" string that is embedded
+        (the JSON string of the course with special characters removed)
+
+        Args:
+            course (dict): course data
+        Returns:
+            str: passage string of the course
+        """
+        return re.sub('[^A-Za-z0-9 ]+', '', json.dumps(course))
+
+    @staticmethod
+    def content_hash(passage: str) -> str:
+        """
+        Method returns the hash of a passage, used to detect when a course has changed
+
+        Args:
+            passage (str): passage string of a course
+        Returns:
+            str: SHA-256 hex digest of the passage
+        """
+        return hashlib.sha256(passage.encode("utf-8")).hexdigest()
+
     def create_embedding(self, data: Union[str, list]) -> numpy.ndarray:
         """
         Method Creates embeddings using the HuggingFace API Framework through the 
@@ -59,26 +311,490 @@ class EmbeddingController:
         """
         #for each dict data obj convert to string then clean data (remove special characters)
         if isinstance(data, list):
-            data_to_embed = [re.sub('[^A-Za-z0-9 ]+', '', json.dumps(course)) for course in data]
-            return self.model.encode(data_to_embed)
+            data_to_embed = [self.create_passage(course) for course in data]
+            return self.encode_passages(data_to_embed)
+
+        return self.create_query_embedding(data)
+
+    @classmethod
+    def encode(cls, data: Union[str, list[str]]) -> numpy.ndarray:
+        """
+        Method runs the embedding model, truncating the embeddings to the configured
+        `embedding_dim` (jina-embeddings-v3 supports Matryoshka truncation)
+
+        Args:
+            data (str | list[str]): text(s) to be embedded
+        Returns:
+            numpy.ndarray: the embedding(s) of the text(s)
+        """
+        return cls.truncate(cls.get_model().encode(data), cls.embedding_dim)
+
+    @classmethod
+    def encode_batches(cls, shards: Iterable[tuple]) -> Iterator[tuple]:
+        """
+        Method embeds shards of passages, yielding each shard as soon as it is embedded.
+        With more than one `encode_workers` the shards are embedded by a pool of worker
+        processes (see ShardedEncoder) and complete out of order. The pool started by
+        `start_encode_workers` is used if running, otherwise a pool is started for the call.
 
-        return self.model.encode(data)
+        Args:
+            shards (Iterable[tuple (Any, list[str])]): (key, passages) of each shard
+        Returns:
+            Iterator[tuple (Any, numpy.ndarray)]: (key, embeddings) of each shard
+        """
+        if cls.encode_workers <= 1:
+            for key, passages in shards:
+                yield key, cls.encode(passages)
+            return
+        if cls.sharded_encoder is not None:
+            for key, embeddings in cls.sharded_encoder.map_shards(shards):
+                yield key, cls.truncate(embeddings, cls.embedding_dim)
+            return
+        with ShardedEncoder(cls.encoder_backend, cls.model_name, cls.encode_workers,
+                            cls.encode_worker_threads, cls.encode_shard_size) as encoder:
+            for key, embeddings in encoder.map_shards(shards):
+                yield key, cls.truncate(embeddings, cls.embedding_dim)
+
+    @classmethod
+    def start_encode_workers(cls) -> None:
+        """
+        Method starts the pool of worker processes embedding the catalog (with more than one
+        `encode_workers`), kept until `stop_encode_workers` so every embedded dataset build
+        (e.g. on each catalog change) reuses the workers and their loaded model replicas
+        """
+        if cls.encode_workers > 1 and cls.sharded_encoder is None:
+            cls.sharded_encoder = ShardedEncoder(cls.encoder_backend, cls.model_name,
+                                                 cls.encode_workers, cls.encode_worker_threads,
+                                                 cls.encode_shard_size)
+            cls.sharded_encoder.start()
+
+    @classmethod
+    def stop_encode_workers(cls) -> None:
+        """
+        Method stops the pool of worker processes started by `start_encode_workers`
+        """
+        if cls.sharded_encoder is not None:
+            cls.sharded_encoder.close()
+            cls.sharded_encoder = None
+
+    @classmethod
+    def encode_in_shards(cls, passages: list[str]) -> Iterator[tuple]:
+        """
+        Method embeds passages in shards of `encode_shard_size` passages, yielding each
+        shard as soon as it is embedded (see `encode_batches`)
+
+        Args:
+            passages (list[str]): passages to be embedded
+        Returns:
+            Iterator[tuple (int, numpy.ndarray)]: (position of the first passage, embeddings)
+                                                  of each shard
+        """
+        return cls.encode_batches((start, passages[start:start + cls.encode_shard_size])
+                                  for start in range(0, len(passages), cls.encode_shard_size))
+
+    @classmethod
+    def encode_passages(cls, passages: list[str]) -> numpy.ndarray:
+        """
+        Method embeds passages in shards (see `encode_in_shards`), merging the shards in the
+        original order of the passages
+
+        Args:
+            passages (list[str]): passages to be embedded
+        Returns:
+            numpy.ndarray: the embeddings of the passages (one row per passage)
+        """
+        shards: dict = dict(cls.encode_in_shards(passages))
+        if len(shards) == 0:
+            return numpy.empty((0, 0), dtype=numpy.float32)
+        return numpy.concatenate([shards[start] for start in sorted(shards)])
+
+    @classmethod
+    def configure_parallel_encoding(cls, workers: int, threads_per_worker: int | None = None,
+                                    shard_size: int = 256, bucket_shards: int = 16) -> None:
+        """
+        Method configures how the catalog is embedded at dataset build time. With more than
+        one worker the passages are embedded by a pool of processes, each running a replica
+        of the model of the configured encoder backend with pinned torch thread pools.
+
+        Args:
+            workers (int): Number of worker processes (embedded in process if 1)
+            threads_per_worker (int | None): torch intra-op threads of each worker process
+                                             (the CPU cores are divided between the workers
+                                             if None)
+            shard_size (int): Number of passages embedded (and stored) at a time
+            bucket_shards (int): Number of shards whose passages are sorted by length together
+        """
+        cls.encode_workers = max(1, workers)
+        cls.encode_worker_threads = threads_per_worker
+        cls.encode_shard_size = max(1, shard_size)
+        cls.bucket_shards = max(1, bucket_shards)
+
+    @staticmethod
+    def truncate(embeddings: numpy.ndarray, embedding_dim: int | None) -> numpy.ndarray:
+        """
+        Method truncates embeddings to their first `embedding_dim` dimensions and
+        renormalises them to unit length
+
+        Args:
+            embeddings (numpy.ndarray): embedding vector or matrix
+            embedding_dim (int | None): dimension to truncate to (unchanged if None)
+        Returns:
+            numpy.ndarray: truncated embedding(s)
+        """
+        if embedding_dim is None or embedding_dim >= numpy.shape(embeddings)[-1]:
+            return embeddings
+        truncated = numpy.array(embeddings[..., :embedding_dim], dtype=numpy.float32)
+        norms = numpy.linalg.norm(truncated, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return truncated / norms
+
+    @classmethod
+    def configure_embedding_dim(cls, embedding_dim: int | None) -> None:
+        """
+        Method configures the dimension embeddings are truncated to, at dataset creation,
+        storage and query time. The dimension is part of the model version recorded with
+        the stored embeddings, so a changed dimension triggers a rebuild of the embedded
+        dataset (see `update_embedded_dataset`).
+
+        Args:
+            embedding_dim (int | None): dimension to truncate to (full dimension if None)
+        """
+        cls.embedding_dim = embedding_dim
+        cls.update_model_version()
+
+    @classmethod
+    def get_model(cls) -> Encoder:
+        """
+        Method returns the encoder of the process, loading the model of the configured
+        `encoder_backend` on first use (once per process, also under concurrent first use)
+
+        Returns:
+            Encoder: encoder backend of the embedding model
+        """
+        if cls.model is None:
+            with cls.model_lock:
+                if cls.model is None:
+                    cls.model = create_encoder(cls.encoder_backend, cls.model_name,
+                                               intra_op_threads=cls.encoder_intra_op_threads,
+                                               inter_op_threads=cls.encoder_inter_op_threads)
+        return cls.model
+
+    @classmethod
+    def check_encoder(cls) -> None:
+        """
+        Method checks the configured `encoder_backend` is supported and its dependencies are
+        installed, without loading the model
+
+        Raises:
+            ValueError: If the encoder backend is not supported
+            ImportError: If a dependency of the encoder backend is not installed
+        """
+        check_encoder_backend(cls.encoder_backend)
+
+    @classmethod
+    def configure_encoder(cls, encoder: Encoder) -> None:
+        """
+        Method replaces the encoder backend running the embedding model. The backend is part
+        of the model version recorded with the stored embeddings, so a changed backend
+        triggers a rebuild of the embedded dataset (see `update_embedded_dataset`).
+
+        Args:
+            encoder (Encoder): encoder backend of the embedding model
+        """
+        with cls.model_lock:
+            cls.model = encoder
+            cls.encoder_backend = encoder.backend
+        cls.update_model_version()
+
+    @classmethod
+    def update_model_version(cls) -> None:
+        """
+        Method updates the model version recorded with the stored embeddings from the model
+        name/revision, encoder backend and embedding dimension
+        """
+        cls.model_version = f"{cls.model_name}@{cls.model_revision}"
+        if cls.encoder_backend != "sentence-transformers":
+            cls.model_version += f"/backend={cls.encoder_backend}"
+        if cls.embedding_dim is not None:
+            cls.model_version += f"/dim={cls.embedding_dim}"
+
+    @classmethod
+    def create_query_embedding(cls, query: str) -> numpy.ndarray:
+        """
+        Method creates the embedding of a single query string. The method does not
+        require access to the database, so it can be used alongside a VectorIndex.
+        Embeddings are cached by the normalised query and model version, so repeated
+        queries do not run the embedding model.
+
+        Args:
+            query (str): query to be embedded
+        Returns:
+            numpy.ndarray: the embedded query (read only)
+        """
+        key: tuple = (cls.model_version, cls.normalise_query(query))
+        embedded_query = cls.query_cache.get(key)
+        if embedded_query is None:
+            #the normalised text is embedded, so the cached embedding matches its key
+            embedded_query = cls.encode(key[1])
+            embedded_query.setflags(write=False)
+            cls.query_cache.put(key, embedded_query)
+        return embedded_query
+
+    @classmethod
+    def create_query_embeddings(cls, queries: list[str]) -> numpy.ndarray:
+        """
+        Method creates the embeddings of a batch of query strings. Cached embeddings are
+        reused and every remaining (distinct) query is embedded with a single batched call
+        to the embedding model.
+
+        Args:
+            queries (list[str]): queries to be embedded
+        Returns:
+            numpy.ndarray: the embedded queries (one row per query)
+        """
+        keys: list = [(cls.model_version, cls.normalise_query(query)) for query in queries]
+        embedded_queries: dict = {}
+        for key in keys:
+            if key not in embedded_queries:
+                embedded_query = cls.query_cache.get(key)
+                if embedded_query is not None:
+                    embedded_queries[key] = embedded_query
+        #embed each uncached query once
+        missing: list = list(dict.fromkeys(key for key in keys if key not in embedded_queries))
+        if len(missing) > 0:
+            for key, embedded_query in zip(missing, cls.encode([key[1] for key in missing])):
+                embedded_query.setflags(write=False)
+                cls.query_cache.put(key, embedded_query)
+                embedded_queries[key] = embedded_query
+        return numpy.stack([embedded_queries[key] for key in keys])
+
+    @staticmethod
+    def normalise_query(query: str) -> str:
+        """
+        Method normalises a query, collapsing repeated whitespace. The normalised query is
+        both the cache key and the text embedded, so equal keys always produce equal
+        embeddings
+
+        Args:
+            query (str): query to normalise
+        Returns:
+            str: normalised query
+        """
+        return " ".join(query.split())
+
+    @classmethod
+    def configure_query_cache(cls, max_entries: int, max_bytes: int | None = None,
+                              ttl: float | None = None) -> None:
+        """
+        Method replaces the query embedding cache with an empty cache of the given bounds
+
+        Args:
+            max_entries (int): Maximum number of cached query embeddings (0 disables caching)
+            max_bytes (int | None): Maximum total size (bytes) of cached query embeddings
+            ttl (float | None): Seconds a cached query embedding remains valid
+        """
+        cls.query_cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl,
+                                   sizeof=lambda vector: vector.nbytes)
 
     def retrieve_embedded_dataset(self) -> numpy.ndarray:
         """
         Method returns the embedded dataset from the Database. 
         The method will convert retrieved data from a pandas Dataframe Object
-        into numpy.ndarray form.
+        into numpy.ndarray form (in the "binary" storage format the matrix is
+        rebuilt directly from the stored buffers).
 
         Returns:
             numpy.ndarray: 
         """
-        dataframe: DataFrame = DatabaseHelper.load_collection_data_dataframe(
+        if self.__storage_format == "binary":
+            _, embedded_dataset = DatabaseHelper.load_embedded_dataset_binary(
+                                                        self.__embedded_database)
+            return embedded_dataset
+        dataframe: "pandas.DataFrame" = DatabaseHelper.load_collection_data_dataframe(
                                                         self.__embedded_database)
         dataframe = dataframe.drop(columns=["_id"])
         return dataframe.to_numpy()
 
-    def courses_semantic_search(self, query: str, top_k: int=5) -> list[dict]:
+    def load_vector_index(self, index_type: str = "exact",
+                          index_database: Database | None = None,
+                          **index_options) -> VectorIndex:
+        """
+        Method loads the courses data and the embedded dataset from the database once
+        and builds a process resident VectorIndex from them.
+
+        Approximate index types ("ivf" and "quantized") are trained once and their state persisted
+        in the index database next to the embedded dataset, so later loads reuse the
+        stored state while it remains compatible with the embedded dataset.
+
+        Args:
+            index_type (str): type of index to build ("exact", "ivf" or "quantized")
+            index_database (Database | None): Database Object connecting to the
+                                     Collection storing vector index states
+                                     (states are not persisted if None)
+            **index_options: options passed to the index (e.g. n_lists, n_probe, precision)
+        Returns:
+            VectorIndex: index aligning the embedded dataset to the courses data
+        Raises:
+            ValueError: If the index type is not supported
+        """
+        if index_type not in self.index_classes:
+            raise ValueError(f"Unsupported vector index type: {index_type}")
+        index_class = self.index_classes[index_type]
+        courses, embedded_dataset = self.__load_aligned_dataset()
+        if index_class is VectorIndex:
+            return VectorIndex(embedded_dataset, courses)
+        vector_index = None
+        state = DatabaseHelper.load_index_state(index_database, index_type) \
+                if index_database is not None else None
+        if state is not None:
+            vector_index = index_class.from_state(embedded_dataset, courses, state,
+                                                  **index_options)
+        if vector_index is None:
+            vector_index = index_class(embedded_dataset, courses, **index_options)
+            if index_database is not None:
+                DatabaseHelper.store_index_state(index_database, vector_index.state())
+        return vector_index
+
+    def __load_aligned_dataset(self) -> tuple:
+        """
+        Method loads the courses data and the embedded dataset aligned by position.
+        In the "binary" storage format rows are matched to courses by the course "_id",
+        otherwise both collections are assumed to be returned in the same order
+
+        Returns:
+            tuple (list[dict], numpy.ndarray): (courses, embedded dataset)
+        Raises:
+            ValueError: If the stored dimension does not match the configured embedding_dim
+        """
+        courses: list = DatabaseHelper.load_collection_data_json(database=self.__courses_database)
+        if self.__storage_format != "binary":
+            embedded_dataset: numpy.ndarray = self.retrieve_embedded_dataset()
+        else:
+            course_ids, embedded_dataset = DatabaseHelper.load_embedded_dataset_binary(
+                                                            self.__embedded_database)
+            rows: dict = {course_id: row for row, course_id in enumerate(course_ids)}
+            #courses without a stored embedding are not searchable
+            courses = [course for course in courses if DatabaseHelper.course_id(course) in rows]
+            embedded_dataset = embedded_dataset[[rows[DatabaseHelper.course_id(course)]
+                                                 for course in courses]]
+        self.__check_dimension(embedded_dataset)
+        return courses, embedded_dataset
+
+    def __check_dimension(self, embedded_dataset: numpy.ndarray) -> None:
+        """
+        Method checks the dimension of the stored embedded dataset
+
+        Raises:
+            ValueError: If the stored dimension does not match the configured embedding_dim
+        """
+        if self.embedding_dim is not None and embedded_dataset.shape[1] != self.embedding_dim:
+            raise ValueError(f"Embedded dataset dimension {embedded_dataset.shape[1]} does not "
+                             f"match the configured embedding dimension {self.embedding_dim}")
+
+    def hydrate(self, course_ids: list) -> list[dict]:
+        """
+        Method fetches the courses with the given "_id" values, in the order of the ids
+        (courses which no longer exist are skipped). The "query" hydration mode fetches only
+        the given courses with a single "$in" query, the "local" mode looks them up in a map
+        of the courses by "_id" shared by every controller (see `cached_catalog`).
+
+        Args:
+            course_ids (list): BSON "_id" values of the courses (best first)
+        Returns:
+            list[dict]: courses (as json objects) restricted to the hydration fields
+        """
+        projection: dict | None = {field: 1 for field in self.__hydration_fields} \
+                                  if self.__hydration_fields else None
+        if self.__hydration == "local":
+            documents: dict = self.cached_catalog(
+                        ("documents", json.dumps(projection, sort_keys=True),
+                         *self.catalog_key(self.__courses_database)),
+                        (DatabaseHelper.catalog_change_marker(self.__courses_database),),
+                        lambda: {DatabaseHelper.course_id(course): course
+                                 for course in DatabaseHelper.iterate_collection_data_json(
+                                     self.__courses_database, projection=projection)})
+        else:
+            documents = DatabaseHelper.load_courses_by_id(self.__courses_database, course_ids,
+                                                          projection)
+        return [copy.deepcopy(documents[course_id]) for course_id in course_ids
+                if course_id in documents]
+
+    @classmethod
+    def cached_catalog(cls, key: tuple, marker: tuple, build: Callable[[], Any]) -> Any:
+        """
+        Method returns a structure derived from the catalog (e.g. the courses by "_id"),
+        built once and shared by every controller (a controller is created per request)
+        until the change markers of the collections it is derived from change (see
+        `Database.change_marker`). The markers are read before the structure is built, so
+        a change made while building causes a rebuild on the next call.
+
+        Args:
+            key (tuple): key of the structure (including the collections it is derived from)
+            marker (tuple): change markers of the collections the structure is derived from
+            build (Callable[[], Any]): builds the structure
+        Returns:
+            Any: the cached (or newly built) structure (shared, it must not be modified)
+        """
+        #concurrent requests wait for a single build
+        with cls.catalog_lock:
+            cached = cls.catalog_cache.get(key)
+            if cached is not None and cached[0] == marker:
+                return cached[1]
+            structure = build()
+            cls.catalog_cache.put(key, (marker, structure))
+            return structure
+
+    @staticmethod
+    def catalog_key(database: Database) -> tuple:
+        """
+        Method returns the key of a collection in the catalog cache (see `cached_catalog`)
+
+        Args:
+            database (Database): Database Object connecting to the collection
+        Returns:
+            tuple (str, str, str): (server url, database, collection)
+        """
+        return database.server_url, database.database, database.collection
+
+    def __catalog_markers(self) -> tuple:
+        """
+        Method returns the change markers of the courses and embedded dataset collections
+
+        Returns:
+            tuple (str, str): change markers of the courses and embedded dataset collections
+        """
+        return (DatabaseHelper.catalog_change_marker(self.__courses_database),
+                DatabaseHelper.catalog_change_marker(self.__embedded_database))
+
+    def __attribute_index(self, course_ids: list, markers: tuple) -> AttributeIndex:
+        """
+        Method returns the index of the filterable attributes of the courses, aligned to the
+        given ids. The index is built once and shared by every controller until the courses
+        or the embedded dataset change (see `cached_catalog`).
+
+        Args:
+            course_ids (list): BSON "_id" values of the rows of the embedded dataset
+            markers (tuple): change markers of the collections (see `__catalog_markers`),
+                             read before the embedded dataset was loaded
+        Returns:
+            AttributeIndex: index of the attributes of the course of each row
+        """
+        def build() -> AttributeIndex:
+            attributes: dict = {DatabaseHelper.course_id(course): course
+                                for course in DatabaseHelper.iterate_collection_data_json(
+                                    self.__courses_database,
+                                    projection={"course_type": 1, "learning_hours": 1,
+                                                "tags": 1})}
+            #courses which no longer exist have no attributes
+            return AttributeIndex([attributes.get(course_id, {}) for course_id in course_ids])
+
+        return self.cached_catalog(("attributes", *self.catalog_key(self.__courses_database),
+                                    *self.catalog_key(self.__embedded_database)),
+                                   markers, build)
+
+    def courses_semantic_search(self, query: str, top_k: int=5,
+                                filters: SearchFilters | None = None,
+                                timings: dict | None = None) -> list[dict]:
         """
         Method performs semantic search from a users query and the embedded dataset 
         returning the top "top_k" courses closest to the users query
@@ -86,18 +802,54 @@ class EmbeddingController:
         Args:
             query (str): The users query for a desired course
             top_k (int): Number of top related courses desired to be returned by the method
+            filters (SearchFilters | None): filters the returned courses must match
+            timings (dict | None): if given, filled with the time (s) spent in each stage
+                                   of the search ("load", "encode", "score" and "hydrate")
         Returns:
             list[dict]: list of top k courses (information stored as a dict object)
         """
-        #load courses dataset
-        courses: list = DatabaseHelper.load_collection_data_json(database=self.__courses_database)
-        # get embedded dataset
-        embedded_dataset: numpy.ndarray = self.retrieve_embedded_dataset()
-        dataset_embeddings = torch.from_numpy(embedded_dataset).to(torch.float)
-        embedded_query = torch.FloatTensor(self.create_embedding(query))
-        hits = semantic_search(embedded_query, dataset_embeddings, top_k=top_k)
-        print(hits)
-        top_k_courses = [courses[hits[0][i]['corpus_id']] for i in range(len(hits[0]))]
+        timings = timings if timings is not None else {}
+        prev_time = time.perf_counter()
+        filtered: bool = filters is not None and not filters.is_empty()
+        if self.__storage_format == "binary":
+            #the markers are read first, so a change while loading rebuilds the attributes
+            markers: tuple = self.__catalog_markers() if filtered else ()
+            #only the embedded dataset is loaded, the winners are hydrated by "_id"
+            course_ids, embedded_dataset = DatabaseHelper.load_embedded_dataset_binary(
+                                                            self.__embedded_database)
+            self.__check_dimension(embedded_dataset)
+            courses = None
+        else:
+            #the "dataframe" format has no course ids, rows match the courses by position
+            courses, embedded_dataset = self.__load_aligned_dataset()
+        positions = numpy.arange(len(embedded_dataset))
+        if filtered:
+            #only the courses matching the filters are searched
+            attribute_index = AttributeIndex(courses) if courses is not None \
+                              else self.__attribute_index(course_ids, markers)
+            positions = attribute_index.positions(filters)
+            embedded_dataset = embedded_dataset[positions]
+        timings["load"] = time.perf_counter() - prev_time
+        prev_time = time.perf_counter()
+        embedded_query = VectorIndex.normalise(self.create_embedding(query))[0]
+        timings["encode"] = time.perf_counter() - prev_time
+        prev_time = time.perf_counter()
+        #cosine similarity scored with numpy, as the vector indexes do
+        order, _ = VectorIndex.select_top_k(VectorIndex.normalise(embedded_dataset)
+                                            @ embedded_query, top_k)
+        rows = positions[order]
+        timings["score"] = time.perf_counter() - prev_time
+        prev_time = time.perf_counter()
+        if courses is None:
+            top_k_courses = self.hydrate([course_ids[row] for row in rows])
+        else:
+            top_k_courses = [courses[row] for row in rows]
         for course in top_k_courses:
-            course.pop("_id")
+            course.pop("_id", None)
+        timings["hydrate"] = time.perf_counter() - prev_time
         return top_k_courses
+
+
+#record the encoder backend configured at class definition in the model version (the model
+#itself is not loaded until first used)
+EmbeddingController.update_model_version()
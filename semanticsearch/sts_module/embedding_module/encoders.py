@@ -0,0 +1,230 @@
+"""
+Script contains the encoder backends used by the EmbeddingController to run the
+jinaai/jina-embeddings-v3 embedding model on CPU. torch and sentence_transformers are only
+imported when a model is loaded, so importing the module stays cheap.
+"""
+import hashlib
+import importlib.util
+import re
+from typing import TYPE_CHECKING, Union
+import numpy
+#pylint:disable=import-outside-toplevel
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+
+class Encoder:
+    """
+    Class is the interface of an encoder backend, wrapping a SentenceTransformer model
+
+    Attributes:
+        backend (str): Name of the encoder backend
+        dependencies (tuple): Packages the backend imports when the model is loaded
+        model_name (str): Name of the HuggingFace embedding model
+    """
+    backend: str = "sentence-transformers"
+    dependencies: tuple = ("torch", "sentence_transformers")
+
+    def __init__(self, model_name: str, intra_op_threads: int | None = None,
+                 inter_op_threads: int | None = None):
+        """
+        Initalising method for the Encoder Class, configuring the torch thread pools
+        before loading the model
+
+        Args:
+            model_name (str): Name of the HuggingFace embedding model
+            intra_op_threads (int | None): Threads used within an operation (torch default if None)
+            inter_op_threads (int | None): Threads used across operations (torch default if None)
+        """
+        self.model_name: str = model_name
+        self.configure_threads(intra_op_threads, inter_op_threads)
+        self.model: "SentenceTransformer" = self.load_model()
+
+    @classmethod
+    def configure_threads(cls, intra_op_threads: int | None,
+                          inter_op_threads: int | None) -> None:
+        """
+        Method configures the torch intra-op and inter-op thread pools. The inter-op thread
+        pool can only be configured once, before any parallel work has started in the process
+        (backends which do not run on torch are left unchanged)
+
+        Args:
+            intra_op_threads (int | None): Threads used within an operation (unchanged if None)
+            inter_op_threads (int | None): Threads used across operations (unchanged if None)
+        """
+        if "torch" not in cls.dependencies or \
+                (intra_op_threads is None and inter_op_threads is None):
+            return
+        import torch
+        if intra_op_threads is not None:
+            torch.set_num_threads(intra_op_threads)
+        if inter_op_threads is not None and torch.get_num_interop_threads() != inter_op_threads:
+            try:
+                torch.set_num_interop_threads(inter_op_threads)
+            except RuntimeError:
+                #the inter-op thread pool has already been started
+                pass
+
+    def load_model(self) -> "SentenceTransformer":
+        """
+        Method loads the embedding model of the backend
+
+        Returns:
+            SentenceTransformer: the loaded model
+        """
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(self.model_name, trust_remote_code=True)
+
+    def encode(self, data: Union[str, list[str]], **options) -> numpy.ndarray:
+        """
+        Method embeds the text(s) with the model of the backend
+
+        Args:
+            data (str | list[str]): text(s) to be embedded
+            **options: options passed to `SentenceTransformer.encode` (e.g. batch_size)
+        Returns:
+            numpy.ndarray: the embedding(s) of the text(s)
+        """
+        import torch
+        with torch.inference_mode():
+            return self.model.encode(data, **options)
+
+
+class DynamicInt8Encoder(Encoder):
+    """
+    Class is an encoder backend running the embedding model with its linear layers
+    dynamically quantized to int8 (weights are quantized ahead of time, activations
+    are quantized on the fly)
+    """
+    backend: str = "dynamic-int8"
+
+    def load_model(self) -> "SentenceTransformer":
+        """
+        Method loads the embedding model and quantizes its linear layers to int8
+
+        Returns:
+            SentenceTransformer: the quantized model
+        """
+        import torch
+        model = super().load_model()
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class ONNXEncoder(Encoder):
+    """
+    Class is an encoder backend running the embedding model exported to ONNX and
+    executed by ONNX Runtime (requires the optional `optimum[onnxruntime]` package)
+    """
+    backend: str = "onnx"
+    dependencies: tuple = ("torch", "sentence_transformers", "optimum", "onnxruntime")
+
+    def load_model(self) -> "SentenceTransformer":
+        """
+        Method loads the embedding model exported to ONNX (exported on first load)
+
+        Returns:
+            SentenceTransformer: the exported model
+        Raises:
+            ImportError: If the ONNX Runtime dependencies are not installed
+        """
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(self.model_name, trust_remote_code=True, backend="onnx")
+
+
+class HashingEncoder(Encoder):
+    """
+    Class is a deterministic encoder backend hashing the words of a text into a fixed size
+    vector (feature hashing). It loads no model, so it is used to benchmark and test the
+    semantic search module offline; its embeddings only capture word overlap.
+
+    Attributes:
+        dimension (int): Dimension of the embeddings
+    """
+    backend: str = "hashing"
+    dependencies: tuple = ()
+    dimension: int = 1024
+
+    def load_model(self) -> None:
+        """
+        Method loads no model (the embeddings are computed from the words of the text)
+        """
+        return None
+
+    def embed(self, text: str) -> numpy.ndarray:
+        """
+        Method hashes the words of a text into a normalised vector
+
+        Args:
+            text (str): text to be embedded
+        Returns:
+            numpy.ndarray: float32 embedding of the text
+        """
+        embedding = numpy.zeros(self.dimension, dtype=numpy.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(),
+                                    "little")
+            embedding[digest % self.dimension] += 1.0 if (digest >> 63) & 1 else -1.0
+        norm = numpy.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+    def encode(self, data: Union[str, list[str]], **options) -> numpy.ndarray:
+        """
+        Method embeds the text(s) by feature hashing
+
+        Args:
+            data (str | list[str]): text(s) to be embedded
+            **options: ignored (accepted for compatibility with the other backends)
+        Returns:
+            numpy.ndarray: the embedding(s) of the text(s)
+        """
+        if isinstance(data, str):
+            return self.embed(data)
+        return numpy.array([self.embed(text) for text in data],
+                           dtype=numpy.float32).reshape(len(data), self.dimension)
+
+
+encoder_backends: dict = {encoder.backend: encoder
+                          for encoder in (Encoder, DynamicInt8Encoder, ONNXEncoder, HashingEncoder)}
+
+
+def check_encoder_backend(backend: str) -> None:
+    """
+    Method checks an encoder backend is supported and its dependencies are installed,
+    without importing them (so a misconfigured backend fails at startup, not on the first
+    query which loads the model)
+
+    Args:
+        backend (str): Name of the encoder backend
+    Raises:
+        ValueError: If the backend is not supported
+        ImportError: If a dependency of the backend is not installed
+    """
+    if backend not in encoder_backends:
+        raise ValueError(f"Unsupported encoder backend: {backend}")
+    missing: list = [package for package in encoder_backends[backend].dependencies
+                     if importlib.util.find_spec(package) is None]
+    if len(missing) > 0:
+        raise ImportError(f"Encoder backend {backend} requires the missing packages: "
+                          f"{', '.join(missing)}")
+
+
+def create_encoder(backend: str, model_name: str, intra_op_threads: int | None = None,
+                   inter_op_threads: int | None = None) -> Encoder:
+    """
+    Method creates the encoder of the given backend
+
+    Args:
+        backend (str): Name of the encoder backend ("sentence-transformers",
+                       "dynamic-int8", "onnx" or "hashing")
+        model_name (str): Name of the HuggingFace embedding model
+        intra_op_threads (int | None): Threads used within an operation
+        inter_op_threads (int | None): Threads used across operations
+    Returns:
+        Encoder: the encoder of the backend
+    Raises:
+        ValueError: If the backend is not supported
+    """
+    if backend not in encoder_backends:
+        raise ValueError(f"Unsupported encoder backend: {backend}")
+    return encoder_backends[backend](model_name, intra_op_threads, inter_op_threads)
@@ -0,0 +1,182 @@
+"""
+Script contains the ShardedEncoder Class, which embeds a large number of passages (e.g. the
+courses catalog at embedded dataset build time) across a pool of worker processes
+"""
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from typing import Iterable, Iterator
+import numpy
+from .encoders import Encoder, create_encoder
+
+#encoder of the current worker process (created once by `initialise_worker`)
+worker_encoder: Encoder | None = None
+
+
+def initialise_worker(backend: str, model_name: str, intra_op_threads: int) -> None:
+    """
+    Method loads the model replica of a worker process, pinning its torch thread pools so
+    the workers do not oversubscribe the CPU cores
+
+    Args:
+        backend (str): Name of the encoder backend
+        model_name (str): Name of the HuggingFace embedding model
+        intra_op_threads (int): Threads used within an operation by the worker
+    """
+    global worker_encoder #pylint:disable=global-statement
+    worker_encoder = create_encoder(backend, model_name, intra_op_threads=intra_op_threads,
+                                    inter_op_threads=1)
+
+
+def encode_shard(passages: list[str]) -> numpy.ndarray:
+    """
+    Method embeds a shard of passages with the model replica of the worker process
+
+    Args:
+        passages (list[str]): passages of the shard
+    Returns:
+        numpy.ndarray: embeddings of the shard
+    """
+    return worker_encoder.encode(passages)
+
+
+class ShardedEncoder:
+    """
+    Class splits passages into shards embedded by a pool of worker processes, each running
+    its own replica of the model. Workers are started with the "spawn" method (torch thread
+    pools are not fork safe) and load their model once, so the pool is meant to be kept for
+    many embedded dataset builds: started with `start` (or used as a context manager for a
+    single build) and stopped with `close`.
+
+    Attributes:
+        backend (str): Name of the encoder backend run by the workers
+        model_name (str): Name of the HuggingFace embedding model
+        workers (int): Number of worker processes
+        threads_per_worker (int): torch intra-op threads of each worker
+        shard_size (int): Number of passages of each shard
+    """
+    def __init__(self, backend: str, model_name: str, workers: int,
+                 threads_per_worker: int | None = None, shard_size: int = 256,
+                 logger: logging.Logger | None = None):
+        """
+        Initalising method for the ShardedEncoder Class
+
+        Args:
+            backend (str): Name of the encoder backend run by the workers
+            model_name (str): Name of the HuggingFace embedding model
+            workers (int): Number of worker processes
+            threads_per_worker (int | None): torch intra-op threads of each worker (the CPU
+                                             cores are divided between the workers if None)
+            shard_size (int): Number of passages of each shard
+            logger (logging.Logger | None): Logger recording the progress of the encoding
+        """
+        self.backend: str = backend
+        self.model_name: str = model_name
+        self.workers: int = max(1, workers)
+        self.threads_per_worker: int = threads_per_worker or \
+                                       max(1, (os.cpu_count() or 1) // self.workers)
+        self.shard_size: int = max(1, shard_size)
+        self.__logger: logging.Logger = logger or logging.getLogger(__name__)
+        self.__executor: ProcessPoolExecutor | None = None
+
+    def start(self) -> None:
+        """
+        Method starts the pool of worker processes (each worker loads its model replica
+        when it is started, on the first submitted shards)
+        """
+        if self.__executor is None:
+            self.__executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=initialise_worker,
+                        initargs=(self.backend, self.model_name, self.threads_per_worker))
+
+    def close(self) -> None:
+        """
+        Method stops the pool of worker processes, cancelling the shards not yet started
+        """
+        if self.__executor is not None:
+            self.__executor.shutdown(cancel_futures=True)
+            self.__executor = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def map_shards(self, shards: Iterable[tuple]) -> Iterator[tuple]:
+        """
+        Method embeds shards of passages, yielding each shard as soon as it is embedded
+        (shards complete out of order). The shards are consumed lazily and at most two
+        shards per worker are in flight at a time, so the passages and embeddings held in
+        memory are bounded.
+
+        Args:
+            shards (Iterable[tuple (Any, list[str])]): (key, passages) of each shard, the key
+                                                       identifying the shard (kept in the
+                                                       main process)
+        Returns:
+            Iterator[tuple (Any, numpy.ndarray)]: (key, embeddings) of each shard
+        Raises:
+            RuntimeError: If the pool of worker processes is not started
+            BrokenProcessPool: If a worker process died (the pool is restarted for the next
+                               call)
+        """
+        if self.__executor is None:
+            raise RuntimeError("ShardedEncoder must be started (or used as a context manager)")
+        shards = iter(shards)
+        pending: dict = {}
+        encoded, prev_time = 0, time.perf_counter()
+        while True:
+            for key, passages in shards:
+                pending[self.__executor.submit(encode_shard, passages)] = key
+                if len(pending) >= 2 * self.workers:
+                    break
+            if len(pending) == 0:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    embeddings = future.result()
+                except BrokenProcessPool:
+                    #a worker died (e.g. out of memory), later builds use a new pool
+                    self.close()
+                    self.start()
+                    raise
+                encoded += len(embeddings)
+                self.__logger.info(f"(Embedding) Encoded {encoded} passages "
+                                   f"({encoded / (time.perf_counter() - prev_time):.1f}/s)")
+                yield pending.pop(future), embeddings
+
+    def encode_shards(self, passages: list[str]) -> Iterator[tuple]:
+        """
+        Method splits the passages into shards of `shard_size` passages and embeds them,
+        yielding each shard as soon as it is embedded (see `map_shards`)
+
+        Args:
+            passages (list[str]): passages to be embedded
+        Returns:
+            Iterator[tuple (int, numpy.ndarray)]: (position of the first passage, embeddings)
+                                                  of each shard
+        """
+        return self.map_shards((start, passages[start:start + self.shard_size])
+                               for start in range(0, len(passages), self.shard_size))
+
+    def encode(self, passages: list[str]) -> numpy.ndarray:
+        """
+        Method embeds the passages, merging the shards in the original order of the passages
+
+        Args:
+            passages (list[str]): passages to be embedded
+        Returns:
+            numpy.ndarray: the embeddings of the passages (one row per passage)
+        """
+        shards: dict = dict(self.encode_shards(passages))
+        if len(shards) == 0:
+            return numpy.empty((0, 0), dtype=numpy.float32)
+        return numpy.concatenate([shards[start] for start in sorted(shards)])
@@ -0,0 +1,151 @@
+"""
+Script contains the SearchFilters and AttributeIndex Classes, used to restrict a semantic
+search to the courses matching metadata filters (course type, learning hours and tags)
+"""
+import re
+import numpy
+
+
+class SearchFilters:
+    """
+    Class defines the metadata filters of a semantic search
+
+    Attributes:
+        course_types (list[str] | None): Course types a course must have one of
+        max_learning_hours (float | None): Maximum learning hours of a course
+        required_tags (list[str] | None): Tags a course must all have
+        excluded_tags (list[str] | None): Tags a course must not have any of
+    """
+    def __init__(self, course_types: list[str] | None = None,
+                 max_learning_hours: float | None = None,
+                 required_tags: list[str] | None = None,
+                 excluded_tags: list[str] | None = None):
+        """
+        Initalising method for the SearchFilters Class (a filter is not applied if None)
+
+        Args:
+            course_types (list[str] | None): Course types a course must have one of
+            max_learning_hours (float | None): Maximum learning hours of a course
+            required_tags (list[str] | None): Tags a course must all have
+            excluded_tags (list[str] | None): Tags a course must not have any of
+        """
+        self.course_types: list[str] | None = course_types
+        self.max_learning_hours: float | None = max_learning_hours
+        self.required_tags: list[str] | None = required_tags
+        self.excluded_tags: list[str] | None = excluded_tags
+
+    def is_empty(self) -> bool:
+        """
+        Method checks if no filter is applied
+
+        Returns:
+            boolean value
+        """
+        return not self.course_types and self.max_learning_hours is None and \
+               not self.required_tags and not self.excluded_tags
+
+    def key(self) -> tuple:
+        """
+        Method returns a hashable (order independent) representation of the filters
+
+        Returns:
+            tuple: representation of the filters
+        """
+        return (tuple(sorted(self.course_types or [])), self.max_learning_hours,
+                tuple(sorted(self.required_tags or [])), tuple(sorted(self.excluded_tags or [])))
+
+
+class AttributeIndex:
+    """
+    Class precomputes, when an index is loaded, a bitmap (boolean array) of the courses of
+    each course type and tag, and the courses ordered by learning hours. Filters are then
+    evaluated with bitwise operations and a binary search instead of scanning the courses.
+    """
+    #learning hours units (e.g. "2 hrs 30 mins", "4 mins 38 s") in hours
+    units: dict = {"day": 24.0, "days": 24.0, "hr": 1.0, "hrs": 1.0, "hour": 1.0, "hours": 1.0,
+                   "min": 1 / 60, "mins": 1 / 60, "minute": 1 / 60, "minutes": 1 / 60,
+                   "s": 1 / 3600, "sec": 1 / 3600, "secs": 1 / 3600}
+
+    def __init__(self, courses: list[dict]):
+        """
+        Initalising method for the AttributeIndex Class
+
+        Args:
+            courses (list[dict]): Courses data (positions match the vector index)
+        """
+        self.size: int = len(courses)
+        self.course_types: dict = {}
+        self.tags: dict = {}
+        for position, course in enumerate(courses):
+            course_type = course.get("course_type")
+            if course_type is not None:
+                self.__bitmap(self.course_types, course_type)[position] = True
+            for tag in course.get("tags") or []:
+                self.__bitmap(self.tags, tag)[position] = True
+        hours = numpy.array([self.parse_learning_hours(course.get("learning_hours"))
+                             for course in courses], dtype=numpy.float64)
+        #courses with unknown learning hours are ordered last (NaN)
+        self.__hours_order: numpy.ndarray = numpy.argsort(hours, kind="stable")
+        self.__sorted_hours: numpy.ndarray = hours[self.__hours_order]
+
+    def __bitmap(self, bitmaps: dict, value: str) -> numpy.ndarray:
+        """Method returns (creating if required) the bitmap of an attribute value"""
+        if value not in bitmaps:
+            bitmaps[value] = numpy.zeros(self.size, dtype=bool)
+        return bitmaps[value]
+
+    @classmethod
+    def parse_learning_hours(cls, learning_hours: str | None) -> float:
+        """
+        Method parses the learning hours of a course (e.g. "2 hrs 30 mins") into hours
+
+        Args:
+            learning_hours (str | None): learning hours of a course
+        Returns:
+            float: learning hours (NaN if unknown, e.g. "Days")
+        """
+        if not isinstance(learning_hours, str):
+            return numpy.nan
+        parts = re.findall(r"(\d+(?:\.\d+)?)\s*([A-Za-z]+)", learning_hours)
+        if len(parts) == 0 or any(unit.lower() not in cls.units for _, unit in parts):
+            return numpy.nan
+        return sum(float(value) * cls.units[unit.lower()] for value, unit in parts)
+
+    def mask(self, filters: SearchFilters) -> numpy.ndarray:
+        """
+        Method returns the bitmap of the courses matching the filters
+
+        Args:
+            filters (SearchFilters): filters of the search
+        Returns:
+            numpy.ndarray: boolean array (True for each matching course)
+        """
+        empty = numpy.zeros(self.size, dtype=bool)
+        mask = numpy.ones(self.size, dtype=bool)
+        if filters.course_types:
+            course_types = numpy.zeros(self.size, dtype=bool)
+            for course_type in filters.course_types:
+                course_types |= self.course_types.get(course_type, empty)
+            mask &= course_types
+        for tag in filters.required_tags or []:
+            mask &= self.tags.get(tag, empty)
+        for tag in filters.excluded_tags or []:
+            mask &= ~self.tags.get(tag, empty)
+        if filters.max_learning_hours is not None:
+            count = numpy.searchsorted(self.__sorted_hours, filters.max_learning_hours,
+                                       side="right")
+            hours = numpy.zeros(self.size, dtype=bool)
+            hours[self.__hours_order[:count]] = True
+            mask &= hours
+        return mask
+
+    def positions(self, filters: SearchFilters) -> numpy.ndarray:
+        """
+        Method returns the positions of the courses matching the filters
+
+        Args:
+            filters (SearchFilters): filters of the search
+        Returns:
+            numpy.ndarray: positions of the matching courses (in ascending order)
+        """
+        return numpy.flatnonzero(self.mask(filters))
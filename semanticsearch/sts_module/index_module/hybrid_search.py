@@ -0,0 +1,211 @@
+"""
+Script contains the HybridSearch Class, combining the rankings of a vector index (semantic
+search) and a lexical index (BM25) of the same courses
+"""
+import numpy
+from .filters import SearchFilters
+from .lexical_index import LexicalIndex
+from .vector_index import VectorIndex
+
+
+class HybridSearch:
+    """
+    Class answers queries in one of three search modes over a vector index and a lexical
+    index built from the same courses (positions of both indexes refer to the same course):
+        - "semantic": ranking of the vector index
+        - "lexical": BM25 ranking of the lexical index (the query is not embedded)
+        - "hybrid": fusion of the top `candidates` of both rankings, either by reciprocal
+                    rank fusion ("rrf") or by a weighted sum of min-max normalised scores
+                    ("weighted")
+
+    Attributes:
+        vector_index (VectorIndex): Vector index of the courses
+        lexical_index (LexicalIndex): Lexical index of the courses
+        fusion (str): Fusion method of the hybrid search mode ("rrf" or "weighted")
+        semantic_weight (float): Weight of the semantic ranking (lexical weight is 1 - weight)
+        candidates (int): Number of candidates of each ranking fused by the hybrid mode
+        rrf_k (int): Rank offset of reciprocal rank fusion
+    """
+    search_modes: tuple = ("semantic", "lexical", "hybrid")
+    fusions: tuple = ("rrf", "weighted")
+
+    def __init__(self, vector_index: VectorIndex, lexical_index: LexicalIndex | None = None,
+                 fusion: str = "rrf", semantic_weight: float = 0.5, candidates: int = 50,
+                 rrf_k: int = 60):
+        """
+        Initalising method for the HybridSearch Class
+
+        Args:
+            vector_index (VectorIndex): Vector index of the courses
+            lexical_index (LexicalIndex | None): Lexical index of the courses (built from
+                                                 the courses of the vector index if None)
+            fusion (str): Fusion method of the hybrid search mode ("rrf" or "weighted")
+            semantic_weight (float): Weight of the semantic ranking (between 0 and 1)
+            candidates (int): Number of candidates of each ranking fused by the hybrid mode
+            rrf_k (int): Rank offset of reciprocal rank fusion
+        Raises:
+            ValueError: If the fusion method is not supported
+        """
+        if fusion not in self.fusions:
+            raise ValueError(f"Unsupported fusion method: {fusion}")
+        self.vector_index: VectorIndex = vector_index
+        self.lexical_index: LexicalIndex = lexical_index if lexical_index is not None \
+                else LexicalIndex(vector_index.courses, attributes=vector_index.attributes)
+        self.fusion: str = fusion
+        self.semantic_weight: float = semantic_weight
+        self.candidates: int = candidates
+        self.rrf_k: int = rrf_k
+
+    @property
+    def size(self) -> int:
+        """int: Number of courses stored inside the indexes"""
+        return self.vector_index.size
+
+    @staticmethod
+    def reciprocal_rank_fusion(rankings: list, weights: list[float], rrf_k: int = 60) -> tuple:
+        """
+        Method fuses rankings by summing the weighted reciprocal rank (1 / (rrf_k + rank))
+        of each position in each ranking
+
+        Args:
+            rankings (list[numpy.ndarray]): positions of each ranking (best first)
+            weights (list[float]): weight of each ranking
+            rrf_k (int): Rank offset of reciprocal rank fusion
+        Returns:
+            tuple (numpy.ndarray, numpy.ndarray): (positions, fused scores) of the positions
+                                                  of every ranking
+        """
+        fused: dict = {}
+        for ranking, weight in zip(rankings, weights):
+            for rank, position in enumerate(ranking):
+                fused[position] = fused.get(position, 0.0) + weight / (rrf_k + rank + 1)
+        return (numpy.fromiter(fused.keys(), dtype=numpy.int64, count=len(fused)),
+                numpy.fromiter(fused.values(), dtype=numpy.float32, count=len(fused)))
+
+    @staticmethod
+    def weighted_fusion(rankings: list, weights: list[float]) -> tuple:
+        """
+        Method fuses rankings by summing the weighted min-max normalised scores of each
+        position in each ranking (a position missing from a ranking scores 0 in it)
+
+        Args:
+            rankings (list[tuple (numpy.ndarray, numpy.ndarray)]): (positions, scores) of
+                                                                   each ranking
+            weights (list[float]): weight of each ranking
+        Returns:
+            tuple (numpy.ndarray, numpy.ndarray): (positions, fused scores) of the positions
+                                                  of every ranking
+        """
+        fused: dict = {}
+        for (positions, scores), weight in zip(rankings, weights):
+            if len(scores) == 0:
+                continue
+            score_range = float(scores.max() - scores.min())
+            normalised = (scores - scores.min()) / score_range if score_range > 0 \
+                         else numpy.ones_like(scores)
+            for position, score in zip(positions, normalised):
+                fused[position] = fused.get(position, 0.0) + weight * float(score)
+        return (numpy.fromiter(fused.keys(), dtype=numpy.int64, count=len(fused)),
+                numpy.fromiter(fused.values(), dtype=numpy.float32, count=len(fused)))
+
+    def fuse(self, semantic: tuple, lexical: tuple, top_k: int) -> tuple:
+        """
+        Method fuses the semantic and lexical rankings of a query
+
+        Args:
+            semantic (tuple (numpy.ndarray, numpy.ndarray)): (positions, scores) of the
+                                                             semantic ranking
+            lexical (tuple (numpy.ndarray, numpy.ndarray)): (positions, scores) of the
+                                                            lexical ranking
+            top_k (int): Number of top related courses to return
+        Returns:
+            tuple (numpy.ndarray, numpy.ndarray): (positions, fused scores)
+        """
+        weights = [self.semantic_weight, 1 - self.semantic_weight]
+        if self.fusion == "rrf":
+            positions, scores = self.reciprocal_rank_fusion([semantic[0], lexical[0]], weights,
+                                                            self.rrf_k)
+        else:
+            positions, scores = self.weighted_fusion([semantic, lexical], weights)
+        order, top_scores = VectorIndex.select_top_k(scores, top_k)
+        return positions[order], top_scores
+
+    def top_k_indices_batch(self, queries: list[str], query_embeddings: list, top_ks: list[int],
+                            filters: list | None = None, modes: list[str] | None = None) -> list:
+        """
+        Method returns the positions and scores of the top k courses of a batch of queries,
+        scoring every query embedding against the vector index in a single batch
+
+        Args:
+            queries (list[str]): query texts
+            query_embeddings (list[numpy.ndarray | None]): embedded queries (None for the
+                                                           queries of the "lexical" mode)
+            top_ks (list[int]): Number of top related courses to return for each query
+            filters (list[SearchFilters | None] | None): filters of each query
+            modes (list[str] | None): search mode of each query ("semantic" if None)
+        Returns:
+            list[tuple (numpy.ndarray, numpy.ndarray)]: (positions, scores) of each query
+        Raises:
+            ValueError: If a search mode is not supported
+        """
+        filters = filters or [None] * len(queries)
+        modes = modes or ["semantic"] * len(queries)
+        for mode in modes:
+            if mode not in self.search_modes:
+                raise ValueError(f"Unsupported search mode: {mode}")
+        dense = [row for row, mode in enumerate(modes) if mode != "lexical"]
+        semantic: dict = {}
+        if len(dense) > 0:
+            #hybrid queries fetch a deeper semantic ranking to fuse
+            depths = [top_ks[row] if modes[row] == "semantic"
+                      else max(top_ks[row], self.candidates) for row in dense]
+            results = self.vector_index.top_k_indices_batch(
+                        numpy.vstack([query_embeddings[row] for row in dense]), depths,
+                        [filters[row] for row in dense])
+            semantic = dict(zip(dense, results))
+        results = []
+        for row, (query, top_k, mode) in enumerate(zip(queries, top_ks, modes)):
+            if mode == "semantic":
+                results.append(semantic[row])
+                continue
+            lexical = self.lexical_index.top_k_indices(
+                        query, top_k if mode == "lexical" else max(top_k, self.candidates),
+                        filters[row])
+            results.append(lexical if mode == "lexical" else
+                           self.fuse(semantic[row], lexical, top_k))
+        return results
+
+    def search(self, query: str, query_embedding: numpy.ndarray | None, top_k: int = 5,
+               filters: SearchFilters | None = None, mode: str = "semantic") -> list[dict]:
+        """
+        Method returns the top k courses of a query in the given search mode
+
+        Args:
+            query (str): query text
+            query_embedding (numpy.ndarray | None): embedded query (None for "lexical" mode)
+            top_k (int): Number of top related courses desired to be returned by the method
+            filters (SearchFilters | None): filters the returned courses must match
+            mode (str): search mode ("semantic", "lexical" or "hybrid")
+        Returns:
+            list[dict]: list of top k courses (information stored as a dict object)
+        """
+        return self.search_batch([query], [query_embedding], [top_k], [filters], [mode])[0]
+
+    def search_batch(self, queries: list[str], query_embeddings: list, top_ks: list[int],
+                     filters: list | None = None, modes: list[str] | None = None) -> list[list]:
+        """
+        Method returns the top k courses of each query of a batch
+
+        Args:
+            queries (list[str]): query texts
+            query_embeddings (list[numpy.ndarray | None]): embedded queries (None for the
+                                                           queries of the "lexical" mode)
+            top_ks (list[int]): Number of top related courses to return for each query
+            filters (list[SearchFilters | None] | None): filters of each query
+            modes (list[str] | None): search mode of each query ("semantic" if None)
+        Returns:
+            list[list[dict]]: list of top k courses of each query
+        """
+        return [self.vector_index.courses_at(positions)
+                for positions, _ in self.top_k_indices_batch(queries, query_embeddings, top_ks,
+                                                             filters, modes)]
@@ -0,0 +1,219 @@
+"""
+Script contains the IndexManager Class, which rebuilds the search index in the background
+when the courses catalog changes and swaps it in without interrupting queries
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+
+class IndexManager:
+    """
+    Class holds the current search index and polls a (cheap) fingerprint of the courses
+    catalog. When the fingerprint changes a new index is built in a background thread while
+    queries keep using the current one; the new index then replaces the current one with a
+    single reference assignment (double buffering), so a query always uses one complete index.
+
+    A triggered refresh (e.g. requested through the API) compares the full fingerprint of
+    the catalog instead, which also detects changes the polled fingerprint may miss. Until
+    the first index is built, failed builds are retried with an exponential backoff (even
+    if polling is disabled).
+
+    Attributes:
+        poll_interval (float | None): Seconds between two fingerprint checks (the catalog
+                                      is only checked when triggered if None)
+        version (int): Number of indexes built (incremented on every swap)
+        fingerprint (str | None): Fingerprint of the catalog the current index was built from
+        full_fingerprint (str | None): Full fingerprint of the catalog the current index was
+                                       built from (None if no full fingerprint is configured)
+        retry_delay (float): Seconds before the first retry of a failed first build
+        max_retry_delay (float): Maximum seconds between two retries of the first build
+    """
+    def __init__(self, build: Callable[[], Any], fingerprint: Callable[[], str],
+                 poll_interval: float | None = 30.0, logger: logging.Logger | None = None,
+                 full_fingerprint: Callable[[], str] | None = None,
+                 retry_delay: float = 1.0, max_retry_delay: float = 60.0):
+        """
+        Initalising method for the IndexManager Class
+
+        Args:
+            build (Callable): function building a search index from the current catalog
+            fingerprint (Callable): function returning the fingerprint of the current catalog,
+                                    polled (so it should be cheap to compute)
+            poll_interval (float | None): Seconds between two fingerprint checks (polling is
+                                          disabled if None or not positive)
+            logger (logging.Logger | None): Logger recording rebuilds and failures
+            full_fingerprint (Callable | None): function returning the full fingerprint of
+                                                the current catalog, compared by triggered
+                                                refreshes and recorded with every built index
+                                                (a triggered refresh always rebuilds the
+                                                index if None)
+            retry_delay (float): Seconds before the first retry of a failed first build
+                                 (doubled after each failure)
+            max_retry_delay (float): Maximum seconds between two retries of the first build
+        """
+        #a zero or negative interval disables polling
+        self.poll_interval: float | None = poll_interval if poll_interval and poll_interval > 0 \
+                                           else None
+        self.retry_delay: float = retry_delay
+        self.max_retry_delay: float = max_retry_delay
+        self.version: int = 0
+        self.fingerprint: str | None = None
+        self.full_fingerprint: str | None = None
+        self.__build: Callable[[], Any] = build
+        self.__fingerprint: Callable[[], str] = fingerprint
+        self.__full_fingerprint: Callable[[], str] | None = full_fingerprint
+        self.__logger: logging.Logger = logger or logging.getLogger(__name__)
+        #(index, version) replaced by a single assignment, so both are always read together
+        self.__current: tuple = (None, 0)
+        #serialises refreshes (only one index is built at a time)
+        self.__lock = threading.Lock()
+        self.__wake = threading.Event()
+        self.__stopped = threading.Event()
+        self.__verify: bool = False
+        self.__force: bool = False
+        self.__thread: threading.Thread | None = None
+        self.refreshed_at: float | None = None
+        self.build_time: float | None = None
+        self.failures: int = 0
+        self.last_error: str | None = None
+
+    @property
+    def current(self) -> Any:
+        """Any: Current search index (None until the first index is built)"""
+        return self.__current[0]
+
+    @property
+    def ready(self) -> bool:
+        """bool: If a search index has been built (queries can be served)"""
+        return self.__current[0] is not None
+
+    def snapshot(self) -> tuple:
+        """
+        Method returns the current search index together with its version (e.g. to key
+        cached results by the index which produced them)
+
+        Returns:
+            tuple (Any, int): (current search index, version of the index)
+        """
+        return self.__current
+
+    def refresh(self, force: bool = False, verify: bool = False) -> bool:
+        """
+        Method builds a new index and swaps it in if the catalog fingerprint has changed
+
+        Args:
+            force (bool): build a new index even if the fingerprint has not changed
+            verify (bool): compare the full fingerprint of the catalog instead of the
+                           polled fingerprint (rebuild if there is no full fingerprint)
+        Returns:
+            bool: True if a new index was swapped in
+        """
+        with self.__lock:
+            fingerprint = self.__fingerprint()
+            full_fingerprint: str | None = None
+            if not force and self.__current[0] is not None:
+                if verify:
+                    #only computed when the current index may have to be replaced (the
+                    #index is rebuilt if there is no full fingerprint to compare)
+                    if self.__full_fingerprint is not None:
+                        full_fingerprint = self.__full_fingerprint()
+                        if full_fingerprint == self.full_fingerprint:
+                            self.fingerprint = fingerprint
+                            return False
+                elif fingerprint == self.fingerprint:
+                    return False
+            if full_fingerprint is None and self.__full_fingerprint is not None:
+                #recorded with every index (e.g. the first one), so the next triggered
+                #refresh does not rebuild an unchanged catalog
+                full_fingerprint = self.__full_fingerprint()
+            prev_time = time.perf_counter()
+            index = self.__build()
+            self.build_time = time.perf_counter() - prev_time
+            #queries read the reference once, so in flight queries keep the previous index
+            self.__current = (index, self.version + 1)
+            self.fingerprint = fingerprint
+            self.full_fingerprint = full_fingerprint
+            self.version += 1
+            self.refreshed_at = time.time()
+            return True
+
+    def trigger(self, force: bool = False) -> None:
+        """
+        Method wakes the background thread to check the full fingerprint of the catalog
+        immediately, rebuilding the index if it has changed (the first index is always
+        built, e.g. in the background once the thread is started)
+
+        Args:
+            force (bool): rebuild the index even if the catalog has not changed
+        """
+        self.__verify = True
+        self.__force = self.__force or force
+        self.__wake.set()
+
+    def __run(self) -> None:
+        """Method is the background loop checking the catalog fingerprint"""
+        #seconds before retrying a failed first build (None once an index is built)
+        delay: float | None = None
+        while not self.__stopped.is_set():
+            self.__wake.wait(self.poll_interval if delay is None
+                             else min(delay, self.poll_interval or delay))
+            self.__wake.clear()
+            if self.__stopped.is_set():
+                break
+            verify, self.__verify = self.__verify, False
+            force, self.__force = self.__force, False
+            try:
+                if self.refresh(force, verify):
+                    self.__logger.info(f"(Index) Search Index Rebuilt: version {self.version} "
+                                       f"in {self.build_time:.2f}s")
+            except Exception as e: #pylint:disable=broad-exception-caught
+                #the current index keeps serving queries
+                self.failures += 1
+                self.last_error = str(e)
+                self.__logger.error("(Index) Failed to Rebuild Search Index: " + str(e))
+            #without an index no query can be served, so the build is retried
+            if self.__current[0] is not None:
+                delay = None
+            else:
+                delay = self.retry_delay if delay is None \
+                        else min(delay * 2, self.max_retry_delay)
+
+    def start(self) -> None:
+        """
+        Method starts the background thread checking the catalog fingerprint
+        """
+        if self.__thread is None:
+            self.__stopped.clear()
+            self.__thread = threading.Thread(target=self.__run, name="index-manager",
+                                             daemon=True)
+            self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Method stops the background thread (waiting for a running rebuild to finish)
+        """
+        if self.__thread is not None:
+            self.__stopped.set()
+            self.__wake.set()
+            self.__thread.join()
+            self.__thread = None
+
+    def stats(self) -> dict:
+        """
+        Method returns the state of the manager
+
+        Returns:
+            dict: readiness, version, fingerprints, last refresh time, build time (s) and
+                  failures
+        """
+        return {"ready": self.ready,
+                "version": self.version,
+                "fingerprint": self.fingerprint,
+                "full_fingerprint": self.full_fingerprint,
+                "refreshed_at": self.refreshed_at,
+                "build_time_s": self.build_time,
+                "poll_interval_s": self.poll_interval,
+                "failures": self.failures,
+                "last_error": self.last_error}
@@ -0,0 +1,258 @@
+"""
+Script contains the IVFIndex Class, an approximate nearest neighbour (inverted file) index
+of the embedded dataset for catalogs too large for an exact (brute force) search
+"""
+import math
+import numpy
+from .filters import SearchFilters
+from .vector_index import VectorIndex
+
+
+class IVFIndex(VectorIndex):
+    """
+    Class partitions the normalised vectors of the embedded dataset into clusters (inverted
+    lists) using spherical k-means. A query is only scored against the vectors of the
+    `n_probe` clusters whose centroids are closest to it, trading a small loss of recall for
+    a search cost proportional to n_probe / n_lists of an exact search. A filter matching
+    fewer vectors than the probed clusters hold is answered by an exact search of the
+    matching vectors instead.
+
+    Attributes:
+        n_lists (int): Number of clusters (inverted lists) of the index
+        n_probe (int): Number of clusters scored for each query
+        centroids (numpy.ndarray): Normalised centroid of each cluster
+    """
+    index_type: str = "ivf"
+
+    def __init__(self, embeddings: numpy.ndarray, courses: list[dict], n_lists: int | None = None,
+                 n_probe: int = 8, centroids: numpy.ndarray | None = None,
+                 iterations: int = 10, seed: int = 0):
+        """
+        Initalising method for the IVFIndex Class. The centroids are trained with k-means
+        unless previously trained (persisted) centroids are given.
+
+        Args:
+            embeddings (numpy.ndarray): Embedded dataset (one row per course)
+            courses (list[dict]): Courses data aligned by position to the embedded dataset
+            n_lists (int | None): Number of clusters (defaults to 4 * sqrt(size))
+            n_probe (int): Number of clusters scored for each query
+            centroids (numpy.ndarray | None): Previously trained centroids of the clusters
+            iterations (int): Number of k-means iterations used to train the centroids
+            seed (int): Seed of the random initialisation of the centroids
+        """
+        super().__init__(embeddings, courses)
+        if centroids is not None:
+            self.centroids: numpy.ndarray = self.normalise(centroids)
+        else:
+            if n_lists is None:
+                n_lists = self.default_n_lists(self.size)
+            self.centroids = self.train_centroids(self.vectors, max(1, min(n_lists, self.size)),
+                                                  iterations, seed)
+        self.n_probe: int = n_probe
+        self.__build_lists(self.assign(self.vectors))
+
+    @staticmethod
+    def default_n_lists(size: int) -> int:
+        """
+        Method returns the default number of clusters of an index of the given size
+
+        Args:
+            size (int): Number of vectors of the index
+        Returns:
+            int: 4 * sqrt(size) clusters (at least 1 and at most one per vector)
+        """
+        return max(1, min(int(4 * math.sqrt(size)), size))
+
+    @property
+    def n_lists(self) -> int:
+        """int: Number of clusters (inverted lists) of the index"""
+        return self.centroids.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """int: Memory (bytes) used by the vectors and the inverted lists of the index"""
+        return super().nbytes + self.centroids.nbytes + \
+               self.__list_positions.nbytes + self.__list_offsets.nbytes
+
+    @classmethod
+    def train_centroids(cls, vectors: numpy.ndarray, n_lists: int, iterations: int = 10,
+                        seed: int = 0, max_training_size: int = 256) -> numpy.ndarray:
+        """
+        Method trains the cluster centroids with spherical k-means over (a sample of) the
+        normalised vectors
+
+        Args:
+            vectors (numpy.ndarray): Normalised vectors to cluster
+            n_lists (int): Number of clusters
+            iterations (int): Number of k-means iterations
+            seed (int): Seed of the random sampling/initialisation
+            max_training_size (int): Maximum number of sampled vectors per cluster
+        Returns:
+            numpy.ndarray: normalised centroid of each cluster
+        """
+        generator = numpy.random.default_rng(seed)
+        if len(vectors) > n_lists * max_training_size:
+            vectors = vectors[generator.choice(len(vectors), n_lists * max_training_size,
+                                               replace=False)]
+        centroids = vectors[generator.choice(len(vectors), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = cls.nearest_centroids(vectors, centroids)
+            sums = numpy.zeros_like(centroids)
+            numpy.add.at(sums, assignments, vectors)
+            #clusters left empty keep their previous centroid
+            empty = numpy.bincount(assignments, minlength=n_lists) == 0
+            sums[empty] = centroids[empty]
+            centroids = cls.normalise(sums)
+        return centroids
+
+    @staticmethod
+    def nearest_centroids(vectors: numpy.ndarray, centroids: numpy.ndarray,
+                          chunk_size: int = 4096) -> numpy.ndarray:
+        """
+        Method returns the closest centroid of each vector (processed in chunks to bound the
+        memory of the score matrix)
+
+        Args:
+            vectors (numpy.ndarray): Normalised vectors
+            centroids (numpy.ndarray): Normalised centroids
+            chunk_size (int): Number of vectors scored at a time
+        Returns:
+            numpy.ndarray: position of the closest centroid of each vector
+        """
+        assignments = numpy.empty(len(vectors), dtype=numpy.int64)
+        for start in range(0, len(vectors), chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            assignments[start:start + chunk_size] = numpy.argmax(chunk @ centroids.T, axis=1)
+        return assignments
+
+    def assign(self, vectors: numpy.ndarray) -> numpy.ndarray:
+        """
+        Method returns the cluster of each vector
+
+        Args:
+            vectors (numpy.ndarray): Normalised vectors
+        Returns:
+            numpy.ndarray: cluster of each vector
+        """
+        return self.nearest_centroids(vectors, self.centroids)
+
+    def __build_lists(self, assignments: numpy.ndarray) -> None:
+        """Method builds the inverted lists (CSR layout) from the cluster of each vector"""
+        self.__list_positions = numpy.argsort(assignments, kind="stable")
+        counts = numpy.bincount(assignments, minlength=self.n_lists)
+        self.__list_offsets = numpy.concatenate(([0], numpy.cumsum(counts)))
+
+    def candidates(self, centroid_scores: numpy.ndarray, top_k: int,
+                   mask: numpy.ndarray | None = None) -> numpy.ndarray:
+        """
+        Method returns the positions of the vectors inside the clusters probed for a query.
+        Clusters are probed in order of their centroid score until `n_probe` clusters and
+        at least `top_k` vectors have been collected
+
+        Args:
+            centroid_scores (numpy.ndarray): score of the query against every centroid
+            top_k (int): Minimum number of vectors to collect
+            mask (numpy.ndarray | None): bitmap of the vectors matching the filters
+        Returns:
+            numpy.ndarray: positions of the candidate vectors
+        """
+        lists = []
+        count = 0
+        for probed, cluster in enumerate(numpy.argsort(-centroid_scores)):
+            if probed >= self.n_probe and count >= top_k:
+                break
+            start, end = self.__list_offsets[cluster], self.__list_offsets[cluster + 1]
+            positions = self.__list_positions[start:end]
+            if mask is not None:
+                positions = positions[mask[positions]]
+            lists.append(positions)
+            count += len(positions)
+        return numpy.concatenate(lists)
+
+    def top_k_indices(self, query_embedding: numpy.ndarray, top_k: int,
+                      filters: SearchFilters | None = None) -> tuple:
+        """
+        Method returns the positions and cosine similarity scores of the (approximate) top k
+        vectors closest to the query embedding (ordered by descending score)
+
+        Args:
+            query_embedding (numpy.ndarray): embedded query
+            top_k (int): Number of top related vectors to return
+            filters (SearchFilters | None): filters the returned vectors must match
+        Returns:
+            tuple (numpy.ndarray, numpy.ndarray): (positions, scores)
+        """
+        return self.top_k_indices_batch(query_embedding, [top_k], [filters])[0]
+
+    def top_k_indices_batch(self, query_embeddings: numpy.ndarray, top_ks: list[int],
+                            filters: list | None = None) -> list:
+        """
+        Method returns the positions and scores of the (approximate) top k vectors for a
+        batch of queries, scoring every query against the centroids with a single product
+
+        Args:
+            query_embeddings (numpy.ndarray): embedded queries (one row per query)
+            top_ks (list[int]): Number of top related vectors to return for each query
+            filters (list[SearchFilters | None] | None): filters of each query
+        Returns:
+            list[tuple (numpy.ndarray, numpy.ndarray)]: (positions, scores) of each query
+        """
+        queries = self.normalise(query_embeddings)
+        filters = filters or [None] * len(queries)
+        centroid_scores = queries @ self.centroids.T
+        #number of vectors probed for a query on average
+        probed_size = self.size * min(1.0, self.n_probe / self.n_lists)
+        results = []
+        for query, scores, top_k, row_filters in zip(queries, centroid_scores, top_ks, filters):
+            mask = None
+            if row_filters is not None and not row_filters.is_empty():
+                mask = self.attributes.mask(row_filters)
+                if numpy.count_nonzero(mask) <= probed_size:
+                    results.append(super().top_k_indices(query, top_k, row_filters))
+                    continue
+            candidates = self.candidates(scores, top_k, mask)
+            positions, candidate_scores = self.select_top_k(self.vectors[candidates] @ query,
+                                                            top_k)
+            results.append((candidates[positions], candidate_scores))
+        return results
+
+    @classmethod
+    def from_state(cls, embeddings: numpy.ndarray, courses: list[dict], state: dict,
+                   n_lists: int | None = None, n_probe: int = 8):
+        """
+        Method creates an IVFIndex from a persisted state, if the state is compatible with
+        the embedded dataset and the requested number of clusters. Without a requested
+        number of clusters, a state whose number of clusters is more than twice as far from
+        the default for the current size (e.g. after the catalog has grown) is rejected
+
+        Args:
+            embeddings (numpy.ndarray): Embedded dataset (one row per course)
+            courses (list[dict]): Courses data aligned by position to the embedded dataset
+            state (dict): persisted state (see `state`)
+            n_lists (int | None): Requested number of clusters (close to the default if None)
+            n_probe (int): Number of clusters scored for each query
+        Returns:
+            IVFIndex | None: index (None if the state is not compatible)
+        """
+        if state.get("index_type") != cls.index_type or \
+                state.get("dimension") != numpy.shape(embeddings)[1] or \
+                (n_lists is not None and state.get("n_lists") != n_lists):
+            return None
+        if n_lists is None:
+            default: int = cls.default_n_lists(numpy.shape(embeddings)[0])
+            if not default / 2 <= state.get("n_lists", 0) <= default * 2:
+                return None
+        return cls(embeddings, courses, n_probe=n_probe, centroids=state["centroids"])
+
+    def state(self) -> dict:
+        """
+        Method returns the trained state of the index, to be persisted alongside the
+        embedded dataset (the inverted lists are rebuilt from the centroids when loaded)
+
+        Returns:
+            dict: index type, dimension and centroids of the index
+        """
+        return {"index_type": self.index_type,
+                "dimension": self.dimension,
+                "n_lists": self.n_lists,
+                "centroids": self.centroids}
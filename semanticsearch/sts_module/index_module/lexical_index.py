@@ -0,0 +1,141 @@
+"""
+Script contains the LexicalIndex Class, an in process BM25 inverted index of the courses
+title, description and tags, used for lexical and hybrid (lexical + semantic) search
+"""
+import math
+import re
+from collections import Counter
+import numpy
+from .filters import AttributeIndex, SearchFilters
+from .vector_index import VectorIndex
+
+
+class LexicalIndex:
+    """
+    Class holds an inverted index mapping each term of the courses to the positions of the
+    courses containing it. The BM25 weight of a term in a course does not depend on the
+    query, so it is computed once when the index is built and a query is scored by summing
+    the stored weights of its terms (only the courses containing a query term are visited).
+
+    Term frequencies are weighted by the field the term occurs in (e.g. a title term counts
+    more than a description term).
+
+    Attributes:
+        size (int): Number of courses stored inside the index
+        k1 (float): BM25 term frequency saturation parameter
+        b (float): BM25 document length normalisation parameter
+    """
+    field_weights: dict = {"title": 3.0, "tags": 2.0, "description": 1.0}
+
+    def __init__(self, courses: list[dict], k1: float = 1.2, b: float = 0.75,
+                 attributes: AttributeIndex | None = None):
+        """
+        Initalising method for the LexicalIndex Class
+
+        Args:
+            courses (list[dict]): Courses data (positions match the vector index)
+            k1 (float): BM25 term frequency saturation parameter
+            b (float): BM25 document length normalisation parameter
+            attributes (AttributeIndex | None): Precomputed bitmaps of the course attributes
+                                                (built from the courses if None)
+        """
+        self.size: int = len(courses)
+        self.k1: float = k1
+        self.b: float = b
+        self.attributes: AttributeIndex = attributes if attributes is not None \
+                                          else AttributeIndex(courses)
+        frequencies = [self.term_frequencies(course) for course in courses]
+        lengths = numpy.array([sum(frequency.values()) for frequency in frequencies],
+                              dtype=numpy.float32)
+        average_length = float(lengths.mean()) if self.size > 0 and lengths.mean() > 0 else 1.0
+        postings: dict = {}
+        for position, frequency in enumerate(frequencies):
+            for term, term_frequency in frequency.items():
+                postings.setdefault(term, []).append((position, term_frequency))
+        self.__postings: dict = {}
+        for term, term_postings in postings.items():
+            positions = numpy.array([position for position, _ in term_postings], dtype=numpy.int64)
+            term_frequencies = numpy.array([frequency for _, frequency in term_postings],
+                                           dtype=numpy.float32)
+            idf = math.log(1 + (self.size - len(positions) + 0.5) / (len(positions) + 0.5))
+            norms = self.k1 * (1 - self.b + self.b * lengths[positions] / average_length)
+            weights = idf * term_frequencies * (self.k1 + 1) / (term_frequencies + norms)
+            self.__postings[term] = (positions, weights.astype(numpy.float32))
+
+    @property
+    def terms(self) -> int:
+        """int: Number of distinct terms stored inside the index"""
+        return len(self.__postings)
+
+    @staticmethod
+    def tokenise(text: str) -> list[str]:
+        """
+        Method splits a text into lower case terms
+
+        Args:
+            text (str): text to split
+        Returns:
+            list[str]: terms of the text
+        """
+        return re.findall(r"\w+", text.lower())
+
+    @classmethod
+    def term_frequencies(cls, course: dict) -> Counter:
+        """
+        Method counts the (field weighted) frequency of each term of a course
+
+        Args:
+            course (dict): course data
+        Returns:
+            Counter: weighted frequency of each term
+        """
+        frequencies = Counter()
+        for field, weight in cls.field_weights.items():
+            value = course.get(field)
+            if isinstance(value, list):
+                value = " ".join(str(item) for item in value)
+            if not isinstance(value, str):
+                continue
+            for term in cls.tokenise(value):
+                frequencies[term] += weight
+        return frequencies
+
+    def scores(self, query: str) -> tuple:
+        """
+        Method computes the BM25 score of the courses containing at least one query term
+
+        Args:
+            query (str): query text
+        Returns:
+            tuple (numpy.ndarray, numpy.ndarray): (positions, scores) of the matching courses
+        """
+        postings = [self.__postings[term] for term in set(self.tokenise(query))
+                    if term in self.__postings]
+        if len(postings) == 0:
+            return numpy.empty(0, dtype=numpy.int64), numpy.empty(0, dtype=numpy.float32)
+        if len(postings) == 1:
+            return postings[0]
+        positions = numpy.concatenate([term_positions for term_positions, _ in postings])
+        weights = numpy.concatenate([term_weights for _, term_weights in postings])
+        matches, inverse = numpy.unique(positions, return_inverse=True)
+        return matches, numpy.bincount(inverse, weights=weights).astype(numpy.float32)
+
+    def top_k_indices(self, query: str, top_k: int,
+                      filters: SearchFilters | None = None) -> tuple:
+        """
+        Method returns the positions and BM25 scores of the top k courses matching the query
+        (courses without any query term are not returned)
+
+        Args:
+            query (str): query text
+            top_k (int): Number of top related courses to return
+            filters (SearchFilters | None): filters the returned courses must match
+        Returns:
+            tuple (numpy.ndarray, numpy.ndarray): (positions, scores)
+        """
+        positions, scores = self.scores(query)
+        if filters is not None and not filters.is_empty() and len(positions) > 0:
+            matching = self.attributes.mask(filters)[positions]
+            positions, scores = positions[matching], scores[matching]
+        order, top_scores = VectorIndex.select_top_k(scores, top_k)
+        return positions[order], top_scores
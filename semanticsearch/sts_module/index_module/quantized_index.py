@@ -0,0 +1,207 @@
+"""
+Script contains the QuantizedIndex Class, a vector index scanning a quantized (int8 or
+float16) copy of the embedded dataset before rescoring the best candidates exactly
+"""
+import os
+import tempfile
+import numpy
+from .filters import SearchFilters
+from .vector_index import VectorIndex
+
+
+class QuantizedIndex(VectorIndex):
+    """
+    Class stores the normalised vectors of the embedded dataset as int8 codes (symmetric
+    scalar quantization with a scale per dimension) or as float16 values. A query first
+    scans the quantized codes in cache sized chunks, then the `top_k * rescore_factor` best
+    candidates are rescored exactly against the float32 vectors.
+
+    The float32 vectors used for rescoring are written to a memory mapped file (inside
+    `rescore_path`, the temporary directory by default), so only the quantized codes are
+    held in the process memory and the rescored candidates are paged in on demand.
+
+    Attributes:
+        precision (str): Precision of the quantized codes ("int8" or "float16")
+        rescore_factor (int): Number of candidates rescored per returned result
+        scales (numpy.ndarray): Quantization scale of each dimension
+    """
+    index_type: str = "quantized"
+    precisions: tuple = ("int8", "float16")
+
+    def __init__(self, embeddings: numpy.ndarray, courses: list[dict], precision: str = "int8",
+                 rescore_factor: int = 4, scales: numpy.ndarray | None = None,
+                 rescore_path: str | None = None, chunk_size: int = 8192):
+        """
+        Initalising method for the QuantizedIndex Class. The quantization scales are
+        computed from the embedded dataset unless previously computed scales are given.
+
+        Args:
+            embeddings (numpy.ndarray): Embedded dataset (one row per course)
+            courses (list[dict]): Courses data aligned by position to the embedded dataset
+            precision (str): Precision of the quantized codes ("int8" or "float16")
+            rescore_factor (int): Number of candidates rescored per returned result
+            scales (numpy.ndarray | None): Previously computed quantization scales
+            rescore_path (str | None): Directory of the memory mapped float32 vectors used
+                                       for rescoring (the temporary directory if None)
+            chunk_size (int): Number of codes scanned at a time
+        Raises:
+            ValueError: If the precision is not supported
+        """
+        if precision not in self.precisions:
+            raise ValueError(f"Unsupported quantization precision: {precision}")
+        vectors: numpy.ndarray = self.normalise(embeddings)
+        if precision == "int8":
+            if scales is None:
+                scales = numpy.abs(vectors).max(axis=0) / 127
+                scales[scales == 0] = 1.0
+            self.scales: numpy.ndarray = numpy.asarray(scales, dtype=numpy.float32)
+            self.__codes: numpy.ndarray = numpy.clip(numpy.rint(vectors / self.scales),
+                                                     -127, 127).astype(numpy.int8)
+        else:
+            self.scales = numpy.ones(vectors.shape[1], dtype=numpy.float32)
+            self.__codes = vectors.astype(numpy.float16)
+        #the float32 copy is released once written, only the codes stay in memory
+        vectors = self.memory_map(vectors, rescore_path or tempfile.gettempdir())
+        super().__init__(vectors, courses, normalised=True)
+        self.precision: str = precision
+        self.rescore_factor: int = rescore_factor
+        self.__chunk_size: int = chunk_size
+
+    @staticmethod
+    def memory_map(vectors: numpy.ndarray, directory: str) -> numpy.ndarray:
+        """
+        Method writes the vectors to a (temporary) .npy file inside the directory and
+        returns a read only memory map of the file
+
+        Args:
+            vectors (numpy.ndarray): vectors to write
+            directory (str): directory of the file
+        Returns:
+            numpy.ndarray: read only memory map of the vectors
+        """
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, suffix=".npy", delete=False) as file:
+            numpy.save(file, vectors)
+        memory_map = numpy.load(file.name, mmap_mode="r")
+        #the mapping stays valid after the file is unlinked (on POSIX systems)
+        os.unlink(file.name)
+        return memory_map
+
+    @property
+    def nbytes(self) -> int:
+        """int: Memory (bytes) used by the quantized codes and float32 vectors of the index"""
+        return super().nbytes + self.__codes.nbytes + self.scales.nbytes
+
+    def scan(self, queries: numpy.ndarray, positions: numpy.ndarray | None = None) -> numpy.ndarray:
+        """
+        Method computes the approximate scores of every query against the quantized codes,
+        converting one chunk of codes at a time to float32
+
+        Args:
+            queries (numpy.ndarray): normalised queries (one row per query)
+            positions (numpy.ndarray | None): positions of the codes to scan (all if None)
+        Returns:
+            numpy.ndarray: approximate scores (one row per query, one column per position)
+        """
+        scaled_queries = (queries * self.scales).T
+        size = self.size if positions is None else len(positions)
+        scores = numpy.empty((len(queries), size), dtype=numpy.float32)
+        for start in range(0, size, self.__chunk_size):
+            if positions is None:
+                chunk = self.__codes[start:start + self.__chunk_size]
+            else:
+                chunk = self.__codes[positions[start:start + self.__chunk_size]]
+            scores[:, start:start + self.__chunk_size] = (chunk.astype(numpy.float32)
+                                                          @ scaled_queries).T
+        return scores
+
+    def top_k_indices(self, query_embedding: numpy.ndarray, top_k: int,
+                      filters: SearchFilters | None = None) -> tuple:
+        """
+        Method returns the positions and cosine similarity scores of the top k vectors
+        closest to the query embedding (ordered by descending score)
+
+        Args:
+            query_embedding (numpy.ndarray): embedded query
+            top_k (int): Number of top related vectors to return
+            filters (SearchFilters | None): filters the returned vectors must match
+        Returns:
+            tuple (numpy.ndarray, numpy.ndarray): (positions, scores)
+        """
+        return self.top_k_indices_batch(query_embedding, [top_k], [filters])[0]
+
+    def top_k_indices_batch(self, query_embeddings: numpy.ndarray, top_ks: list[int],
+                            filters: list | None = None) -> list:
+        """
+        Method returns the positions and scores of the top k vectors for a batch of queries.
+        Candidates are selected from a scan of the quantized codes (of the vectors matching
+        the filters of the query), then rescored exactly.
+
+        Args:
+            query_embeddings (numpy.ndarray): embedded queries (one row per query)
+            top_ks (list[int]): Number of top related vectors to return for each query
+            filters (list[SearchFilters | None] | None): filters of each query
+        Returns:
+            list[tuple (numpy.ndarray, numpy.ndarray)]: (positions, scores) of each query
+        """
+        queries = self.normalise(query_embeddings)
+        filters = filters or [None] * len(queries)
+        subsets = [self.filtered_positions(row_filters) for row_filters in filters]
+        unfiltered = [row for row, subset in enumerate(subsets) if subset is None]
+        approximate_scores = [None] * len(queries)
+        if len(unfiltered) > 0:
+            for row, row_scores in zip(unfiltered, self.scan(queries[unfiltered])):
+                approximate_scores[row] = row_scores
+        results = []
+        for row, (query, top_k, subset) in enumerate(zip(queries, top_ks, subsets)):
+            row_scores = approximate_scores[row]
+            if row_scores is None:
+                row_scores = self.scan(query[None, :], subset)[0]
+            candidates, _ = self.select_top_k(row_scores, top_k * self.rescore_factor)
+            if subset is not None:
+                candidates = subset[candidates]
+            #sorted positions keep the reads of memory mapped vectors sequential
+            candidates = numpy.sort(candidates)
+            positions, scores = self.select_top_k(self.vectors[candidates] @ query, top_k)
+            results.append((candidates[positions], scores))
+        return results
+
+    @classmethod
+    def from_state(cls, embeddings: numpy.ndarray, courses: list[dict], state: dict,
+                   precision: str = "int8", **options):
+        """
+        Method creates a QuantizedIndex from persisted quantization parameters, if they are
+        compatible with the embedded dataset and the requested precision. Persisted int8
+        scales are only reused if they cover the range of every dimension of the embedded
+        dataset (vectors added since the scales were computed would otherwise be clipped)
+
+        Args:
+            embeddings (numpy.ndarray): Embedded dataset (one row per course)
+            courses (list[dict]): Courses data aligned by position to the embedded dataset
+            state (dict): persisted state (see `state`)
+            precision (str): Requested precision of the quantized codes
+            **options: other options of the index (e.g. rescore_factor)
+        Returns:
+            QuantizedIndex | None: index (None if the state is not compatible)
+        """
+        if state.get("index_type") != cls.index_type or state.get("precision") != precision or \
+                state.get("dimension") != numpy.shape(embeddings)[1]:
+            return None
+        scales = numpy.asarray(state["scales"], dtype=numpy.float32)
+        if precision == "int8" and \
+                numpy.any(numpy.abs(cls.normalise(embeddings)).max(axis=0) / 127 > scales):
+            return None
+        return cls(embeddings, courses, precision=precision, scales=scales, **options)
+
+    def state(self) -> dict:
+        """
+        Method returns the quantization parameters of the index, to be persisted alongside
+        the embedded dataset (the codes are recomputed from the embedded dataset when loaded)
+
+        Returns:
+            dict: index type, precision, dimension and scales of the index
+        """
+        return {"index_type": self.index_type,
+                "precision": self.precision,
+                "dimension": self.dimension,
+                "scales": self.scales}
@@ -0,0 +1,211 @@
+"""
+Script contains the VectorIndex Class, a process resident index of the embedded dataset
+used to answer semantic search queries without reloading the dataset from the database
+"""
+import copy
+import numpy
+from .filters import AttributeIndex, SearchFilters
+
+
+class VectorIndex:
+    """
+    Class holds the embedded dataset in memory as pre-normalised float32 vectors aligned
+    to the course records they represent. Top k queries are answered with a single
+    matrix-vector product followed by a partial sort.
+
+    Metadata filters are evaluated against an AttributeIndex built when the index is
+    created, and a filtered query is only scored against the matching vectors.
+
+    Attributes:
+        size (int): Number of courses stored inside the index
+        dimension (int): Dimension of the vectors stored inside the index
+        attributes (AttributeIndex): Precomputed bitmaps of the course attributes
+    """
+    def __init__(self, embeddings: numpy.ndarray, courses: list[dict], normalised: bool = False):
+        """
+        Initalising method for the VectorIndex Class
+
+        Args:
+            embeddings (numpy.ndarray): Embedded dataset (one row per course)
+            courses (list[dict]): Courses data aligned by position to the embedded dataset
+            normalised (bool): If the embeddings are already a normalised float32 matrix
+                               (e.g. a memory mapped file), which is then used without a copy
+        Raises:
+            ValueError: If the number of embeddings and courses do not match
+        """
+        if len(embeddings) != len(courses):
+            raise ValueError(f"Embedded dataset has {len(embeddings)} rows but "
+                             f"{len(courses)} courses were given")
+        self.__vectors: numpy.ndarray = embeddings if normalised else self.normalise(embeddings)
+        self.__courses: list[dict] = courses
+        self.attributes: AttributeIndex = AttributeIndex(courses)
+
+    @property
+    def size(self) -> int:
+        """int: Number of courses stored inside the index"""
+        return self.__vectors.shape[0]
+
+    @property
+    def dimension(self) -> int:
+        """int: Dimension of the vectors stored inside the index"""
+        return self.__vectors.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """int: Memory (bytes) used by the vectors of the index (memory mapped vectors excluded)"""
+        return 0 if isinstance(self.__vectors, numpy.memmap) else self.__vectors.nbytes
+
+    @property
+    def vectors(self) -> numpy.ndarray:
+        """numpy.ndarray: Normalised float32 vectors stored inside the index"""
+        return self.__vectors
+
+    @property
+    def courses(self) -> list[dict]:
+        """list[dict]: Courses data aligned by position to the vectors of the index"""
+        return self.__courses
+
+    @staticmethod
+    def normalise(embeddings: numpy.ndarray) -> numpy.ndarray:
+        """
+        Method converts embeddings to a C-contiguous float32 matrix of unit length rows,
+        so the dot product between two rows is equal to their cosine similarity
+
+        Args:
+            embeddings (numpy.ndarray): vector or matrix of embeddings
+        Returns:
+            numpy.ndarray: normalised float32 matrix (a vector is returned as a single row)
+        """
+        vectors = numpy.array(embeddings, dtype=numpy.float32, ndmin=2, order="C")
+        norms = numpy.linalg.norm(vectors, axis=1, keepdims=True)
+        #avoid division by zero for empty vectors
+        norms[norms == 0] = 1.0
+        vectors /= norms
+        return vectors
+
+    def filtered_positions(self, filters: SearchFilters | None) -> numpy.ndarray | None:
+        """
+        Method returns the positions of the vectors matching the filters
+
+        Args:
+            filters (SearchFilters | None): filters of the search
+        Returns:
+            numpy.ndarray | None: positions of the matching vectors (None if not filtered)
+        """
+        if filters is None or filters.is_empty():
+            return None
+        return self.attributes.positions(filters)
+
+    def top_k_indices(self, query_embedding: numpy.ndarray, top_k: int,
+                      filters: SearchFilters | None = None) -> tuple:
+        """
+        Method returns the positions and cosine similarity scores of the top k vectors
+        closest to the query embedding (ordered by descending score)
+
+        Args:
+            query_embedding (numpy.ndarray): embedded query
+            top_k (int): Number of top related vectors to return
+            filters (SearchFilters | None): filters the returned vectors must match
+        Returns:
+            tuple (numpy.ndarray, numpy.ndarray): (positions, scores)
+        """
+        query = self.normalise(query_embedding)[0]
+        positions = self.filtered_positions(filters)
+        if positions is None:
+            return self.select_top_k(self.__vectors @ query, top_k)
+        order, scores = self.select_top_k(self.__vectors[positions] @ query, top_k)
+        return positions[order], scores
+
+    def top_k_indices_batch(self, query_embeddings: numpy.ndarray, top_ks: list[int],
+                            filters: list | None = None) -> list:
+        """
+        Method returns the positions and scores of the top k vectors for a batch of queries,
+        scoring every unfiltered query with a single matrix-matrix product
+
+        Args:
+            query_embeddings (numpy.ndarray): embedded queries (one row per query)
+            top_ks (list[int]): Number of top related vectors to return for each query
+            filters (list[SearchFilters | None] | None): filters of each query
+        Returns:
+            list[tuple (numpy.ndarray, numpy.ndarray)]: (positions, scores) of each query
+        """
+        queries = self.normalise(query_embeddings)
+        filters = filters or [None] * len(queries)
+        results = [None] * len(queries)
+        unfiltered = [row for row, row_filters in enumerate(filters)
+                      if row_filters is None or row_filters.is_empty()]
+        if len(unfiltered) > 0:
+            scores = queries[unfiltered] @ self.__vectors.T
+            for row, row_scores in zip(unfiltered, scores):
+                results[row] = self.select_top_k(row_scores, top_ks[row])
+        for row, result in enumerate(results):
+            if result is None:
+                results[row] = self.top_k_indices(queries[row], top_ks[row], filters[row])
+        return results
+
+    @staticmethod
+    def select_top_k(scores: numpy.ndarray, top_k: int) -> tuple:
+        """
+        Method selects the top k scores with a partial sort, only ordering the selected scores
+
+        Args:
+            scores (numpy.ndarray): score of every vector
+            top_k (int): Number of top scores to select
+        Returns:
+            tuple (numpy.ndarray, numpy.ndarray): (positions, scores) ordered by descending score
+        """
+        top_k = min(top_k, len(scores))
+        if top_k <= 0:
+            return numpy.empty(0, dtype=numpy.int64), numpy.empty(0, dtype=numpy.float32)
+        if top_k < len(scores):
+            candidates = numpy.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            candidates = numpy.arange(len(scores))
+        order = candidates[numpy.argsort(-scores[candidates], kind="stable")]
+        return order, scores[order]
+
+    def search(self, query_embedding: numpy.ndarray, top_k: int = 5,
+               filters: SearchFilters | None = None) -> list[dict]:
+        """
+        Method returns the top k courses closest to the query embedding
+
+        Args:
+            query_embedding (numpy.ndarray): embedded query
+            top_k (int): Number of top related courses desired to be returned by the method
+            filters (SearchFilters | None): filters the returned courses must match
+        Returns:
+            list[dict]: list of top k courses (information stored as a dict object)
+        """
+        positions, _ = self.top_k_indices(query_embedding, top_k, filters)
+        return self.courses_at(positions)
+
+    def search_batch(self, query_embeddings: numpy.ndarray, top_ks: list[int],
+                     filters: list | None = None) -> list[list]:
+        """
+        Method returns the top k courses closest to each query embedding of a batch
+
+        Args:
+            query_embeddings (numpy.ndarray): embedded queries (one row per query)
+            top_ks (list[int]): Number of top related courses to return for each query
+            filters (list[SearchFilters | None] | None): filters of each query
+        Returns:
+            list[list[dict]]: list of top k courses of each query
+        """
+        return [self.courses_at(positions)
+                for positions, _ in self.top_k_indices_batch(query_embeddings, top_ks, filters)]
+
+    def courses_at(self, positions: numpy.ndarray) -> list[dict]:
+        """
+        Method returns copies (without the "_id" field) of the courses at the given positions
+
+        Args:
+            positions (numpy.ndarray): positions of the courses inside the index
+        Returns:
+            list[dict]: list of courses (information stored as a dict object)
+        """
+        courses = []
+        for position in positions:
+            course = copy.deepcopy(self.__courses[position])
+            course.pop("_id", None)
+            courses.append(course)
+        return courses
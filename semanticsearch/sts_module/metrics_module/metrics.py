@@ -0,0 +1,254 @@
+"""
+Script contains the metrics (counters, gauges and histograms) of the Semantic Search Module,
+exposed in the Prometheus text format, and the per request timing of the search stages
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+#time (s) spent in each stage of the current request (None outside of a request)
+request_timings: ContextVar[dict | None] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """
+    Method records the time spent in a stage of the current request (repeated stages are
+    summed). Nothing is recorded outside of a request.
+
+    Args:
+        stage (str): name of the stage (e.g. "encode")
+    """
+    prev_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - prev_time)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """
+    Method adds the time spent in a stage to the timings of the current request
+
+    Args:
+        stage (str): name of the stage
+        seconds (float): time spent in the stage
+    """
+    timings = request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    """
+    Method formats the labels of a sample in the Prometheus text format
+
+    Args:
+        names (tuple): label names
+        values (tuple): label values
+        extra (str): additional formatted label (e.g. the bucket of a histogram)
+    Returns:
+        str: formatted labels (empty if there are none)
+    """
+    labels = [f'{name}="{str(value)}"'.replace("\n", " ") for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+class Counter:
+    """
+    Class is a thread safe counter of each combination of label values
+
+    Attributes:
+        name (str): Name of the metric
+        description (str): Help text of the metric
+        labels (tuple): Label names of the metric
+    """
+    def __init__(self, name: str, description: str, labels: tuple = ()):
+        """
+        Initalising method for the Counter Class
+
+        Args:
+            name (str): Name of the metric
+            description (str): Help text of the metric
+            labels (tuple): Label names of the metric
+        """
+        self.name: str = name
+        self.description: str = description
+        self.labels: tuple = labels
+        self.__values: dict = {}
+        self.__lock = threading.Lock()
+
+    def inc(self, values: tuple = (), amount: float = 1.0) -> None:
+        """
+        Method increments the counter of the label values
+
+        Args:
+            values (tuple): label values
+            amount (float): increment
+        """
+        with self.__lock:
+            self.__values[values] = self.__values.get(values, 0.0) + amount
+
+    def render(self) -> list[str]:
+        """
+        Method renders the metric in the Prometheus text format
+
+        Returns:
+            list[str]: lines of the metric
+        """
+        with self.__lock:
+            values = dict(self.__values)
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"] + \
+               [f"{self.name}{format_labels(self.labels, key)} {value}"
+                for key, value in sorted(values.items())]
+
+
+class Histogram:
+    """
+    Class is a thread safe histogram (cumulative buckets, sum and count) of observations
+    of each combination of label values
+
+    Attributes:
+        name (str): Name of the metric
+        description (str): Help text of the metric
+        labels (tuple): Label names of the metric
+        buckets (tuple): Upper bounds of the buckets (ascending)
+    """
+    default_buckets: tuple = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                              1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, name: str, description: str, labels: tuple = (),
+                 buckets: tuple | None = None):
+        """
+        Initalising method for the Histogram Class
+
+        Args:
+            name (str): Name of the metric
+            description (str): Help text of the metric
+            labels (tuple): Label names of the metric
+            buckets (tuple | None): Upper bounds of the buckets (default_buckets if None)
+        """
+        self.name: str = name
+        self.description: str = description
+        self.labels: tuple = labels
+        self.buckets: tuple = tuple(sorted(buckets or self.default_buckets))
+        #label values mapped to [bucket counts, sum, count]
+        self.__values: dict = {}
+        self.__lock = threading.Lock()
+
+    def observe(self, value: float, values: tuple = ()) -> None:
+        """
+        Method records an observation
+
+        Args:
+            value (float): observed value
+            values (tuple): label values
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self.__lock:
+            entry = self.__values.setdefault(values, [[0] * len(self.buckets), 0.0, 0])
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list[str]:
+        """
+        Method renders the metric in the Prometheus text format
+
+        Returns:
+            list[str]: lines of the metric
+        """
+        with self.__lock:
+            values = {key: (list(entry[0]), entry[1], entry[2])
+                      for key, entry in self.__values.items()}
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts + [0]):
+                cumulative += bucket_count
+                bucket_labels = format_labels(self.labels, key, 'le="' + str(bound) + '"')
+                #observations above the last bound are only counted by the +Inf bucket
+                lines.append(f"{self.name}_bucket{bucket_labels} "
+                             f"{count if bound == '+Inf' else cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Gauge:
+    """
+    Class is a gauge whose samples are read from a function when the metrics are rendered
+    (e.g. the size of the search index), so it adds no cost to the requests
+
+    Attributes:
+        name (str): Name of the metric
+        description (str): Help text of the metric
+        labels (tuple): Label names of the metric
+    """
+    def __init__(self, name: str, description: str, read: Callable[[], dict],
+                 labels: tuple = ()):
+        """
+        Initalising method for the Gauge Class
+
+        Args:
+            name (str): Name of the metric
+            description (str): Help text of the metric
+            read (Callable): function returning the value of each combination of label
+                             values (a dict of label values tuple -> value)
+            labels (tuple): Label names of the metric
+        """
+        self.name: str = name
+        self.description: str = description
+        self.labels: tuple = labels
+        self.__read: Callable[[], dict] = read
+
+    def render(self) -> list[str]:
+        """
+        Method renders the metric in the Prometheus text format
+
+        Returns:
+            list[str]: lines of the metric
+        """
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} gauge"] + \
+               [f"{self.name}{format_labels(self.labels, key)} {float(value)}"
+                for key, value in sorted(self.__read().items())]
+
+
+class MetricsRegistry:
+    """
+    Class holds the metrics of the module and renders them in the Prometheus text format
+    """
+    content_type: str = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        """
+        Initalising method for the MetricsRegistry Class
+        """
+        self.__metrics: list = []
+
+    def register(self, metric: Counter | Histogram | Gauge) -> Counter | Histogram | Gauge:
+        """
+        Method registers a metric
+
+        Args:
+            metric (Counter | Histogram | Gauge): metric to register
+        Returns:
+            Counter | Histogram | Gauge: the registered metric
+        """
+        self.__metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Method renders every registered metric in the Prometheus text format
+
+        Returns:
+            str: text exposition of the metrics
+        """
+        return "\n".join(line for metric in self.__metrics for line in metric.render()) + "\n"
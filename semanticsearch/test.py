@@ -2,13 +2,41 @@
 Script contains all unit tests for the Semantic Search Module Core Interactions
 Note: Tests require an active Test MongoDB Server instance
 """
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from jsonschema import ValidationError, validate
 import numpy
+from bson import ObjectId
+from bson.json_util import dumps
 from pymongo import MongoClient
 from sts_module.database.database_helper import DatabaseHelper
-from sts_module.database.mongo_db_interface import MongoDBDatabase
+from sts_module.database.mongo_db_interface import MongoDBDatabase, MongoClientRegistry
+from sts_module.database.memory_database import MemoryDatabase
+from sts_module.database.snapshot_database import SnapshotDatabase
+from sts_module.database import exceptions
 from sts_module.embedding_module.controller import EmbeddingController
+from sts_module.embedding_module.batcher import QueryEncodeBatcher
+from sts_module.embedding_module.encoders import (HashingEncoder, check_encoder_backend,
+                                                  encoder_backends)
+from sts_module.embedding_module.parallel import ShardedEncoder
+from sts_module.index_module.vector_index import VectorIndex
+from sts_module.index_module.ivf_index import IVFIndex
+from sts_module.index_module.quantized_index import QuantizedIndex
+from sts_module.index_module.filters import AttributeIndex, SearchFilters
+from sts_module.index_module.lexical_index import LexicalIndex
+from sts_module.index_module.hybrid_search import HybridSearch
+from sts_module.index_module.index_manager import IndexManager
+from sts_module.cache_module.lru_cache import LRUCache
+from sts_module.cache_module.result_cache import ResultCache
+from sts_module.metrics_module.metrics import (Counter, Gauge, Histogram, MetricsRegistry,
+                                               request_timings, timed)
 
 
 class EmbeddingControllerTests(unittest.TestCase):
@@ -126,6 +154,116 @@ class EmbeddingControllerTests(unittest.TestCase):
         embedded_dataset = controller.retrieve_embedded_dataset()
         self.assertEqual(len(embedded_dataset), len(courses))
 
+    def test_shared_client(self) -> None:
+        """
+        Method tests database objects connecting to the same server share one pooled client,
+        which stays open when a database object is closed
+
+        Assert Conditions:
+            - Check the database objects are disconnected once closed
+            - Check the shared client is reused after the database objects are closed
+        """
+        key, client = MongoClientRegistry.client("mongodb://localhost:27017/", "chatbot",
+                                                 "chatbotpassword", "SCRAM-SHA-1")
+        self.courses_database.connect()
+        self.embedded_database.connect(create=True)
+        self.courses_database.close()
+        self.embedded_database.close()
+        self.assertFalse(self.courses_database.is_connected())
+        self.assertEqual(MongoClientRegistry.client("mongodb://localhost:27017/", "chatbot",
+                                                    "chatbotpassword", "SCRAM-SHA-1"),
+                         (key, client))
+
+    def test_change_marker(self) -> None:
+        """
+        Method tests the change marker of a collection changes with every write of the
+        module, including documents replaced in place
+
+        Assert Conditions:
+            - Check the marker is stable while the collection is unchanged
+            - Check inserting, replacing and deleting documents change the marker
+        """
+        database = MongoDBDatabase(url="mongodb://localhost:27017/", username="chatbot",
+                                   password="chatbotpassword", auth_mechanism="SCRAM-SHA-1",
+                                   database="ibm_chatbot", collection="change_marker_test")
+        database.connect(create=True)
+        document = {"_id": ObjectId(), "title": "course 0"}
+        markers = [database.change_marker()]
+        database.insert_documents([document])
+        markers.append(database.change_marker())
+        self.assertEqual(database.change_marker(), markers[-1])
+        database.upsert_documents([{**document, "title": "course 1"}])
+        markers.append(database.change_marker())
+        database.delete_documents([document["_id"]])
+        markers.append(database.change_marker())
+        database.close()
+        self.assertEqual(len(set(markers)), 4)
+
+    def test_streamed_json_matches_round_trip(self) -> None:
+        """
+        Method tests the native BSON conversion of streamed documents returns the same
+        objects as a `bson.json_util.dumps`/`json.loads` round trip, and that projected
+        reads only return the projected fields
+
+        Assert Conditions:
+            - Check the converted courses equal the round trip of the raw documents
+            - Check non-finite numbers (e.g. empty CSV cells) are converted like the round trip
+            - Check a projected iteration only returns the projected fields
+        """
+        self.courses_database.connect()
+        raw_courses: list = list(self.courses_database.iterate_documents())
+        self.courses_database.close()
+        courses: list = DatabaseHelper.load_collection_data_json(self.courses_database)
+        self.assertEqual(courses, json.loads(dumps(raw_courses)))
+        document: dict = {"_id": ObjectId(), "title": "course", "learning_hours": float("nan"),
+                          "scores": [float("inf"), -float("inf"), 1.5]}
+        self.assertEqual(MongoDBDatabase.to_json(document), json.loads(dumps(document)))
+        titles: list = list(DatabaseHelper.iterate_collection_data_json(
+                                self.courses_database, projection={"_id": 0, "title": 1},
+                                batch_size=10))
+        self.assertEqual(titles, [{"title": course["title"]} for course in courses])
+
+    def test_update_embedded_dataset(self) -> None:
+        """
+        Method tests the incremental update of the embedded dataset, where only new or
+        changed courses (detected by the hash of their passage) are embedded
+
+        Assert Conditions:
+            - Check an up to date embedded dataset reports every course as unchanged
+            - Check the number of rows of the retrieved embedded dataset matches the 
+              number of courses stored on the database
+        """
+        courses: list = DatabaseHelper.load_collection_data_json(self.courses_database)
+        controller = EmbeddingController(self.courses_database, self.embedded_database)
+        controller.update_embedded_dataset()
+        changes: dict = controller.update_embedded_dataset()
+        self.assertEqual(changes, {"added": 0, "updated": 0, "removed": 0,
+                                   "unchanged": len(courses)})
+        embedded_dataset = controller.retrieve_embedded_dataset()
+        self.assertEqual(len(embedded_dataset), len(courses))
+
+    def test_embedding_dim_rebuild(self) -> None:
+        """
+        Method tests a changed embedding dimension triggers a rebuild of the embedded dataset,
+        storing and retrieving the truncated embeddings
+
+        Assert Conditions:
+            - Check every course is re-embedded when the embedding dimension changes
+            - Check the retrieved embedded dataset has the configured dimension
+        """
+        courses: list = DatabaseHelper.load_collection_data_json(self.courses_database)
+        controller = EmbeddingController(self.courses_database, self.embedded_database)
+        controller.update_embedded_dataset()
+        try:
+            EmbeddingController.configure_embedding_dim(16)
+            changes: dict = controller.update_embedded_dataset()
+            self.assertEqual(changes["updated"], len(courses))
+            self.assertEqual(controller.retrieve_embedded_dataset().shape[1], 16)
+            self.assertEqual(controller.create_query_embedding("Data Science").shape, (16,))
+        finally:
+            EmbeddingController.configure_embedding_dim(None)
+            controller.update_embedded_dataset()
+
     def test_recieve_embedded_dataset(self) -> None:
         """
         Method tests to see that the EmbeddedController can successfully retrieve the
@@ -161,5 +299,1199 @@ class EmbeddingControllerTests(unittest.TestCase):
         except ValidationError as e:
             self.fail(f"Invalid Course Schema: {e.message}")
 
+    def test_binary_embedded_dataset(self) -> None:
+        """
+        Method tests the storage and retrieval of the embedded dataset in the compact
+        binary format, storing one BSON binary vector per course keyed by the course "_id"
+
+        Assert Conditions:
+            - Check the stored dataset is keyed by the "_id" of every course
+            - Check the retrieved vectors match the embedded dataset (within float16 precision)
+        """
+        courses: list = DatabaseHelper.load_collection_data_json(self.courses_database)
+        embedded_dataset: numpy.ndarray = EmbeddingController(
+            self.courses_database, self.embedded_database).create_embedding(courses)
+        course_ids: list = [DatabaseHelper.course_id(course) for course in courses]
+        DatabaseHelper.store_embedded_dataset_binary(self.embedded_database, embedded_dataset,
+                                                     course_ids, dtype="float16")
+        stored_ids, stored_dataset = DatabaseHelper.load_embedded_dataset_binary(
+                                                                self.embedded_database)
+        self.assertEqual(sorted(map(str, stored_ids)), sorted(map(str, course_ids)))
+        rows: dict = {course_id: row for row, course_id in enumerate(stored_ids)}
+        order: list = [rows[course_id] for course_id in course_ids]
+        self.assertTrue(numpy.allclose(stored_dataset[order], embedded_dataset,
+                                       rtol=1e-2, atol=1e-3))
+
+    def test_vector_index_search(self) -> None:
+        """
+        Method tests the process resident VectorIndex built by the Embedded Controller
+        returns the same courses as the `courses_semantic_search` method
+
+        Assert Conditions:
+            - Check the index contains every course stored on the database
+            - Check the index returns the same top k courses as `courses_semantic_search`
+        """
+        courses: list = DatabaseHelper.load_collection_data_json(self.courses_database)
+        controller = EmbeddingController(self.courses_database, self.embedded_database)
+        vector_index: VectorIndex = controller.load_vector_index()
+        self.assertEqual(vector_index.size, len(courses))
+        query: str = "Introduction to DataScience"
+        top_k: int = 10
+        index_courses = vector_index.search(controller.create_query_embedding(query), top_k)
+        self.assertEqual(index_courses, controller.courses_semantic_search(query, top_k))
+
+
+class VectorIndexTests(unittest.TestCase):
+    """
+    Class for testing the VectorIndex Class of the Semantic Search Module.
+    The Tests use a random embedded dataset and do not require the database server
+    """
+    def setUp(self) -> None:
+        generator = numpy.random.default_rng(0)
+        self.embeddings: numpy.ndarray = generator.normal(size=(200, 32))
+        self.courses: list[dict] = [{"_id": {"$oid": str(i)}, "title": f"course {i}"}
+                                    for i in range(200)]
+
+    def test_top_k_matches_brute_force(self) -> None:
+        """
+        Method tests the partial sort of the VectorIndex returns the same ranking as
+        a full sort of the cosine similarity scores
+
+        Assert Conditions:
+            - Check the positions returned match a brute force ranking
+            - Check the returned courses have the "_id" field removed
+        """
+        vector_index = VectorIndex(self.embeddings, self.courses)
+        query: numpy.ndarray = self.embeddings[3] + 0.1
+        normalised = self.embeddings / numpy.linalg.norm(self.embeddings, axis=1, keepdims=True)
+        expected = numpy.argsort(-(normalised @ (query / numpy.linalg.norm(query))))[:10]
+        positions, scores = vector_index.top_k_indices(query, 10)
+        self.assertEqual(list(positions), list(expected))
+        self.assertTrue(numpy.all(numpy.diff(scores) <= 0))
+        top_k_courses = vector_index.search(query, 10)
+        self.assertEqual(top_k_courses[0], {"title": f"course {expected[0]}"})
+        self.assertIn("_id", self.courses[expected[0]])
+
+    def test_batch_search_matches_single_search(self) -> None:
+        """
+        Method tests a batched search (a single matrix-matrix product) returns the same
+        courses as searching each query individually
+
+        Assert Condition:
+            Check the courses of each query of the batch match an individual search
+        """
+        vector_index = VectorIndex(self.embeddings, self.courses)
+        queries: numpy.ndarray = self.embeddings[:4] + 0.05
+        top_ks: list[int] = [1, 5, 10, 3]
+        results = vector_index.search_batch(queries, top_ks)
+        for query, top_k, result in zip(queries, top_ks, results):
+            self.assertEqual(result, vector_index.search(query, top_k))
+
+    def test_truncated_embeddings_are_normalised(self) -> None:
+        """
+        Method tests the Matryoshka truncation of embeddings keeps the leading dimensions
+        and renormalises the truncated vectors
+
+        Assert Conditions:
+            - Check the truncated dimension
+            - Check the truncated vectors are of unit length and proportional to the original
+        """
+        truncated = EmbeddingController.truncate(self.embeddings, 8)
+        self.assertEqual(truncated.shape, (200, 8))
+        self.assertTrue(numpy.allclose(numpy.linalg.norm(truncated, axis=1), 1.0))
+        self.assertTrue(numpy.allclose(truncated[0] * numpy.linalg.norm(self.embeddings[0, :8]),
+                                       self.embeddings[0, :8], atol=1e-5))
+        self.assertIs(EmbeddingController.truncate(self.embeddings, None), self.embeddings)
+
+    def test_top_k_larger_than_index(self) -> None:
+        """
+        Method tests the VectorIndex returns every course when k exceeds the index size
+
+        Assert Condition:
+            Check the number of courses returned is equal to the size of the index
+        """
+        vector_index = VectorIndex(self.embeddings, self.courses)
+        self.assertEqual(len(vector_index.search(self.embeddings[0], 500)), vector_index.size)
+
+
+class IVFIndexTests(unittest.TestCase):
+    """
+    Class for testing the IVFIndex Class (approximate nearest neighbour index) of the
+    Semantic Search Module against the exact VectorIndex
+    """
+    def setUp(self) -> None:
+        generator = numpy.random.default_rng(0)
+        self.embeddings: numpy.ndarray = generator.normal(size=(200, 32))
+        self.courses: list[dict] = [{"title": f"course {i}"} for i in range(200)]
+
+    def test_full_probe_matches_exact_index(self) -> None:
+        """
+        Method tests an IVFIndex probing every cluster returns the same ranking as the
+        exact VectorIndex
+
+        Assert Condition:
+            Check the positions returned match the exact index for several queries
+        """
+        exact_index = VectorIndex(self.embeddings, self.courses)
+        ivf_index = IVFIndex(self.embeddings, self.courses, n_lists=8, n_probe=8)
+        for query in self.embeddings[:5] + 0.1:
+            self.assertEqual(list(ivf_index.top_k_indices(query, 10)[0]),
+                             list(exact_index.top_k_indices(query, 10)[0]))
+
+    def test_from_state(self) -> None:
+        """
+        Method tests an IVFIndex is only restored from a compatible persisted state
+
+        Assert Conditions:
+            - Check a restored index keeps the persisted centroids
+            - Check a state with a different number of clusters is rejected
+            - Check a default state is rejected once the catalog has outgrown it
+        """
+        ivf_index = IVFIndex(self.embeddings, self.courses)
+        restored = IVFIndex.from_state(self.embeddings, self.courses, ivf_index.state())
+        self.assertTrue(numpy.allclose(restored.centroids, ivf_index.centroids))
+        self.assertIsNone(IVFIndex.from_state(self.embeddings, self.courses,
+                                              ivf_index.state(), n_lists=4))
+        grown = numpy.vstack([self.embeddings] * 10)
+        self.assertIsNone(IVFIndex.from_state(grown, self.courses * 10, ivf_index.state()))
+
+
+class QuantizedIndexTests(unittest.TestCase):
+    """
+    Class for testing the QuantizedIndex Class (int8/float16 scan with exact rescoring)
+    of the Semantic Search Module against the exact VectorIndex
+    """
+    def setUp(self) -> None:
+        generator = numpy.random.default_rng(0)
+        self.embeddings: numpy.ndarray = generator.normal(size=(200, 32))
+        self.courses: list[dict] = [{"title": f"course {i}"} for i in range(200)]
+
+    def test_rescoring_matches_exact_index(self) -> None:
+        """
+        Method tests the quantized index returns the exact ranking and scores once the
+        candidates are rescored against the float32 vectors
+
+        Assert Conditions:
+            - Check the positions returned match the exact index for both precisions
+            - Check the returned scores are the exact float32 scores
+            - Check the float32 vectors are memory mapped (not held in memory)
+        """
+        exact_index = VectorIndex(self.embeddings, self.courses)
+        for precision in QuantizedIndex.precisions:
+            quantized_index = QuantizedIndex(self.embeddings, self.courses,
+                                             precision=precision, rescore_factor=4)
+            self.assertIsInstance(quantized_index.vectors, numpy.memmap)
+            self.assertLess(quantized_index.nbytes, exact_index.nbytes)
+            for query in self.embeddings[:5] + 0.1:
+                positions, scores = quantized_index.top_k_indices(query, 5)
+                exact_positions, exact_scores = exact_index.top_k_indices(query, 5)
+                self.assertEqual(list(positions), list(exact_positions))
+                self.assertTrue(numpy.allclose(scores, exact_scores))
+
+    def test_from_state(self) -> None:
+        """
+        Method tests a QuantizedIndex restored from persisted quantization parameters stores
+        the same int8 codes
+
+        Assert Conditions:
+            - Check the restored index keeps the persisted scales
+            - Check a state of a different precision is rejected
+            - Check a state whose scales do not cover a changed dataset is rejected
+        """
+        quantized_index = QuantizedIndex(self.embeddings, self.courses)
+        restored = QuantizedIndex.from_state(self.embeddings, self.courses,
+                                             quantized_index.state())
+        self.assertTrue(numpy.array_equal(restored.scales, quantized_index.scales))
+        self.assertIsNone(QuantizedIndex.from_state(self.embeddings, self.courses,
+                                                    quantized_index.state(),
+                                                    precision="float16"))
+        #a new course concentrated on a single dimension exceeds the persisted scale
+        spike = numpy.zeros((1, self.embeddings.shape[1]))
+        spike[0, 0] = 1.0
+        self.assertIsNone(QuantizedIndex.from_state(numpy.vstack([self.embeddings, spike]),
+                                                    self.courses + [{"title": "new"}],
+                                                    quantized_index.state()))
+
+
+class SearchFiltersTests(unittest.TestCase):
+    """
+    Class for testing the metadata filters (SearchFilters and AttributeIndex Classes) of
+    the vector indexes of the Semantic Search Module
+    """
+    def setUp(self) -> None:
+        generator = numpy.random.default_rng(0)
+        self.embeddings: numpy.ndarray = generator.normal(size=(200, 32))
+        learning_hours: list[str] = ["30 mins", "2 hrs 30 mins", "4 mins 38 s", "Days"]
+        self.courses: list[dict] = [{"title": f"course {i}",
+                                     "course_type": "Video" if i % 3 == 0 else "Course",
+                                     "learning_hours": learning_hours[i % 4],
+                                     "tags": ["ai"] if i % 2 == 0 else ["cloud"]}
+                                    for i in range(200)]
+        self.filters = SearchFilters(course_types=["Video"], max_learning_hours=1,
+                                     required_tags=["ai"], excluded_tags=["cloud"])
+
+    def expected_positions(self) -> list[int]:
+        """Method returns the positions of the courses matching the filters"""
+        return [i for i in range(200) if i % 3 == 0 and i % 2 == 0 and i % 4 in (0, 2)]
+
+    def test_parse_learning_hours(self) -> None:
+        """
+        Method tests the learning hours of a course are parsed into hours
+
+        Assert Condition:
+            Check parsed hours of several formats (unknown formats are NaN)
+        """
+        self.assertAlmostEqual(AttributeIndex.parse_learning_hours("2 hrs 30 mins"), 2.5)
+        self.assertAlmostEqual(AttributeIndex.parse_learning_hours("4 mins 38 s"),
+                               4 / 60 + 38 / 3600)
+        self.assertTrue(numpy.isnan(AttributeIndex.parse_learning_hours("Days")))
+        self.assertTrue(numpy.isnan(AttributeIndex.parse_learning_hours(None)))
+
+    def test_attribute_index_positions(self) -> None:
+        """
+        Method tests the bitmaps of the AttributeIndex select the courses matching the filters
+
+        Assert Condition:
+            Check the positions returned match a scan of the courses
+        """
+        attributes = AttributeIndex(self.courses)
+        self.assertEqual(list(attributes.positions(self.filters)), self.expected_positions())
+        self.assertEqual(len(attributes.positions(SearchFilters(required_tags=["unknown"]))), 0)
+
+    def test_filtered_search_matches_brute_force(self) -> None:
+        """
+        Method tests a filtered search of each index type returns the exact ranking of the
+        matching courses
+
+        Assert Condition:
+            Check the positions returned match an exact search of the matching courses
+        """
+        expected_positions = numpy.array(self.expected_positions())
+        exact_index = VectorIndex(self.embeddings, self.courses)
+        indexes = [exact_index,
+                   IVFIndex(self.embeddings, self.courses, n_lists=8, n_probe=8),
+                   QuantizedIndex(self.embeddings, self.courses, rescore_factor=8)]
+        for query in self.embeddings[:3] + 0.1:
+            scores = exact_index.vectors[expected_positions] @ exact_index.normalise(query)[0]
+            order, _ = exact_index.select_top_k(scores, 5)
+            for vector_index in indexes:
+                positions, _ = vector_index.top_k_indices(query, 5, self.filters)
+                self.assertEqual(list(positions), list(expected_positions[order]))
+
+    def test_filtered_batch_search(self) -> None:
+        """
+        Method tests a batch mixing filtered and unfiltered queries returns the same courses
+        as searching each query individually
+
+        Assert Condition:
+            Check the courses of each query of the batch match an individual search
+        """
+        vector_index = VectorIndex(self.embeddings, self.courses)
+        queries: numpy.ndarray = self.embeddings[:3] + 0.05
+        filters: list = [self.filters, None, SearchFilters(course_types=["Course"])]
+        results = vector_index.search_batch(queries, [5, 5, 5], filters)
+        for query, query_filters, result in zip(queries, filters, results):
+            self.assertEqual(result, vector_index.search(query, 5, query_filters))
+        self.assertTrue(all(course["course_type"] == "Course" for course in results[2]))
+
+
+class LexicalIndexTests(unittest.TestCase):
+    """
+    Class for testing the LexicalIndex (BM25) and HybridSearch Classes of the Semantic
+    Search Module
+    """
+    def setUp(self) -> None:
+        generator = numpy.random.default_rng(0)
+        self.embeddings: numpy.ndarray = generator.normal(size=(6, 16))
+        self.courses: list[dict] = [
+            {"title": "Introduction to SQL", "description": "Query relational databases",
+             "tags": ["Data"], "course_type": "Course"},
+            {"title": "Tableau Dashboards", "description": "Visualise data with Tableau",
+             "tags": ["Data", "Visualisation"], "course_type": "Video"},
+            {"title": "Python for Data Science", "description": "Pandas and SQL basics",
+             "tags": ["Python"], "course_type": "Course"},
+            {"title": "Cloud Computing", "description": "Deploy applications",
+             "tags": ["Cloud"], "course_type": "Video"},
+            {"title": "Machine Learning", "description": "Train models in Python",
+             "tags": ["AI"], "course_type": "Course"},
+            {"title": "Career Skills", "description": "Interviews and CVs",
+             "tags": ["Professional"], "course_type": "Webpage"}]
+
+    def test_bm25_ranking(self) -> None:
+        """
+        Method tests the BM25 ranking of the lexical index
+
+        Assert Conditions:
+            - Check a title match ranks above a description match
+            - Check courses without a query term are not returned
+            - Check filters restrict the returned courses
+        """
+        lexical_index = LexicalIndex(self.courses)
+        positions, scores = lexical_index.top_k_indices("SQL", 5)
+        self.assertEqual(list(positions), [0, 2])
+        self.assertGreater(scores[0], scores[1])
+        self.assertEqual(len(lexical_index.top_k_indices("kubernetes", 5)[0]), 0)
+        positions, _ = lexical_index.top_k_indices("data", 5,
+                                                   SearchFilters(course_types=["Video"]))
+        self.assertEqual(list(positions), [1])
+
+    def test_reciprocal_rank_fusion(self) -> None:
+        """
+        Method tests reciprocal rank fusion ranks a position ranked well by both rankings
+        above positions ranked first by a single ranking
+
+        Assert Condition:
+            Check the order of the fused positions
+        """
+        positions, scores = HybridSearch.reciprocal_rank_fusion(
+                    [numpy.array([0, 1, 2]), numpy.array([3, 1, 4])], [0.5, 0.5])
+        order = positions[numpy.argsort(-scores, kind="stable")]
+        self.assertEqual(list(order[:3]), [1, 0, 3])
+
+    def test_search_modes(self) -> None:
+        """
+        Method tests the search modes of the HybridSearch Class
+
+        Assert Conditions:
+            - Check the "semantic" mode matches the vector index
+            - Check the "lexical" mode does not require a query embedding
+            - Check the "hybrid" mode returns courses of both rankings
+        """
+        vector_index = VectorIndex(self.embeddings, self.courses)
+        hybrid_search = HybridSearch(vector_index, candidates=3)
+        query_embedding = self.embeddings[4]
+        self.assertEqual(hybrid_search.search("SQL", query_embedding, 2),
+                         vector_index.search(query_embedding, 2))
+        self.assertEqual(hybrid_search.search("Tableau", None, 1, mode="lexical")[0]["title"],
+                         "Tableau Dashboards")
+        titles = [course["title"] for course in hybrid_search.search(
+                    "Tableau", query_embedding, 2, mode="hybrid")]
+        self.assertIn("Machine Learning", titles)
+        self.assertIn("Tableau Dashboards", titles)
+        with self.assertRaises(ValueError):
+            hybrid_search.search("SQL", query_embedding, 2, mode="unknown")
+
+
+class IndexManagerTests(unittest.TestCase):
+    """
+    Class for testing the IndexManager Class (background rebuild and swap of the search
+    index when the courses catalog changes) of the Semantic Search Module
+    """
+    def setUp(self) -> None:
+        self.courses = MemoryDatabase("test", "courses", [{"title": "course 0"}])
+        self.builds: list = []
+
+    def build(self) -> list:
+        """Method builds a (mock) index: a list of the course titles"""
+        self.courses.connect()
+        index = [course["title"] for course in self.courses.find_documents()]
+        self.courses.close()
+        self.builds.append(index)
+        return index
+
+    def test_refresh_on_catalog_change(self) -> None:
+        """
+        Method tests the index is only rebuilt when the catalog fingerprint changes
+
+        Assert Conditions:
+            - Check an unchanged catalog does not rebuild the index
+            - Check a changed catalog swaps in a new index and increments the version
+            - Check a previously returned index is not modified by the swap
+        """
+        manager = IndexManager(self.build, lambda: DatabaseHelper.catalog_fingerprint(
+                                                        self.courses), poll_interval=None)
+        self.assertTrue(manager.refresh())
+        index = manager.current
+        self.assertFalse(manager.refresh())
+        self.courses.connect()
+        self.courses.insert_documents([{"title": "course 1"}])
+        self.courses.close()
+        self.assertTrue(manager.refresh())
+        self.assertEqual(manager.version, 2)
+        self.assertEqual(len(manager.current), 2)
+        self.assertEqual(index, ["course 0"])
+
+    def test_triggered_refresh_compares_full_fingerprint(self) -> None:
+        """
+        Method tests a triggered refresh compares the full fingerprint of the catalog, which
+        detects a change the polled fingerprint misses
+
+        Assert Conditions:
+            - Check a triggered refresh does not rebuild the first index of an unchanged catalog
+            - Check a polled refresh does not rebuild the index when its fingerprint is unchanged
+            - Check a triggered refresh rebuilds the index when the full fingerprint changed
+            - Check a triggered refresh does not rebuild an unchanged catalog
+        """
+        manager = IndexManager(self.build, lambda: "unchanged", poll_interval=None,
+                               full_fingerprint=lambda: DatabaseHelper.catalog_fingerprint(
+                                                            self.courses))
+        self.assertTrue(manager.refresh())
+        self.assertFalse(manager.refresh(verify=True))
+        self.courses.connect()
+        course = self.courses.find_documents()[0]
+        self.courses.upsert_documents([{**course, "title": "course 1"}])
+        self.courses.close()
+        self.assertFalse(manager.refresh())
+        self.assertTrue(manager.refresh(verify=True))
+        self.assertEqual(manager.current, ["course 1"])
+        self.assertFalse(manager.refresh(verify=True))
+
+    def test_background_rebuild(self) -> None:
+        """
+        Method tests a triggered rebuild runs on the background thread
+
+        Assert Condition:
+            Check the index is rebuilt after the trigger
+        """
+        manager = IndexManager(self.build, lambda: "unchanged", poll_interval=None)
+        manager.refresh()
+        manager.start()
+        manager.trigger()
+        for _ in range(100):
+            if manager.version == 2:
+                break
+            time.sleep(0.01)
+        manager.stop()
+        self.assertEqual(manager.version, 2)
+        self.assertEqual(len(self.builds), 2)
+
+    def test_failed_initial_build_is_retried(self) -> None:
+        """
+        Method tests a failed first build is retried with a backoff when polling is disabled
+
+        Assert Conditions:
+            - Check the index is built once the build succeeds
+            - Check the failures are recorded
+        """
+        attempts: list = []
+
+        def build() -> list:
+            attempts.append(True)
+            if len(attempts) < 3:
+                raise ConnectionError("database is starting")
+            return self.build()
+
+        manager = IndexManager(build, lambda: "unchanged", poll_interval=None,
+                               retry_delay=0.01, max_retry_delay=0.02)
+        manager.trigger()
+        manager.start()
+        for _ in range(200):
+            if manager.ready:
+                break
+            time.sleep(0.01)
+        manager.stop()
+        self.assertEqual(manager.snapshot(), (["course 0"], 1))
+        self.assertEqual(manager.failures, 2)
+
+    def test_initial_build_in_background(self) -> None:
+        """
+        Method tests the first index is built on the background thread, the manager only
+        reporting ready (with the index version) once it is swapped in
+
+        Assert Conditions:
+            - Check the manager is not ready before the first build
+            - Check the snapshot returns the index with its version once ready
+        """
+        manager = IndexManager(self.build, lambda: "unchanged", poll_interval=None)
+        self.assertFalse(manager.ready)
+        self.assertEqual(manager.snapshot(), (None, 0))
+        manager.trigger()
+        manager.start()
+        for _ in range(100):
+            if manager.ready:
+                break
+            time.sleep(0.01)
+        manager.stop()
+        self.assertTrue(manager.stats()["ready"])
+        self.assertEqual(manager.snapshot(), (["course 0"], 1))
+
+
+class MemoryDatabaseTests(unittest.TestCase):
+    """
+    Class for testing the semantic search module against the in memory (MemoryDatabase)
+    course and embedded dataset stores, which do not require the database server
+    """
+    def setUp(self) -> None:
+        self.courses: list[dict] = [{"_id": ObjectId(), "title": f"course {i}",
+                                     "description": f"topic {i % 5}"} for i in range(20)]
+        #the hashing encoder loads no model, so the tests run offline
+        self.encoder: tuple = (EmbeddingController.model, EmbeddingController.encoder_backend)
+        EmbeddingController.configure_encoder(HashingEncoder("hashing"))
+
+    def tearDown(self) -> None:
+        EmbeddingController.model, EmbeddingController.encoder_backend = self.encoder
+        EmbeddingController.update_model_version()
+
+    def test_find_documents(self) -> None:
+        """
+        Method tests the filters and projections supported by the MemoryDatabase
+
+        Assert Conditions:
+            - Check a "$in" filter returns the matching documents
+            - Check an exclusion projection removes the field
+        """
+        database = MemoryDatabase("test", "courses", self.courses)
+        database.connect()
+        ids = [course["_id"] for course in self.courses[:3]]
+        documents = database.find_documents({"_id": {"$in": ids}}, {"description": 0})
+        database.close()
+        self.assertEqual([document["_id"] for document in documents], ids)
+        self.assertNotIn("description", documents[0])
+
+    def test_hydration_by_id(self) -> None:
+        """
+        Method tests the top k courses of a semantic search are fetched by "_id" (in both
+        hydration modes) in the order of the ranking, restricted to the hydration fields
+
+        Assert Conditions:
+            - Check both hydration modes return the same courses
+            - Check the best course is the course matching the query
+            - Check only the hydration fields are returned
+        """
+        embedded_database = MemoryDatabase("test", "embedded_dataset")
+        EmbeddingController(MemoryDatabase("test", "courses", self.courses),
+                            embedded_database).create_embedded_dataset()
+        results = []
+        for hydration in EmbeddingController.hydration_modes:
+            #courses are stored in reverse order, so positions do not match the vectors
+            controller = EmbeddingController(MemoryDatabase("test", "courses", self.courses[::-1]),
+                                             embedded_database, hydration=hydration,
+                                             hydration_fields=["title"])
+            results.append(controller.courses_semantic_search("course 7 topic 2", 3))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0][0], {"title": "course 7"})
+
+    def test_local_hydration_map_is_shared(self) -> None:
+        """
+        Method tests the map of the courses of the "local" hydration mode is loaded once for
+        every controller and loaded again when the courses change
+
+        Assert Conditions:
+            - Check controllers created per request load the courses once
+            - Check a changed course is returned after the courses change
+        """
+        class CountedDatabase(MemoryDatabase):
+            """MemoryDatabase counting the iterations over its documents"""
+            iterations: int = 0
+
+            def iterate_documents(self, *args, **kwargs):
+                self.iterations += 1
+                return super().iterate_documents(*args, **kwargs)
+
+        courses = CountedDatabase("test", "courses", self.courses)
+        embedded_database = MemoryDatabase("test", "embedded_dataset")
+        EmbeddingController(courses, embedded_database).create_embedded_dataset()
+        iterations: int = courses.iterations
+        for _ in range(3):
+            controller = EmbeddingController(courses, embedded_database, hydration="local",
+                                             hydration_fields=["title"])
+            results = controller.courses_semantic_search("course 7 topic 2", 1)
+        self.assertEqual(courses.iterations, iterations + 1)
+        self.assertEqual(results, [{"title": "course 7"}])
+        courses.connect()
+        courses.upsert_documents([{**self.courses[7], "title": "course 7 changed"}])
+        courses.close()
+        results = EmbeddingController(courses, embedded_database, hydration="local",
+                                      hydration_fields=["title"]
+                                      ).courses_semantic_search("course 7 topic 2", 1)
+        self.assertEqual(courses.iterations, iterations + 2)
+        self.assertEqual(results, [{"title": "course 7 changed"}])
+
+    def test_filter_attributes_are_shared(self) -> None:
+        """
+        Method tests the attribute index filtering the fallback semantic search is built once
+        for every controller and built again when the courses change
+
+        Assert Conditions:
+            - Check filtered searches of controllers created per request load the
+              attributes once
+            - Check only courses matching the filters are returned
+            - Check a course matching the filters after the courses change is returned
+        """
+        class CountedDatabase(MemoryDatabase):
+            """MemoryDatabase counting the iterations over its documents"""
+            iterations: int = 0
+
+            def iterate_documents(self, *args, **kwargs):
+                self.iterations += 1
+                return super().iterate_documents(*args, **kwargs)
+
+        documents: list[dict] = [{**course, "course_type": "Video" if i < 5 else "Course"}
+                                 for i, course in enumerate(self.courses)]
+        courses = CountedDatabase("test", "courses", documents)
+        embedded_database = MemoryDatabase("test", "embedded_dataset")
+        EmbeddingController(courses, embedded_database).create_embedded_dataset()
+        iterations: int = courses.iterations
+        filters = SearchFilters(course_types=["Video"])
+        for _ in range(3):
+            results = EmbeddingController(courses, embedded_database
+                                          ).courses_semantic_search("course 7 topic 2", 3,
+                                                                    filters)
+        self.assertEqual(courses.iterations, iterations + 1)
+        self.assertEqual({course["course_type"] for course in results}, {"Video"})
+        courses.connect()
+        courses.upsert_documents([{**documents[7], "course_type": "Video"}])
+        courses.close()
+        results = EmbeddingController(courses, embedded_database
+                                      ).courses_semantic_search("course 7 topic 2", 1, filters)
+        self.assertEqual(courses.iterations, iterations + 2)
+        self.assertEqual(results[0]["title"], "course 7")
+
+    def test_courses_are_not_iterated_while_embedding(self) -> None:
+        """
+        Method tests the courses are not iterated (no cursor is held open) while the shards
+        of the embedded dataset are embedded, each shard being fetched by "_id" instead
+
+        Assert Conditions:
+            - Check no iteration over the courses is open while a shard is embedded
+            - Check every course is embedded once and a changed course is re-embedded
+        """
+        class IteratedDatabase(MemoryDatabase):
+            """MemoryDatabase recording whether its documents are being iterated"""
+            iterating: bool = False
+
+            def iterate_documents(self, *args, **kwargs):
+                self.iterating = True
+                try:
+                    yield from super().iterate_documents(*args, **kwargs)
+                finally:
+                    self.iterating = False
+
+        class RecordingEncoder(HashingEncoder):
+            """HashingEncoder recording whether the courses are iterated at each call"""
+            def encode(self, data, **options):
+                iterating.append(courses.iterating)
+                return super().encode(data, **options)
+
+        iterating: list = []
+        courses = IteratedDatabase("test", "courses", self.courses)
+        EmbeddingController.configure_encoder(RecordingEncoder("hashing"))
+        EmbeddingController.bucket_shards, bucket_shards = 2, EmbeddingController.bucket_shards
+        EmbeddingController.encode_shard_size, shard_size = 3, EmbeddingController.encode_shard_size
+        try:
+            controller = EmbeddingController(courses, MemoryDatabase("test", "embedded_dataset"))
+            controller.create_embedded_dataset()
+            courses.connect()
+            courses.upsert_documents([{**self.courses[4], "title": "changed"}])
+            courses.close()
+            changes: dict = controller.update_embedded_dataset()
+        finally:
+            EmbeddingController.bucket_shards = bucket_shards
+            EmbeddingController.encode_shard_size = shard_size
+        self.assertGreater(len(iterating), 1)
+        self.assertNotIn(True, iterating)
+        self.assertEqual(changes, {"added": 0, "updated": 1, "removed": 0, "unchanged": 19})
+
+    def test_load_csvs_in_chunks(self) -> None:
+        """
+        Method tests CSV files are loaded in chunks and that upserting by key makes loading
+        the files again replace (not duplicate) the stored documents
+
+        Assert Conditions:
+            - Check every row of every file is loaded
+            - Check loading the files again does not duplicate the documents
+        """
+        database = MemoryDatabase("test", "courses")
+        with tempfile.TemporaryDirectory() as folder:
+            for file in range(2):
+                with open(os.path.join(folder, f"courses_{file}.csv"), "w",
+                          encoding="utf-8") as csv_file:
+                    csv_file.write("course_id,title\n")
+                    csv_file.writelines(f"{file * 100 + i},course {i}\n" for i in range(25))
+            stats = DatabaseHelper.setup_database(database, folder, "utf-8", chunk_size=10,
+                                                  batch_size=4, upsert_key="course_id")
+            self.assertEqual((stats["files"], stats["rows"]), (2, 50))
+            DatabaseHelper.setup_database(database, folder, "utf-8", chunk_size=7,
+                                          upsert_key="course_id")
+        database.connect()
+        documents = database.find_documents()
+        database.close()
+        self.assertEqual(len(documents), 50)
+        self.assertEqual(len({document["course_id"] for document in documents}), 50)
+
+    def test_semantic_search_timings(self) -> None:
+        """
+        Method tests a semantic search against the in memory stores reports the time of
+        each of its stages
+
+        Assert Conditions:
+            - Check the number of courses returned
+            - Check the time of every stage is reported
+        """
+        controller = EmbeddingController(MemoryDatabase("test", "courses", self.courses),
+                                         MemoryDatabase("test", "embedded_dataset"))
+        controller.create_embedded_dataset()
+        timings: dict = {}
+        top_k_courses = controller.courses_semantic_search("course 3", 5, timings=timings)
+        self.assertEqual(len(top_k_courses), 5)
+        self.assertEqual(set(timings), {"load", "encode", "score", "hydrate"})
+
+
+class SnapshotDatabaseTests(unittest.TestCase):
+    """
+    Class for testing the local snapshot (SnapshotDatabase) of the course and embedded
+    dataset collections, which does not require the database server
+    """
+    def setUp(self) -> None:
+        self.courses: list[dict] = [{"_id": ObjectId(), "title": f"course {i}",
+                                     "description": f"topic {i % 5}"} for i in range(20)]
+        #the hashing encoder loads no model, so the tests run offline
+        self.encoder: tuple = (EmbeddingController.model, EmbeddingController.encoder_backend)
+        EmbeddingController.configure_encoder(HashingEncoder("hashing"))
+        self.courses_database = MemoryDatabase("test", "courses", self.courses)
+        self.embedded_database = MemoryDatabase("test", "embedded_dataset")
+        EmbeddingController(self.courses_database,
+                            self.embedded_database).create_embedded_dataset()
+
+    def tearDown(self) -> None:
+        EmbeddingController.model, EmbeddingController.encoder_backend = self.encoder
+        EmbeddingController.update_model_version()
+
+    def test_snapshot_round_trip(self) -> None:
+        """
+        Method tests a snapshot holds the documents and memory mapped vectors of the
+        collections it was written from
+
+        Assert Conditions:
+            - Check the documents and projections match the source collection
+            - Check the vectors are memory mapped and match the stored vectors
+            - Check writing to the snapshot is rejected
+        """
+        with tempfile.TemporaryDirectory() as path:
+            manifest = SnapshotDatabase.write_snapshot(path, [self.courses_database,
+                                                              self.embedded_database])
+            self.assertEqual(manifest["collections"]["embedded_dataset"]["documents"], 20)
+            courses = SnapshotDatabase(path, "courses")
+            courses.connect()
+            ids = [course["_id"] for course in self.courses[:3]]
+            self.assertEqual(courses.find_documents({"_id": {"$in": ids}}, {"description": 0}),
+                             [{"_id": course["_id"], "title": course["title"]}
+                              for course in self.courses[:3]])
+            with self.assertRaises(exceptions.ReadOnlyCollection):
+                courses.insert_documents([{"title": "new course"}])
+            courses.close()
+            stored_ids, stored = DatabaseHelper.load_embedded_dataset_binary(
+                                                                self.embedded_database)
+            snapshot_ids, vectors = DatabaseHelper.load_embedded_dataset_binary(
+                                                SnapshotDatabase(path, "embedded_dataset"))
+            self.assertIsInstance(vectors, numpy.memmap)
+            self.assertEqual(snapshot_ids, stored_ids)
+            self.assertTrue(numpy.array_equal(vectors, stored))
+
+    def test_search_from_snapshot(self) -> None:
+        """
+        Method tests a semantic search over a snapshot returns the courses of a semantic
+        search over the collections it was written from
+
+        Assert Conditions:
+            - Check both searches return the same courses
+            - Check the snapshot fingerprint changes when the snapshot is replaced
+        """
+        query = "course 7 topic 2"
+        expected = EmbeddingController(self.courses_database, self.embedded_database
+                                       ).courses_semantic_search(query, 3)
+        with tempfile.TemporaryDirectory() as path:
+            SnapshotDatabase.write_snapshot(path, [self.courses_database,
+                                                   self.embedded_database])
+            controller = EmbeddingController(SnapshotDatabase(path, "courses"),
+                                             SnapshotDatabase(path, "embedded_dataset"))
+            self.assertEqual(controller.courses_semantic_search(query, 3), expected)
+            fingerprint = DatabaseHelper.catalog_fingerprint(SnapshotDatabase(path, "courses"))
+            self.courses_database.connect()
+            self.courses_database.insert_documents([{"title": "course 20"}])
+            self.courses_database.close()
+            SnapshotDatabase.write_snapshot(path, [self.courses_database])
+            self.assertNotEqual(
+                DatabaseHelper.catalog_fingerprint(SnapshotDatabase(path, "courses")),
+                fingerprint)
+
+    def test_snapshot_versions(self) -> None:
+        """
+        Method tests writing a snapshot never modifies the files of the current snapshot,
+        the manifest being the single commit point of a new version
+
+        Assert Conditions:
+            - Check the files of the previous snapshot are unchanged by a new snapshot
+            - Check the new manifest only references the files of the new version
+            - Check versions older than the previous snapshot are deleted
+        """
+        with tempfile.TemporaryDirectory() as path:
+            manifests: list = []
+            for _ in range(3):
+                manifests.append(SnapshotDatabase.write_snapshot(
+                            path, [self.courses_database, self.embedded_database]))
+                if len(manifests) == 2:
+                    files: list = [os.path.join(path, entry[field])
+                                   for entry in manifests[0]["collections"].values()
+                                   for field in ("file", "vectors") if entry.get(field)]
+                    self.assertTrue(all(os.path.exists(file) for file in files))
+                    self.assertTrue(all(entry["file"].startswith(manifests[1]["version"] + "/")
+                                        for entry in manifests[1]["collections"].values()))
+            versions = sorted(name for name in os.listdir(path)
+                              if name.startswith(SnapshotDatabase.version_prefix))
+            self.assertEqual(versions, sorted([manifests[1]["version"],
+                                               manifests[2]["version"]]))
+
+
+class EncoderTests(unittest.TestCase):
+    """
+    Class for testing the encoder backends of the embedding model and how the model is
+    loaded by the EmbeddingController
+    """
+    def test_hashing_encoder_is_deterministic(self) -> None:
+        """
+        Method tests the hashing encoder backend returns the same normalised embedding for
+        the same text
+
+        Assert Conditions:
+            - Check the embeddings of the same text are equal
+            - Check the embeddings are of unit length
+        """
+        encoder = HashingEncoder("hashing")
+        embeddings = encoder.encode(["data science course", "data science course"])
+        self.assertTrue(numpy.array_equal(embeddings[0], embeddings[1]))
+        self.assertAlmostEqual(float(numpy.linalg.norm(encoder.encode("data science"))), 1.0,
+                               places=5)
+
+    def test_check_encoder_backend(self) -> None:
+        """
+        Method tests a misconfigured encoder backend is detected without loading its model
+
+        Assert Conditions:
+            - Check an unsupported backend is rejected
+            - Check a backend with a missing dependency is rejected
+            - Check the hashing backend (without dependencies) is accepted
+        """
+        with self.assertRaises(ValueError):
+            check_encoder_backend("unknown")
+        encoder_backends["missing"] = type("MissingEncoder", (HashingEncoder,),
+                                           {"backend": "missing",
+                                            "dependencies": ("sts_missing_package",)})
+        try:
+            with self.assertRaises(ImportError):
+                check_encoder_backend("missing")
+        finally:
+            del encoder_backends["missing"]
+        check_encoder_backend("hashing")
+
+    def test_model_loaded_once_on_first_use(self) -> None:
+        """
+        Method tests the embedding model is not loaded when the controller is imported and
+        is loaded once per process on first use
+
+        Assert Conditions:
+            - Check importing the controller does not import torch, sentence_transformers
+              or pandas
+            - Check concurrent first uses share a single encoder of the configured backend
+        """
+        result = subprocess.run(
+                    [sys.executable, "-c",
+                     "import sys\n"
+                     "from sts_module.embedding_module.controller import EmbeddingController\n"
+                     "print(sorted({'torch', 'sentence_transformers', 'pandas'} & "
+                     "set(sys.modules)))"],
+                    capture_output=True, text=True, check=True,
+                    cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.stdout.strip(), "[]")
+        model, backend = EmbeddingController.model, EmbeddingController.encoder_backend
+        EmbeddingController.model, EmbeddingController.encoder_backend = None, "hashing"
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                encoders = list(executor.map(lambda _: EmbeddingController.get_model(),
+                                             range(8)))
+        finally:
+            EmbeddingController.model, EmbeddingController.encoder_backend = model, backend
+        self.assertTrue(all(encoder is encoders[0] for encoder in encoders))
+        self.assertEqual(encoders[0].backend, "hashing")
+
+    def test_whitespace_variants_share_embedding(self) -> None:
+        """
+        Method tests queries differing only in whitespace share one cached embedding, which
+        is the embedding of the normalised query
+
+        Assert Conditions:
+            - Check the normalised query is embedded once, for single and batched queries
+            - Check the whitespace variants return equal embeddings
+        """
+        class RecordingEncoder(HashingEncoder):
+            """HashingEncoder recording the embedded texts"""
+            def encode(self, data, **options):
+                texts.extend([data] if isinstance(data, str) else data)
+                return super().encode(data, **options)
+
+        texts: list = []
+        model, backend = EmbeddingController.model, EmbeddingController.encoder_backend
+        query_cache = EmbeddingController.query_cache
+        EmbeddingController.configure_encoder(RecordingEncoder("hashing"))
+        EmbeddingController.configure_query_cache(max_entries=16)
+        try:
+            single = EmbeddingController.create_query_embedding("  data   science ")
+            batch = EmbeddingController.create_query_embeddings(["data science",
+                                                                 "data\tscience", "cloud  "])
+        finally:
+            EmbeddingController.model, EmbeddingController.encoder_backend = model, backend
+            EmbeddingController.query_cache = query_cache
+            EmbeddingController.update_model_version()
+        self.assertEqual(texts, ["data science", "cloud"])
+        self.assertTrue(numpy.array_equal(single, batch[0]))
+        self.assertTrue(numpy.array_equal(batch[0], batch[1]))
+
+
+class EmbeddingPipelineTests(unittest.TestCase):
+    """
+    Class for testing the pipeline embedding the courses catalog (length bucketed shards
+    embedded by a pool of worker processes)
+    """
+    def test_bucket_by_length(self) -> None:
+        """
+        Method tests streamed courses are grouped into shards of passages of similar length
+
+        Assert Conditions:
+            - Check every course is in exactly one shard of at most shard_size courses
+            - Check the passages of each bucket are sorted by length
+        """
+        courses = [(i, " ".join(["word"] * ((i * 7) % 11 + 1)), str(i)) for i in range(25)]
+        shards = list(EmbeddingController.bucket_by_length(iter(courses), 4, bucket_shards=3))
+        self.assertEqual(sorted(course for shard in shards for course in shard), courses)
+        self.assertTrue(all(len(shard) <= 4 for shard in shards))
+        bucket = [course for shard in shards[:3] for course in shard]
+        lengths = [len(passage.split()) for _, passage, _ in bucket]
+        self.assertEqual(lengths, sorted(lengths))
+
+    def test_sharded_encoding_preserves_order(self) -> None:
+        """
+        Method tests passages embedded in shards by a pool of worker processes are merged
+        in the original order of the passages
+
+        Assert Conditions:
+            - Check the merged embeddings match the embeddings of a single process
+            - Check every shard is yielded once
+        """
+        passages = [f"course {i} about topic {i % 7}" for i in range(30)]
+        with ShardedEncoder("hashing", "hashing", workers=2, shard_size=7) as encoder:
+            embeddings = encoder.encode(passages)
+            starts = sorted(start for start, _ in encoder.encode_shards(passages))
+        self.assertTrue(numpy.allclose(embeddings, HashingEncoder("hashing").encode(passages)))
+        self.assertEqual(starts, [0, 7, 14, 21, 28])
+
+    def test_encode_workers_outlive_builds(self) -> None:
+        """
+        Method tests the pool of worker processes started for the application is reused by
+        every embedding of the catalog until it is stopped
+
+        Assert Conditions:
+            - Check the started pool is used by consecutive embeddings of the catalog
+            - Check the embeddings match the embeddings of a single process
+            - Check the pool is released when stopped
+        """
+        configuration = (EmbeddingController.model, EmbeddingController.encoder_backend,
+                         EmbeddingController.encode_workers, EmbeddingController.encode_shard_size)
+        EmbeddingController.configure_encoder(HashingEncoder("hashing"))
+        EmbeddingController.configure_parallel_encoding(2, shard_size=7)
+        passages = [f"course {i} about topic {i % 7}" for i in range(14)]
+        try:
+            EmbeddingController.start_encode_workers()
+            encoder = EmbeddingController.sharded_encoder
+            self.assertIsNotNone(encoder)
+            for _ in range(2):
+                shards = dict(EmbeddingController.encode_batches([(0, passages[:7]),
+                                                                  (1, passages[7:])]))
+                self.assertIs(EmbeddingController.sharded_encoder, encoder)
+                self.assertTrue(numpy.allclose(numpy.vstack([shards[0], shards[1]]),
+                                               HashingEncoder("hashing").encode(passages)))
+        finally:
+            EmbeddingController.stop_encode_workers()
+            (EmbeddingController.model, EmbeddingController.encoder_backend,
+             workers, shard_size) = configuration
+            EmbeddingController.configure_parallel_encoding(workers, shard_size=shard_size)
+            EmbeddingController.update_model_version()
+        self.assertIsNone(EmbeddingController.sharded_encoder)
+
+
+class QueryEncodeBatcherTests(unittest.TestCase):
+    """
+    Class for testing the QueryEncodeBatcher Class grouping concurrent query embeddings
+    """
+    def test_concurrent_queries_are_batched(self) -> None:
+        """
+        Method tests concurrent queries are embedded with batched calls and every caller
+        receives the embedding of its own query
+
+        Assert Conditions:
+            - Check fewer encode calls than queries are made, within the maximum batch size
+            - Check each caller receives the embedding of its query
+        """
+        batches: list = []
+        def encode(queries: list[str]) -> numpy.ndarray:
+            batches.append(len(queries))
+            return numpy.array([[float(query)] for query in queries])
+
+        async def run() -> list:
+            batcher = QueryEncodeBatcher(encode, max_batch_size=8, max_wait_ms=50)
+            await batcher.start()
+            try:
+                return await asyncio.gather(*[batcher.encode(str(i)) for i in range(20)])
+            finally:
+                await batcher.stop()
+
+        embeddings = asyncio.run(run())
+        self.assertEqual([embedding[0] for embedding in embeddings], list(range(20)))
+        self.assertLess(len(batches), 20)
+        self.assertLessEqual(max(batches), 8)
+        self.assertEqual(sum(batches), 20)
+
+
+class LRUCacheTests(unittest.TestCase):
+    """
+    Class for testing the LRUCache Class used to cache query embeddings
+    """
+    def test_eviction(self) -> None:
+        """
+        Method tests the least recently used entries are evicted when the cache exceeds
+        its maximum number of entries or bytes
+
+        Assert Conditions:
+            - Check the least recently used entry is evicted
+            - Check the cache never exceeds the maximum number of bytes
+        """
+        cache = LRUCache(max_entries=2, max_bytes=10, sizeof=len)
+        cache.put("a", "1234")
+        cache.put("b", "1234")
+        cache.get("a")
+        cache.put("c", "1234")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1234")
+        cache.put("d", "12345678")
+        self.assertLessEqual(cache.stats()["bytes"], 10)
+        self.assertEqual(len(cache), 1)
+
+    def test_ttl_and_stats(self) -> None:
+        """
+        Method tests entries expire after the time to live and hits/misses are counted
+
+        Assert Conditions:
+            - Check an expired entry is not returned
+            - Check the hit and miss counters
+        """
+        cache = LRUCache(max_entries=10, ttl=0)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+        cache = LRUCache(max_entries=10)
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 1))
+        self.assertEqual(cache.clear(), 1)
+
+
+class ResultCacheTests(unittest.TestCase):
+    """
+    Class for testing the ResultCache Class caching the rankings of search requests
+    """
+    def test_concurrent_lookups_are_counted(self) -> None:
+        """
+        Method tests every lookup made by concurrent requests is counted as a hit or a miss
+
+        Assert Conditions:
+            - Check the hits and misses add up to the number of lookups
+        """
+        cache = ResultCache(max_entries=4)
+        cache.put(1, "cached", numpy.arange(10), 10)
+        keys: list = ["cached", "missing"] * 2000
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda key: cache.get(1, key, 5), keys))
+        self.assertEqual((cache.hits, cache.misses), (2000, 2000))
+
+    def test_smaller_k_served_from_ranking(self) -> None:
+        """
+        Method tests a cached ranking serves any k up to its depth
+
+        Assert Conditions:
+            - Check a smaller k is served from the cached ranking
+            - Check a k deeper than the cached ranking is a miss
+            - Check a ranking shorter than its depth serves any k
+        """
+        cache = ResultCache(max_entries=4, depth=10)
+        key = ResultCache.key("data  science", None, "semantic")
+        cache.put(1, key, numpy.arange(10), depth=10)
+        self.assertEqual(cache.get(1, ResultCache.key("data science", None, "semantic"),
+                                   3).tolist(), [0, 1, 2])
+        self.assertIsNone(cache.get(1, key, 20))
+        cache.put(1, key, numpy.arange(4), depth=10)
+        self.assertEqual(len(cache.get(1, key, 20)), 4)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_invalidated_on_new_version(self) -> None:
+        """
+        Method tests the cached rankings are removed when the search index version changes
+
+        Assert Conditions:
+            - Check the ranking of a previous version is not served
+            - Check the cache is emptied
+        """
+        cache = ResultCache(max_entries=4)
+        key = ResultCache.key("cloud", (("Video",), None, (), ()), "hybrid")
+        cache.put(1, key, numpy.arange(50), depth=50)
+        self.assertIsNone(cache.get(2, key, 5))
+        self.assertEqual(cache.stats()["entries"], 0)
+        self.assertEqual(cache.invalidations, 1)
+        #a ranking of the previous version finishing after the swap is not cached
+        cache.put(1, key, numpy.arange(50), depth=50)
+        self.assertEqual((cache.stats()["entries"], cache.version), (0, 2))
+
+
+class MetricsTests(unittest.TestCase):
+    """
+    Class for testing the metrics exposed in the Prometheus text format
+    """
+    def test_render_metrics(self) -> None:
+        """
+        Method tests the counters, histograms and gauges are rendered in the text format
+
+        Assert Conditions:
+            - Check the histogram buckets are cumulative and count values above the last bound
+            - Check the sum and count of the histogram
+            - Check the counter and gauge samples and their labels
+        """
+        metrics = MetricsRegistry()
+        counter = metrics.register(Counter("requests_total", "Requests", labels=("status",)))
+        histogram = metrics.register(Histogram("stage_seconds", "Stages", labels=("stage",),
+                                               buckets=(0.1, 1.0)))
+        metrics.register(Gauge("courses", "Courses", lambda: {(): 20}))
+        counter.inc(("200",))
+        counter.inc(("200",))
+        for seconds in (0.05, 0.5, 2.0):
+            histogram.observe(seconds, ("score",))
+        lines = metrics.render().splitlines()
+        self.assertIn('requests_total{status="200"} 2.0', lines)
+        self.assertIn('stage_seconds_bucket{stage="score",le="0.1"} 1', lines)
+        self.assertIn('stage_seconds_bucket{stage="score",le="1.0"} 2', lines)
+        self.assertIn('stage_seconds_bucket{stage="score",le="+Inf"} 3', lines)
+        self.assertIn('stage_seconds_sum{stage="score"} 2.55', lines)
+        self.assertIn('stage_seconds_count{stage="score"} 3', lines)
+        self.assertIn("courses 20.0", lines)
+
+    def test_stage_timings_of_request(self) -> None:
+        """
+        Method tests the stage timings are only recorded inside a request
+
+        Assert Conditions:
+            - Check repeated stages of a request are summed
+            - Check nothing is recorded outside of a request
+        """
+        with timed("encode"):
+            pass
+        timings: dict = {}
+        token = request_timings.set(timings)
+        try:
+            for _ in range(2):
+                with timed("score"):
+                    time.sleep(0.01)
+        finally:
+            request_timings.reset(token)
+        self.assertEqual(list(timings), ["score"])
+        self.assertGreaterEqual(timings["score"], 0.02)
+
+
 if __name__ == "__main__":
     unittest.main()